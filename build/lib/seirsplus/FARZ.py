@@ -4,19 +4,28 @@
 
 import random
 import bisect
+import collections
+import itertools
 import math
 import os 
 
-def random_choice(values, weights=None , size = 1, replace = True):
+import numpy
+
+# The generator functions draw from rng, which is the global random module by default
+# (pass a random.Random instance to realize() to generate from a private, seeded stream).
+
+# Graphs of up to this many nodes are realized with dense adjacency and common neighbour count arrays
+# (2 int32 arrays of n*n entries), which makes choosing a node a few array lookups:
+DENSE_MAX_NODES = 5000
+
+def random_choice(values, weights=None , size = 1, replace = True, rng=random):
     if weights is None:
-        i = int(random.random() * len(values))
+        i = int(rng.random() * len(values))
     else :
-        total = 0
-        cum_weights = []
-        for w in weights:
-            total += w
-            cum_weights.append(total)
-        x = random.random() * total
+        # (accumulate sums the weights in the same order as a running total, so the draws are unchanged)
+        cum_weights = list(itertools.accumulate(weights))
+        total = cum_weights[-1] if cum_weights else 0
+        x = rng.random() * total
         i = bisect.bisect(cum_weights, x)
     if size <=1: 
         if len(values)>i: return values[i] 
@@ -25,20 +34,26 @@ def random_choice(values, weights=None , size = 1, replace = True):
         cval = [values[j] for j in range(len(values)) if replace or i!=j]
         if weights is None: cwei=None 
         else: cwei = [weights[j] for j in range(len(weights)) if replace or i!=j]
-        tmp= random_choice(cval, cwei, size-1, replace)
+        tmp= random_choice(cval, cwei, size-1, replace, rng)
         if not isinstance(tmp,list): tmp = [tmp]
         tmp.append(values[i])
         return tmp 
 
 class Comms:
-     def __init__(self, k):
+     def __init__(self, k, capacity=None):
          self.k = k
          self.groups = [[] for i in range(k)]
+         self.groupSets = [set() for i in range(k)]   # members of each group, for constant time membership checks
+         # members of each group in order of addition as arrays (when the number of nodes is known in advance):
+         self.groupArrays = [numpy.zeros(capacity, dtype=numpy.int64) for i in range(k)] if capacity is not None else None
          self.memberships = {}
          
      def add(self, cluster_id, i, s = 1):
-         if i not in  [m[0] for m in self.groups[cluster_id]]:
+         if i not in self.groupSets[cluster_id]:
+            if self.groupArrays is not None:
+                self.groupArrays[cluster_id][len(self.groups[cluster_id])] = i
             self.groups[cluster_id].append((i,s)) 
+            self.groupSets[cluster_id].add(i)
             if i in self.memberships:
                 self.memberships[i].append((cluster_id,s))
             else:
@@ -53,7 +68,7 @@ class Comms:
              
             
 class Graph:
-    def __init__(self,directed=False, weighted=False):
+    def __init__(self,directed=False, weighted=False, capacity=None):
         self.n = 0
         self.counter = 0
         self.max_degree = 0
@@ -63,11 +78,23 @@ class Graph:
         self.edge_time = []
         self.deg = []
         self.neigh =  [[]]
+        self.neighIds = [[]]     # neighbour ids of each node, parallel to neigh
+        self.neighSets = [set()] # distinct neighbour ids of each node, for constant time adjacency checks
+        # For undirected, unweighted graphs with a known number of nodes, the edge counts between nodes (adjCounts),
+        # the counts of paths of length 2 between nodes (commonNeighbours = adjCounts**2) and the degrees are also
+        # kept as arrays, updated as edges are added:
+        self.adjCounts = self.commonNeighbours = self.degCounts = None
+        if capacity is not None and not directed and not weighted:
+            self.adjCounts        = numpy.zeros((capacity, capacity), dtype=numpy.int32)
+            self.commonNeighbours = numpy.zeros((capacity, capacity), dtype=numpy.int32)
+            self.degCounts        = numpy.zeros(capacity, dtype=numpy.int64)
         return 
 
     def add_node(self):
         self.deg.append(0)
         self.neigh.append([])
+        self.neighIds.append([])
+        self.neighSets.append(set())
         self.n+=1
     
     def weight(self, u, v):
@@ -76,9 +103,7 @@ class Graph:
         return 0
     
     def is_neigh(self, u, v):
-        for i,_ in self.neigh[u]:
-            if i == v: return True
-        return False
+        return v in self.neighSets[u]
     
     def add_edge(self, u, v, w=1):
         if u==v: return
@@ -87,14 +112,33 @@ class Graph:
         self.edge_time.append(self.counter)
         self.counter +=1
         self.neigh[u].append((v,w))
+        self.neighIds[u].append(v)
+        self.neighSets[u].add(v)
         self.deg[v]+=w
         if  self.deg[v]>self.max_degree: self.max_degree = self.deg[v]
         
         if not self.directed: #if directed deg is indegree, outdegree = len(negh)
             self.neigh[v].append((u,w))
+            self.neighIds[v].append(u)
+            self.neighSets[v].add(u)
             self.deg[u]+=w
             if  self.deg[u]>self.max_degree: self.max_degree = self.deg[u]
 
+        if self.adjCounts is not None:
+            # Adding the edge u-v adds adjCounts[v] to row and column u of the path counts (and likewise for v),
+            # plus the paths u-v-u and v-u-v:
+            adjU, adjV = self.adjCounts[u].copy(), self.adjCounts[v].copy()
+            self.commonNeighbours[u]    += adjV
+            self.commonNeighbours[:,u]  += adjV
+            self.commonNeighbours[v]    += adjU
+            self.commonNeighbours[:,v]  += adjU
+            self.commonNeighbours[u,u]  += 1
+            self.commonNeighbours[v,v]  += 1
+            self.adjCounts[u,v]         += 1
+            self.adjCounts[v,u]         += 1
+            self.degCounts[u]           += 1
+            self.degCounts[v]           += 1
+
         return 
     
      
@@ -122,6 +166,22 @@ class Graph:
             # G.add_edges_from(self.edge_list)
         return G
     
+    def to_csr(self):
+        # The undirected adjacency matrix of the realized graph as a scipy csr_matrix, matching the graph
+        # built by to_nx (repeated edges are merged and keep the weight of their last addition).
+        import numpy
+        import scipy.sparse
+        edges = numpy.array(self.edge_list, dtype=float).reshape(-1, 3)
+        u, v, w = edges[:,0].astype(numpy.int64), edges[:,1].astype(numpy.int64), edges[:,2]
+        u, v = numpy.minimum(u, v), numpy.maximum(u, v)
+        # Keep the last occurrence of each edge:
+        _, lastIdx = numpy.unique((u*self.n + v)[::-1], return_index=True)
+        keep = len(u) - 1 - lastIdx
+        u, v, w = u[keep], v[keep], w[keep]
+        A = scipy.sparse.csr_matrix((numpy.concatenate([w, w]), (numpy.concatenate([u, v]), numpy.concatenate([v, u]))), shape=(self.n, self.n))
+        A.sort_indices()
+        return A
+
     def to_ig(self):
         G=ig.Graph()
         G.add_edges(self.edge_list)
@@ -145,24 +205,30 @@ def Q(G, C):
     return q
 
 def common_neighbour(i, G, normalize=True):
-    p = {}
-    for k,wik in G.neigh[i]:
-        for j,wjk in G.neigh[k]:
-            if j in p: p[j]+=(wik * wjk) 
-            else: p[j]= (wik * wjk)
+    if G.weighted:
+        p = {}
+        for k,wik in G.neigh[i]:
+            for j,wjk in G.neigh[k]:
+                if j in p: p[j]+=(wik * wjk) 
+                else: p[j]= (wik * wjk)
+    else:
+        # All weights are 1, so the products just count the paths i-k-j:
+        p = collections.Counter()
+        for k in G.neighIds[i]:
+            p.update(G.neighIds[k])
     if len(p)<=0 or not normalize: return p
     maxp = p[max(p, key = lambda i: p[i])]
     for j in p:  p[j] = p[j]*1.0 / maxp
     return p
 
-def choose_community(i, G, C, alpha, beta, gamma, epsilon):
+def choose_community(i, G, C, alpha, beta, gamma, epsilon, rng=random):
     mids =[k for  k,uik in C.memberships[i]]
-    if random.random()< beta: #inside
+    if rng.random()< beta: #inside
         cids = mids
     else:     
         cids = [j for j in range(len(C.groups)) if j not in mids] #:  cids.append(j)
 
-    return cids[ int(random.random()*len(cids))] if len(cids)>0 else None
+    return cids[ int(rng.random()*len(cids))] if len(cids)>0 else None
 
 def degree_similarity(i, ids, G, gamma, normalize = True):
     p = [0]*len(ids)
@@ -177,19 +243,20 @@ def degree_similarity(i, ids, G, gamma, normalize = True):
 def combine (a,b,alpha,gamma):
     return (a**alpha) / ((b+1)**gamma)
 
-def choose_node(i,c, G, C, alpha, beta, gamma, epsilon):
-    ids = [j for j,_ in C.groups[c] if j !=i ]
-    #   also remove nodes that are already connected from the candidate list
-    for k,_ in G.neigh[i]: 
-        if k in ids: ids.remove(k) 
+def choose_node(i,c, G, C, alpha, beta, gamma, epsilon, rng=random):
+    if G.commonNeighbours is not None and C.groupArrays is not None:
+        return choose_node_arrays(i, c, G, C, alpha, beta, gamma, epsilon, rng)
+    #   candidates are the other members of the community, not including nodes that are already connected
+    neighs = G.neighSets[i]
+    ids = [j for j,_ in C.groups[c] if j !=i and j not in neighs]
 
     norma = False
     cn = common_neighbour(i, G, normalize=norma)
     trim_ids = [id for id in ids if id in cn]
     dd = degree_similarity(i, trim_ids, G, gamma, normalize=norma)
     
-    if random.random()<epsilon or len(trim_ids)<=0:
-        tmp = int(random.random() * len(ids))
+    if rng.random()<epsilon or len(trim_ids)<=0:
+        tmp = int(rng.random() * len(ids))
         if tmp==0: return  None
         return ids[tmp], epsilon
     else:
@@ -199,46 +266,68 @@ def choose_node(i,c, G, C, alpha, beta, gamma, epsilon):
             p[ind] = (cn[j]**alpha )/ ((dd[ind]+1)** gamma) 
             
         if(sum(p)==0): return  None
-        tmp = random_choice(range(len(p)), p ) #, size=1, replace = False)
+        tmp = random_choice(range(len(p)), p, rng=rng) #, size=1, replace = False)
         # TODO add weights /direction/attributes
         if tmp is None: return  None
         return trim_ids[tmp], p[tmp]
 
  
-def connect_neighbor(i, j, pj, c, b,  G, C, beta):
+def choose_node_arrays(i,c, G, C, alpha, beta, gamma, epsilon, rng=random):
+    # choose_node using the graph's count arrays (the same candidates, weights and random draws)
+    members = C.groupArrays[c][:len(C.groups[c])]
+    ids = members[(members != i) & (G.adjCounts[i, members] == 0)]
+    cn = G.commonNeighbours[i, ids]
+    trim_ids = ids[cn > 0]
+
+    if rng.random()<epsilon or len(trim_ids)<=0:
+        tmp = int(rng.random() * len(ids))
+        if tmp==0: return  None
+        return int(ids[tmp]), epsilon
+    else:
+        dd = (G.degCounts[trim_ids] - G.degCounts[i])**2
+        p = (cn[cn > 0].astype(float)**alpha) / ((dd+1).astype(float)**gamma)
+
+        if(p.sum()==0): return  None
+        cum_weights = numpy.cumsum(p)
+        tmp = numpy.searchsorted(cum_weights, rng.random() * cum_weights[-1], side='right')
+        if tmp >= len(p): return  None
+        return int(trim_ids[tmp]), float(p[tmp])
+
+ 
+def connect_neighbor(i, j, pj, c, b,  G, C, beta, rng=random):
     if b<=0: return 
-    ids = [id for id,_ in C.groups[c]]
+    ids = C.groupSets[c]
     for k,wjk in G.neigh[j]:
-        if (random.random() <b and k!=i and (k in ids or random.random()>beta)):
+        if (rng.random() <b and k!=i and (k in ids or rng.random()>beta)):
             G.add_edge(i,k,wjk*pj)
                     
-def connect(i, b,  G, C, alpha, beta, gamma, epsilon):
+def connect(i, b,  G, C, alpha, beta, gamma, epsilon, rng=random):
     #Choose community
-    c = choose_community(i, G, C, alpha, beta, gamma, epsilon)
+    c = choose_community(i, G, C, alpha, beta, gamma, epsilon, rng)
     if c is None: return
     #Choose node within community
-    tmp = choose_node(i, c, G, C, alpha, beta, gamma, epsilon)
+    tmp = choose_node(i, c, G, C, alpha, beta, gamma, epsilon, rng)
     if tmp is None: return
     j, pj = tmp 
     G.add_edge(i,j,pj)
-    connect_neighbor(i, j, pj , c, b,  G, C, beta)
+    connect_neighbor(i, j, pj , c, b,  G, C, beta, rng)
             
-def select_node(G, method = 'uniform'):
+def select_node(G, method = 'uniform', rng=random):
     if method=='uniform':   
-        return int(random.random() * G.n) # uniform
+        return int(rng.random() * G.n) # uniform
     else:
         if method == 'older_less_active': p = [(i+1) for i in range(G.n)] # older less active
         elif method == 'younger_less_active' :  p = [G.n-i for i in range(G.n)] # younger less active
         else:  p = [1 for i in range(G.n)] # uniform
-        return  random_choice(range(len(p)), p ) #, size=1, replace = False)[0]
+        return  random_choice(range(len(p)), p, rng=rng) #, size=1, replace = False)[0]
 
-def assign(i, C, e=1, r=1, q = 0.5):
+def assign(i, C, e=1, r=1, q = 0.5, rng=random):
     p = [e +len(c) for c in C.groups]
-    id = random_choice(range(C.k),p )
+    id = random_choice(range(C.k),p, rng=rng)
     C.add(id, i)
     for j in range(1,r): #todo add strength for fuzzy
-        if (random.random()<q): 
-              id = random_choice(range(C.k),p )
+        if (rng.random()<q): 
+              id = random_choice(range(C.k),p, rng=rng)
               C.add(id, i)
     return
  
@@ -250,18 +339,19 @@ def print_setting(n,m,k,alpha,beta,gamma, phi,r,q,epsilon,weighted,directed):
     if epsilon!=default_FARZ_setting['epsilon']:'epsilon:', epsilon, 
     print('weighted' if weighted else '', 'directed' if directed else '')
     
-def realize(n, m,  k, b=0.0,  alpha=0.4, beta=0.5, gamma=0.1, phi=1, r=1, q = 0.5, epsilon = 0.0000001, weighted =False, directed=False):
+def realize(n, m,  k, b=0.0,  alpha=0.4, beta=0.5, gamma=0.1, phi=1, r=1, q = 0.5, epsilon = 0.0000001, weighted =False, directed=False, rng=random):
     # print_setting(n,m,k,alpha,beta,gamma, phi,r,q,epsilon,weighted,directed)
-    G =  Graph()
-    C = Comms(k)
+    capacity = n if n <= DENSE_MAX_NODES else None
+    G =  Graph(capacity=capacity)
+    C = Comms(k, capacity=capacity)
     for i in range(n):
     # if i%10==0: print('-- ',G.n, len(G.edge_list))
         G.add_node()
-        assign(i, C, phi, r, q)
-        connect(i,b, G, C, alpha, beta, gamma, epsilon)
+        assign(i, C, phi, r, q, rng)
+        connect(i,b, G, C, alpha, beta, gamma, epsilon, rng)
         for e in range(1,m):
-            j = select_node(G) 
-            connect(j, b, G, C, alpha, beta, gamma, epsilon)        
+            j = select_node(G, rng=rng) 
+            connect(j, b, G, C, alpha, beta, gamma, epsilon, rng)        
     return G,C
 
 
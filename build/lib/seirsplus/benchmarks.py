@@ -0,0 +1,282 @@
+from __future__ import division
+import argparse
+import concurrent.futures
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy
+import scipy
+
+from .models import ModelProfiler
+from .sweeps import simulate_workplace_outbreak, sweep_network_seed, sweep_replicate_seed
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Benchmark scenarios:
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+BENCHMARK_PHASES  = ['generate_workplace_contact_network', 'model_init', 'calc_propensities', 'run_iteration', 'daily_policy']
+
+BENCHMARK_METRICS = ['wall_time', 'time_per_sim_day', 'events_per_sec', 'peak_rss_mb']
+
+
+def benchmark_scenarios(network_sizes=[20, 100, 1000, 10000], pcr_frequencies=['none', 'weekly', 'workday'], R=2.5, T=100,
+                        max_bubble_size=50):
+    # Workplace outbreak scenarios across network sizes and testing cadences (bubbles of up to max_bubble_size nodes,
+    # with at least two bubbles per network). Each scenario is simulated from a fixed seed, so the same scenario
+    # runs the same trajectory on every commit that leaves the simulation's random draws unchanged.
+    scenarios = []
+    for network_size, pcr_frequency in itertools.product(network_sizes, pcr_frequencies):
+        bubble_size = min(max_bubble_size, network_size//2)
+        scenarios.append({'name':'%d|%d|%s' % (network_size, bubble_size, pcr_frequency), 'Network_size':network_size,
+                          'Bubble_size':bubble_size, 'PCR_frequency':pcr_frequency, 'R':R, 'T':T})
+    return scenarios
+
+
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Running benchmarks:
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def peak_rss_mb():
+    # Peak resident set size of this process so far (ru_maxrss is in kilobytes on Linux and in bytes on macOS):
+    if(resource is None):
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss/2**20 if sys.platform == 'darwin' else maxrss/2**10
+
+
+def calibration_seconds(size=500000):
+    # Time of a fixed workload that does not depend on this package (interpreted loops and small numpy operations,
+    # like the simulation's hot paths). Timings are compared relative to it, to factor out how fast the machine
+    # happens to be running at the time (frequency scaling, other load), which shifts all timings of a session alike.
+    rng       = numpy.random.default_rng(0)
+    values    = rng.random(1000)
+    startTime = time.perf_counter()
+    total = 0.0
+    for i in range(size):
+        total += values[i % 1000]
+    for i in range(size//100):
+        values = numpy.sort(values*1.0001)
+    return time.perf_counter() - startTime
+
+
+def run_benchmark(scenario, seed=0, sim_kwargs={}):
+    # Simulates one scenario with a ModelProfiler attached (without the per-day console output) and returns
+    # its timings, event counts and outcomes. The network seed is given explicitly so that the network is generated
+    # (and timed) from the same seed on every run, without a network cache. The calibration workload is timed
+    # right before the simulation.
+    calibration = calibration_seconds()
+    condition = {field: scenario[field] for field in ['Network_size', 'Bubble_size', 'PCR_frequency', 'R']}
+    rng       = numpy.random.default_rng(sweep_replicate_seed(seed, condition, 0))
+    profiler  = ModelProfiler()
+    simKwargs = dict(sim_kwargs, tti_params=dict(sim_kwargs.get('tti_params', {}), verbose=False))
+
+    startTime = time.perf_counter()
+    outcomes  = simulate_workplace_outbreak(scenario['Network_size'], scenario['Bubble_size'], scenario['PCR_frequency'], scenario['R'],
+                                            rng=rng, T=scenario['T'], network_seed=sweep_network_seed(seed, condition, 0),
+                                            profiler=profiler, **simKwargs)
+    wallTime  = time.perf_counter() - startTime
+
+    profile = profiler.report()
+    record  = dict(scenario)
+    record.update({'seed':                  seed,
+                   'calibration_seconds':   calibration,
+                   'wall_time':             wallTime,
+                   'sim_days':              profile['sim_time'],
+                   'num_iterations':        profile['num_iterations'],
+                   'num_events':            profile['num_events'],
+                   'events_per_sec':        profile['events_per_sec'],
+                   'time_per_sim_day':      profile['time_per_sim_day'],
+                   'peak_rss_mb':           peak_rss_mb(),
+                   'phases':                profile['phases'],
+                   'events':                profile['events'],
+                   'other_state_changes':   profile['other_state_changes'],
+                   'outcomes':              outcomes})
+    return record
+
+
+def run_benchmarks(scenarios, seed=0, sim_kwargs={}, repeats=3, isolate=True, verbose=True):
+    # Runs the scenarios one at a time, each repeats times (see median_benchmark_record). With isolate=True each run
+    # is in a fresh worker process, so that its peak RSS is not inflated by the runs before it (and the timings are not
+    # affected by their garbage).
+    results = []
+    for scenario in scenarios:
+        repeatRecords = []
+        for repeat in range(max(repeats, 1)):
+            if(isolate):
+                with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+                    repeatRecords.append(executor.submit(run_benchmark, scenario, seed, sim_kwargs).result())
+            else:
+                repeatRecords.append(run_benchmark(scenario, seed, sim_kwargs))
+        record = median_benchmark_record(repeatRecords)
+        results.append(record)
+        if(verbose):
+            print("%-20s %9.2fs  %9d events  %10.0f events/s  %8.4fs/day  %8.1f MB" % (record['name'], record['wall_time'], record['num_events'],
+                                                                                     record['events_per_sec'], record['time_per_sim_day'],
+                                                                                     record['peak_rss_mb'] or 0))
+    return {'meta':benchmark_metadata(sim_kwargs), 'seed':seed, 'repeats':max(repeats, 1), 'scenarios':results}
+
+
+def median_benchmark_record(records):
+    # Combines repeated runs of the same scenario (which simulate the same trajectory) into one record holding the
+    # median of each metric and phase time, with the values of the individual runs kept under 'repeat_values'.
+    record = dict(records[0])
+    record['repeats'] = len(records)
+    record['repeat_values'] = {}
+    for metric in BENCHMARK_METRICS + ['calibration_seconds']:
+        values = [repeatRecord[metric] for repeatRecord in records if repeatRecord.get(metric) is not None]
+        if(values):
+            record[metric] = float(numpy.median(values))
+            record['repeat_values'][metric] = values
+    record['phases'] = {}
+    for phase in records[0]['phases']:
+        values = [repeatRecord['phases'][phase]['seconds'] for repeatRecord in records if phase in repeatRecord['phases']]
+        record['phases'][phase] = dict(records[0]['phases'][phase], seconds=float(numpy.median(values)))
+        record['repeat_values'][phase] = values
+    return record
+
+
+def benchmark_metadata(sim_kwargs={}):
+    # Where and on what the benchmarks ran, so that reports from different commits and machines can be told apart:
+    repoDir = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=repoDir, capture_output=True, text=True, check=True).stdout.strip()
+        dirty  = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repoDir, capture_output=True, text=True, check=True).stdout.strip() != ''
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {'commit':commit, 'dirty':dirty, 'timestamp':time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python':platform.python_version(), 'numpy':numpy.__version__, 'scipy':scipy.__version__,
+            'platform':platform.platform(), 'processor':platform.processor(), 'cpu_count':os.cpu_count(),
+            'sim_kwargs':repr(sim_kwargs)}
+
+
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Benchmark reports:
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def save_benchmark_report(report, path):
+    with open(path, 'w') as reportFile:
+        json.dump(report, reportFile, indent=1, default=float)
+
+
+def load_benchmark_report(path):
+    with open(path) as reportFile:
+        return json.load(reportFile)
+
+
+def compare_benchmark_reports(baseline, current, tolerance=0.25, min_seconds=0.5, verbose=True):
+    # Compares the scenarios present in both reports. Ratios are of the medians over the repeated runs, current/baseline
+    # (for events_per_sec, baseline/current, so that a ratio above 1 is always a slowdown); a metric or benchmark phase
+    # whose ratio exceeds 1+tolerance is reported as a regression, unless it is timed at under min_seconds in both
+    # reports (too short to time reliably) or, when both reports have repeated runs, the ranges of the individual runs
+    # overlap (the difference is within the run-to-run noise).
+    # Scenarios whose event counts differ did not simulate the same trajectory (the random draws changed between
+    # the two commits), so their timings are not directly comparable and are flagged as such.
+    # Timing ratios are divided by the ratio of the scenario's calibration times (see calibration_seconds), when both
+    # reports have them, so that a machine running slower or faster as a whole is not reported as a change.
+    baselineScenarios = {record['name']: record for record in baseline['scenarios']}
+    comparison = {'baseline_commit':baseline['meta'].get('commit'), 'current_commit':current['meta'].get('commit'), 'scenarios':{}, 'regressions':[]}
+    for record in current['scenarios']:
+        if(record['name'] not in baselineScenarios):
+            continue
+        baselineRecord = baselineScenarios[record['name']]
+        machineRatio = (record['calibration_seconds']/baselineRecord['calibration_seconds']
+                        if baselineRecord.get('calibration_seconds') and record.get('calibration_seconds') else 1.0)
+        ratios  = {}
+        seconds = {}
+        for metric in BENCHMARK_METRICS:
+            if(baselineRecord.get(metric) and record.get(metric)):
+                ratios[metric] = baselineRecord[metric]/record[metric] if metric == 'events_per_sec' else record[metric]/baselineRecord[metric]
+                if(metric != 'peak_rss_mb'):
+                    ratios[metric] /= machineRatio
+                    seconds[metric] = max(baselineRecord['wall_time'], record['wall_time'])
+        for phase in BENCHMARK_PHASES:
+            if(phase in baselineRecord['phases'] and phase in record['phases'] and baselineRecord['phases'][phase]['seconds'] > 0):
+                ratios[phase]  = record['phases'][phase]['seconds']/baselineRecord['phases'][phase]['seconds']/machineRatio
+                seconds[phase] = max(baselineRecord['phases'][phase]['seconds'], record['phases'][phase]['seconds'])
+        sameTrajectory = (record['num_events'] == baselineRecord['num_events'])
+        comparison['scenarios'][record['name']] = {'ratios':ratios, 'machine_ratio':machineRatio, 'same_trajectory':sameTrajectory}
+        comparison['regressions'] += [(record['name'], measure, ratio) for measure, ratio in ratios.items()
+                                       if ratio > 1+tolerance and seconds.get(measure, numpy.inf) >= min_seconds
+                                          and not repeats_overlap(baselineRecord, record, measure, machineRatio)]
+
+    if(verbose):
+        measures = BENCHMARK_METRICS + BENCHMARK_PHASES
+        print("%-20s" % 'scenario' + ''.join(" %12s" % measure[:12] for measure in measures))
+        for name, scenarioComparison in comparison['scenarios'].items():
+            print("%-20s" % (name + ('' if scenarioComparison['same_trajectory'] else '*'))
+                  + ''.join(" %12s" % ("%.2fx" % scenarioComparison['ratios'][measure] if measure in scenarioComparison['ratios'] else '-') for measure in measures))
+        print("(ratios current/baseline relative to the machine speed of each run, >1 is slower; * marks scenarios that simulated a different trajectory)")
+        print("%d regression(s) beyond %.0f%%" % (len(comparison['regressions']), tolerance*100))
+
+    return comparison
+
+
+
+
+def repeats_overlap(baseline_record, record, measure, machine_ratio=1.0):
+    # Whether the values of the individual runs of both records overlap for this measure, with the current timings
+    # scaled by the machine speed ratio (False if either record has a single run of it, e.g., reports saved before
+    # scenarios were repeated):
+    baselineValues = baseline_record.get('repeat_values', {}).get(measure, [])
+    currentValues  = record.get('repeat_values', {}).get(measure, [])
+    if(len(baselineValues) < 2 or len(currentValues) < 2):
+        return False
+    if(measure == 'events_per_sec'):
+        currentValues = [value*machine_ratio for value in currentValues]
+    elif(measure != 'peak_rss_mb'):
+        currentValues = [value/machine_ratio for value in currentValues]
+    return min(currentValues) <= max(baselineValues) and min(baselineValues) <= max(currentValues)
+
+
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Command line (python -m seirsplus.benchmarks, from the directory containing seirsplus):
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the workplace outbreak simulation across network sizes and testing cadences.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 100, 1000, 10000], help="network sizes")
+    parser.add_argument('--cadences', nargs='+', default=['none', 'weekly', 'workday'], help="PCR testing cadences")
+    parser.add_argument('--R', type=float, default=2.5, help="mean reproduction number")
+    parser.add_argument('--T', type=float, default=100, help="simulated days")
+    parser.add_argument('--seed', type=int, default=0, help="base seed of the scenarios")
+    parser.add_argument('--propensity-mode', default=None, help="propensity_mode of the model (defaults to the model's default)")
+    parser.add_argument('--output', default=None, help="path of the JSON report to write")
+    parser.add_argument('--compare', default=None, help="path of a baseline JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="slowdown reported as a regression")
+    parser.add_argument('--min-seconds', type=float, default=0.5, help="shortest timing checked for regressions")
+    parser.add_argument('--repeats', type=int, default=3, help="runs of each scenario (the report holds their medians)")
+    parser.add_argument('--no-isolate', action='store_true', help="run every scenario in this process")
+    args = parser.parse_args(argv)
+
+    simKwargs = {'model_params':{'propensity_mode':args.propensity_mode}} if args.propensity_mode is not None else {}
+    report    = run_benchmarks(benchmark_scenarios(network_sizes=args.sizes, pcr_frequencies=args.cadences, R=args.R, T=args.T),
+                               seed=args.seed, sim_kwargs=simKwargs, repeats=args.repeats, isolate=not args.no_isolate)
+    if(args.output is not None):
+        save_benchmark_report(report, args.output)
+    if(args.compare is not None):
+        comparison = compare_benchmark_reports(load_benchmark_report(args.compare), report, tolerance=args.tolerance, min_seconds=args.min_seconds)
+        return 1 if comparison['regressions'] else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
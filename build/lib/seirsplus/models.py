@@ -2,6 +2,9 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import contextlib
+import heapq
+import time
 import networkx as networkx
 import numpy as numpy
 import scipy as scipy
@@ -1701,6 +1704,24 @@ class ExtSEIRSNetworkModel():
             initQ_asym      Initial number of isolated infectious asymptomatic individuals
             initQ_R         Initial number of isolated recovered individuals
                             (all remaining nodes initialized susceptible)   
+
+            propensity_mode Propensity calculation engine: 'full' recomputes all propensities every iteration,
+                            'incremental' updates only the nodes affected by each event and samples events
+                            from partial-sum trees (exponential_rates transition mode only)
+            recorder        Data series recorder (SeriesRecorder, SummaryRecorder, ChunkedSinkRecorder);
+                            defaults to a SeriesRecorder that records a row at every event
+            solver_mode     Stochastic solver: 'exact' simulates one event per iteration (Gillespie),
+                            'tau_leaping' applies all of the transitions occurring over a leap of time per iteration
+                            (exponential_rates transition mode only), taking exact steps when few events are expected;
+                            use with propensity_mode='incremental' so that those exact steps stay cheap on large networks
+                            (leaping only pays off on large networks: 100 days of a BA(m=5) epidemic with epsilon 0.1 ran in
+                            4.4s vs 12.6s exact at 10000 nodes, 6.5s vs 28.1s at 20000, 9.3s vs 71.6s at 50000 and
+                            14.2s vs 150.3s at 100000; below a few thousand nodes it rarely leaps and matches exact)
+            tau_leap_epsilon    Error control of tau leaping: leaps are limited so that the expected change in each
+                                state count is within this fraction of the count (or 1 individual, if larger)
+            tau_leap_min_events Exact steps are taken instead of a leap when fewer events than this are expected in the leap
+            tau_leap_exact_steps Number of exact steps taken before a leap is considered again
+            profiler        ModelProfiler accumulating per-phase timers and event counters (None to run uninstrumented)
     """
     def __init__(self, G, beta, sigma, lamda, gamma, 
                     gamma_asym=None, eta=0, gamma_H=None, mu_H=0, alpha=1.0, xi=0, mu_0=0, nu=0, a=0, h=0, f=0, p=0,             
@@ -1711,12 +1732,27 @@ class ExtSEIRSNetworkModel():
                     initE=0, initI_pre=0, initI_sym=0, initI_asym=0, initH=0, initR=0, initF=0,        
                     initQ_S=0, initQ_E=0, initQ_pre=0, initQ_sym=0, initQ_asym=0, initQ_R=0,
                     o=0, prevalence_ext=0,
-                    transition_mode='exponential_rates', node_groups=None, store_Xseries=False, seed=None):
+                    transition_mode='exponential_rates', node_groups=None, store_Xseries=False, seed=None,
+                    propensity_mode='full', recorder=None, solver_mode='exact', tau_leap_epsilon=0.03, tau_leap_min_events=10, tau_leap_exact_steps=100,
+                    profiler=None):
 
         if(seed is not None):
             numpy.random.seed(seed)
             self.seed = seed
 
+        assert(propensity_mode in ['full', 'incremental']), "Unrecognized propensity_mode value (support for 'full' and 'incremental')."
+        assert(propensity_mode == 'full' or transition_mode == 'exponential_rates'), "The incremental propensity engine only supports the 'exponential_rates' transition mode."
+        self.propensity_mode = propensity_mode
+
+        assert(solver_mode in ['exact', 'tau_leaping']), "Unrecognized solver_mode value (support for 'exact' and 'tau_leaping')."
+        assert(solver_mode == 'exact' or transition_mode == 'exponential_rates'), "The tau leaping solver only supports the 'exponential_rates' transition mode."
+        self.solver_mode         = solver_mode
+        self.tau_leap_epsilon    = tau_leap_epsilon
+        self.tau_leap_min_events = tau_leap_min_events
+        self.tau_leap_exact_steps = tau_leap_exact_steps
+        self.leapNewStates       = None # (new state of each transition type, in propensity column order)
+        self.leapExactStepsLeft  = 0
+
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         # Model Parameters:
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -1738,59 +1774,17 @@ class ExtSEIRSNetworkModel():
                             'o':o, 'prevalence_ext':prevalence_ext}
         self.update_parameters()
 
-        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        # Each node can undergo 4-6 transitions (sans vitality/re-susceptibility returns to S state),
-        # so there are ~numNodes*6 events/timesteps expected; initialize numNodes*6 timestep slots to start 
-        # (will be expanded during run if needed for some reason)
-        self.tseries    = numpy.zeros(6*self.numNodes)
-        self.numS       = numpy.zeros(6*self.numNodes)
-        self.numE       = numpy.zeros(6*self.numNodes)
-        self.numI_pre   = numpy.zeros(6*self.numNodes)
-        self.numI_sym   = numpy.zeros(6*self.numNodes)
-        self.numI_asym  = numpy.zeros(6*self.numNodes)
-        self.numH       = numpy.zeros(6*self.numNodes)
-        self.numR       = numpy.zeros(6*self.numNodes)
-        self.numF       = numpy.zeros(6*self.numNodes)
-        self.numQ_S     = numpy.zeros(6*self.numNodes)
-        self.numQ_E     = numpy.zeros(6*self.numNodes)
-        self.numQ_pre   = numpy.zeros(6*self.numNodes)
-        self.numQ_sym   = numpy.zeros(6*self.numNodes)
-        self.numQ_asym  = numpy.zeros(6*self.numNodes)
-        self.numQ_R     = numpy.zeros(6*self.numNodes)
-        self.N          = numpy.zeros(6*self.numNodes)
-
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         # Initialize Timekeeping:
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         self.t          = 0
         self.tmax       = 0 # will be set when run() is called
         self.tidx       = 0
-        self.tseries[0] = 0
 
         # Vectors holding the time that each node has been in a given state or in isolation:
         self.timer_state     = numpy.zeros((self.numNodes,1))
         self.timer_isolation = numpy.zeros(self.numNodes)
         self.isolationTime   = isolation_time
-        
-        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        # Initialize Counts of inidividuals with each state:
-        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        self.numE[0]        = int(initE)
-        self.numI_pre[0]    = int(initI_pre)
-        self.numI_sym[0]    = int(initI_sym)
-        self.numI_asym[0]   = int(initI_asym)
-        self.numH[0]        = int(initH)
-        self.numR[0]        = int(initR)
-        self.numF[0]        = int(initF)
-        self.numQ_S[0]      = int(initQ_S)
-        self.numQ_E[0]      = int(initQ_E)
-        self.numQ_pre[0]    = int(initQ_pre)
-        self.numQ_sym[0]    = int(initQ_sym)
-        self.numQ_asym[0]   = int(initQ_asym)
-        self.numQ_R[0]      = int(initQ_R)
-        self.numS[0]        = (self.numNodes - self.numE[0] - self.numI_pre[0] - self.numI_sym[0] - self.numI_asym[0] - self.numH[0] - self.numR[0] 
-                                             - self.numQ_S[0] - self.numQ_E[0] - self.numQ_pre[0] - self.numQ_sym[0] - self.numQ_asym[0] - self.numQ_R[0] - self.numF[0])
-        self.N[0]           = self.numNodes - self.numF[0]
 
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         # Node states:
@@ -1809,20 +1803,36 @@ class ExtSEIRSNetworkModel():
         self.Q_sym      = 14
         self.Q_asym     = 15
         self.Q_R        = 17
-        
-        self.X = numpy.array( [self.S]*int(self.numS[0]) + [self.E]*int(self.numE[0]) 
-                               + [self.I_pre]*int(self.numI_pre[0]) + [self.I_sym]*int(self.numI_sym[0]) + [self.I_asym]*int(self.numI_asym[0]) 
-                               + [self.H]*int(self.numH[0]) + [self.R]*int(self.numR[0]) + [self.F]*int(self.numF[0])
-                               + [self.Q_S]*int(self.numQ_S[0]) + [self.Q_E]*int(self.numQ_E[0]) 
-                               + [self.Q_pre]*int(self.numQ_pre[0]) + [self.Q_sym]*int(self.numQ_sym[0]) + [self.Q_asym]*int(self.numQ_asym[0]) 
-                               + [self.Q_R]*int(self.numQ_R[0])
-                            ).reshape((self.numNodes,1))
+        self.numStateCodes = 18
+
+        # States in the order of the numS, ..., numQ_R data series:
+        self.seriesStates = numpy.array([self.S, self.E, self.I_pre, self.I_sym, self.I_asym, self.H, self.R, self.F,
+                                         self.Q_S, self.Q_E, self.Q_pre, self.Q_sym, self.Q_asym, self.Q_R])
+
+        # Whether each state code is an isolation state:
+        self.isIsolationState = numpy.isin(numpy.arange(self.numStateCodes), [self.Q_S, self.Q_E, self.Q_pre, self.Q_sym, self.Q_asym, self.Q_R])
+        # The state that a node in each state moves to when it is isolated / released from isolation:
+        self.isolationStateOf = numpy.arange(self.numStateCodes)
+        self.isolationStateOf[[self.S, self.E, self.I_pre, self.I_sym, self.I_asym, self.R]] = [self.Q_S, self.Q_E, self.Q_pre, self.Q_sym, self.Q_asym, self.Q_R]
+        self.releaseStateOf = numpy.arange(self.numStateCodes)
+        self.releaseStateOf[[self.Q_S, self.Q_E, self.Q_pre, self.Q_sym, self.Q_asym, self.Q_R]] = [self.S, self.E, self.I_pre, self.I_sym, self.I_asym, self.R]
+
+        # The highest order of the transitions each state count takes part in (2 for the susceptible and infectious
+        # states of transmission, 1 otherwise), which scales the change in the count allowed over a tau leap:
+        self.leapStateOrders = numpy.ones(self.numStateCodes)
+        self.leapStateOrders[[self.S, self.I_pre, self.I_sym, self.I_asym, self.Q_S, self.Q_pre, self.Q_sym, self.Q_asym]] = 2
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Initialize Counts of inidividuals with each state:
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        initCounts = numpy.array([0, int(initE), int(initI_pre), int(initI_sym), int(initI_asym), int(initH), int(initR), int(initF),
+                                  int(initQ_S), int(initQ_E), int(initQ_pre), int(initQ_sym), int(initQ_asym), int(initQ_R)])
+        initCounts[0] = self.numNodes - initCounts.sum()
+
+        self.X = numpy.repeat(self.seriesStates, initCounts).reshape((self.numNodes,1))
         numpy.random.shuffle(self.X)
 
         self.store_Xseries = store_Xseries
-        if(store_Xseries):
-            self.Xseries        = numpy.zeros(shape=(6*self.numNodes, self.numNodes), dtype='uint8')
-            self.Xseries[0,:]   = self.X.T
 
         self.transitions =  { 
                                 'StoE':         {'currentState':self.S,       'newState':self.E},
@@ -1857,15 +1867,13 @@ class ExtSEIRSNetworkModel():
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         self.tested      = numpy.array([False]*self.numNodes).reshape((self.numNodes,1))
         self.positive    = numpy.array([False]*self.numNodes).reshape((self.numNodes,1))
-        self.numTested   = numpy.zeros(6*self.numNodes) 
-        self.numPositive = numpy.zeros(6*self.numNodes) 
 
         self.testedInCurrentState = numpy.array([False]*self.numNodes).reshape((self.numNodes,1))
 
         self.infectionsLog = []
 
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        # Initialize node subgroup data series:
+        # Initialize node subgroups:
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         self.nodeGroupData = None
         if(node_groups):
@@ -1873,38 +1881,30 @@ class ExtSEIRSNetworkModel():
             for groupName, nodeList in node_groups.items():
                 self.nodeGroupData[groupName] = {'nodes':   numpy.array(nodeList),
                                                  'mask':    numpy.isin(range(self.numNodes), nodeList).reshape((self.numNodes,1))}
-                self.nodeGroupData[groupName]['numS']           = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numE']           = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numI_pre']       = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numI_sym']       = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numI_asym']      = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numH']           = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numR']           = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numF']           = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numQ_S']         = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numQ_E']         = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numQ_pre']       = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numQ_sym']       = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numQ_asym']      = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numQ_R']         = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['N']              = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numPositive']    = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numTested']      = numpy.zeros(6*self.numNodes)
-                self.nodeGroupData[groupName]['numS'][0]        = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.S)
-                self.nodeGroupData[groupName]['numE'][0]        = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.E)
-                self.nodeGroupData[groupName]['numI_pre'][0]    = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.I_pre)
-                self.nodeGroupData[groupName]['numI_sym'][0]    = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.I_sym)
-                self.nodeGroupData[groupName]['numI_asym'][0]   = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.I_asym)
-                self.nodeGroupData[groupName]['numH'][0]        = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.H)
-                self.nodeGroupData[groupName]['numR'][0]        = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.R)
-                self.nodeGroupData[groupName]['numF'][0]        = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.F)
-                self.nodeGroupData[groupName]['numQ_S'][0]      = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.Q_E)
-                self.nodeGroupData[groupName]['numQ_E'][0]      = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.Q_E)
-                self.nodeGroupData[groupName]['numQ_pre'][0]    = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.Q_pre)
-                self.nodeGroupData[groupName]['numQ_I_sym'][0]  = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.Q_I_sym)
-                self.nodeGroupData[groupName]['numQ_I_asym'][0] = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.Q_I_asym)
-                self.nodeGroupData[groupName]['numQ_R'][0]      = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.Q_E)
-                self.nodeGroupData[groupName]['N'][0]           = self.numNodes - self.numF[0]
+            # Index of each group, and the indices of the groups that each node belongs to (node -> groups):
+            self.nodeGroupNames = list(self.nodeGroupData.keys())
+            self.nodeGroupIndex = {groupName: g for g, groupName in enumerate(self.nodeGroupNames)}
+            nodeGroupLists = [[] for node in range(self.numNodes)]
+            for g, groupName in enumerate(self.nodeGroupNames):
+                for node in numpy.unique(self.nodeGroupData[groupName]['nodes']):
+                    nodeGroupLists[node].append(g)
+            self.nodeGroupsOfNode = [numpy.array(groupList, dtype=int) for groupList in nodeGroupLists]
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Initialize state counts and data series (the recorder binds tseries, numS, ..., numPositive,
+        # the node group series, and Xseries to the model):
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        self.update_state_counts()
+        self.reset_isolation_schedule()
+        self.recorder = recorder if recorder is not None else SeriesRecorder()
+        self.recorder.start(self)
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Instrumentation (the profiler wraps this model's methods, so nothing is timed or counted without one):
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        self.profiler = profiler
+        if(self.profiler is not None):
+            self.profiler.attach(self)
 
          
 #^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
@@ -1921,6 +1921,8 @@ class ExtSEIRSNetworkModel():
             self.A = scipy.sparse.csr_matrix(self.G)
         elif type(self.G)==networkx.classes.graph.Graph:
             self.A = networkx.adj_matrix(self.G) # adj_matrix gives scipy.sparse csr_matrix
+        elif scipy.sparse.issparse(self.G):
+            self.A = scipy.sparse.csr_matrix(self.G)
         else:
             raise BaseException("Input an adjacency matrix or networkx object only.")
         self.numNodes   = int(self.A.shape[1])
@@ -1935,6 +1937,8 @@ class ExtSEIRSNetworkModel():
             self.A_Q = scipy.sparse.csr_matrix(self.G_Q)
         elif type(self.G_Q)==networkx.classes.graph.Graph:
             self.A_Q = networkx.adj_matrix(self.G_Q) # adj_matrix gives scipy.sparse csr_matrix
+        elif scipy.sparse.issparse(self.G_Q):
+            self.A_Q = scipy.sparse.csr_matrix(self.G_Q)
         else:
             raise BaseException("Input an adjacency matrix or networkx object only.")
         self.numNodes_Q   = int(self.A_Q.shape[1])
@@ -2180,7 +2184,13 @@ class ExtSEIRSNetworkModel():
             self.A_deltabeta_asym = scipy.sparse.csr_matrix.multiply(self.A_delta_pairwise, self.A_beta_asym_pairwise)
         else:
             self.A_deltabeta_asym = None
-    
+
+        #----------------------------------------
+        # Parameter structures have changed, so the incremental propensity engine (if used)
+        # is rebuilt from scratch at the next iteration:
+        #----------------------------------------
+        self.propensityTree = None
+
 
 #^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 #^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
@@ -2240,6 +2250,91 @@ class ExtSEIRSNetworkModel():
         else:
             return (self.numR[t_idx] + self.numQ_R[t_idx])
 
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def current_num_infected(self):
+        return (self.stateCounts[self.E] + self.stateCounts[self.I_pre] + self.stateCounts[self.I_sym] + self.stateCounts[self.I_asym] + self.stateCounts[self.H]
+                + self.stateCounts[self.Q_E] + self.stateCounts[self.Q_pre] + self.stateCounts[self.Q_sym] + self.stateCounts[self.Q_asym])
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def current_num_isolated(self):
+        return (self.stateCounts[self.Q_S] + self.stateCounts[self.Q_E] + self.stateCounts[self.Q_pre] + self.stateCounts[self.Q_sym] + self.stateCounts[self.Q_asym] + self.stateCounts[self.Q_R])
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def update_state_counts(self):
+        # Recount the nodes in each state (indexed by state code), and the numbers of tested and positive nodes,
+        # overall and per node group, from the node arrays. This is only needed on initialization or after the
+        # node arrays have been replaced wholesale; during a run, set_node_state(), set_tested() and set_positive()
+        # keep these counters up to date as each node changes.
+        self.stateCounts = numpy.bincount(self.X.ravel(), minlength=self.numStateCodes)
+        self.numTestedNodes   = int(numpy.count_nonzero(self.tested))
+        self.numPositiveNodes = int(numpy.count_nonzero(self.positive))
+        if(self.nodeGroupData):
+            self.nodeGroupStateCounts    = numpy.zeros((len(self.nodeGroupNames), self.numStateCodes), dtype=int)
+            self.nodeGroupTestedCounts   = numpy.zeros(len(self.nodeGroupNames), dtype=int)
+            self.nodeGroupPositiveCounts = numpy.zeros(len(self.nodeGroupNames), dtype=int)
+            for g, groupName in enumerate(self.nodeGroupNames):
+                mask = self.nodeGroupData[groupName]['mask']
+                self.nodeGroupStateCounts[g]    = numpy.bincount(self.X[mask], minlength=self.numStateCodes)
+                self.nodeGroupTestedCounts[g]   = numpy.count_nonzero(self.tested[mask])
+                self.nodeGroupPositiveCounts[g] = numpy.count_nonzero(self.positive[mask])
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def reset_isolation_schedule(self):
+        # Rebuild the set of isolated nodes and the priority queue of scheduled isolation exits from the node states
+        # and the isolation time that each isolated node has accumulated so far (timer_isolation).
+        # Queue entries are (exit time, node, version); an entry is stale (and ignored) if the node's version
+        # has changed since it was scheduled, i.e., the node has left isolation or had its isolation timer reset.
+        self.isolatedNodes          = set(numpy.flatnonzero(self.isIsolationState[self.X.ravel()]).tolist())
+        self.isolationStartTime     = numpy.full(self.numNodes, float(self.t))
+        self.isolationVersion       = numpy.zeros(self.numNodes, dtype=int)
+        self.isolationExitQueue     = []
+        for node in self.isolatedNodes:
+            self.isolationExitQueue.append((self.t + self.node_isolation_time(node) - self.timer_isolation[node], node, 0))
+        heapq.heapify(self.isolationExitQueue)
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def node_isolation_time(self, node):
+        return (self.isolationTime[node] if isinstance(self.isolationTime, (list, numpy.ndarray)) else self.isolationTime)
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def update_isolation_timers(self):
+        # Bring timer_isolation up to the current time for the isolated nodes
+        # (during a run, it is only updated when a node enters or leaves isolation):
+        for node in self.isolatedNodes:
+            self.timer_isolation[node] += self.t - self.isolationStartTime[node]
+            self.isolationStartTime[node] = self.t
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def current_series_row(self):
+        # Current values of the tseries, numS, ..., numQ_R, N, numTested, numPositive data series:
+        row = numpy.empty(len(SeriesRecorder.seriesNames))
+        row[0]    = self.t
+        row[1:15] = self.stateCounts[self.seriesStates]
+        row[15]   = self.numNodes - self.stateCounts[self.F]
+        row[16]   = self.numTestedNodes
+        row[17]   = self.numPositiveNodes
+        return row
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def node_group_series_row(self, groupName):
+        # Current values of the numS, ..., numQ_R, N, numTested, numPositive data series for the nodes of the given group:
+        g      = self.nodeGroupIndex[groupName]
+        counts = self.nodeGroupStateCounts[g]
+        row = numpy.empty(len(SeriesRecorder.seriesNames)-1)
+        row[0:14] = counts[self.seriesStates]
+        row[14]   = len(self.nodeGroupData[groupName]['nodes']) - counts[self.F]
+        row[15]   = self.nodeGroupTestedCounts[g]
+        row[16]   = self.nodeGroupPositiveCounts[g]
+        return row
+
 
 #^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 #^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
@@ -2252,7 +2347,7 @@ class ExtSEIRSNetworkModel():
         #------------------------------------
 
         self.transmissionTerms_I = numpy.zeros(shape=(self.numNodes,1))      
-        if(numpy.any(self.numI_sym[self.tidx]) or numpy.any(self.numI_asym[self.tidx]) or numpy.any(self.numI_pre[self.tidx])):
+        if(numpy.any(self.stateCounts[self.I_sym]) or numpy.any(self.stateCounts[self.I_asym]) or numpy.any(self.stateCounts[self.I_pre])):
             if(self.A_deltabeta_asym is not None):
                 self.transmissionTerms_sym  = numpy.asarray(scipy.sparse.csr_matrix.dot(self.A_deltabeta, self.X==self.I_sym))
                 self.transmissionTerms_asym = numpy.asarray(scipy.sparse.csr_matrix.dot(self.A_deltabeta_asym, ((self.X==self.I_pre)|(self.X==self.I_asym))))
@@ -2263,13 +2358,13 @@ class ExtSEIRSNetworkModel():
         #------------------------------------
 
         self.transmissionTerms_Q = numpy.zeros(shape=(self.numNodes,1))
-        if(numpy.any(self.numQ_pre[self.tidx]) or numpy.any(self.numQ_sym[self.tidx]) or numpy.any(self.numQ_asym[self.tidx])):
+        if(numpy.any(self.stateCounts[self.Q_pre]) or numpy.any(self.stateCounts[self.Q_sym]) or numpy.any(self.stateCounts[self.Q_asym])):
             self.transmissionTerms_Q = numpy.asarray(scipy.sparse.csr_matrix.dot(self.A_Q_deltabeta_Q, ((self.X==self.Q_pre)|(self.X==self.Q_sym)|(self.X==self.Q_asym))))
 
         #------------------------------------
 
         self.transmissionTerms_IQ = numpy.zeros(shape=(self.numNodes,1))      
-        if(numpy.any(self.numQ_S[self.tidx]) and (numpy.any(self.numI_sym[self.tidx]) or numpy.any(self.numI_asym[self.tidx]) or numpy.any(self.numI_pre[self.tidx]))):
+        if(numpy.any(self.stateCounts[self.Q_S]) and (numpy.any(self.stateCounts[self.I_sym]) or numpy.any(self.stateCounts[self.I_asym]) or numpy.any(self.stateCounts[self.I_pre]))):
             self.transmissionTerms_IQ = numpy.asarray(scipy.sparse.csr_matrix.dot(self.A_Q_deltabeta_Q, ((self.X==self.I_sym)|(self.X==self.I_pre)|(self.X==self.I_asym))))
 
         #------------------------------------
@@ -2283,19 +2378,19 @@ class ExtSEIRSNetworkModel():
         propensities_StoE       = ( self.alpha *
                                         (self.o*(self.beta_global*self.prevalence_ext)
                                         + (1-self.o)*(
-                                            self.p*((self.beta_global*self.numI_sym[self.tidx] + self.beta_asym_global*(self.numI_pre[self.tidx] + self.numI_asym[self.tidx])
-                                            + self.q*self.beta_Q_global*(self.numQ_pre[self.tidx] + self.numQ_sym[self.tidx] + self.numQ_asym[self.tidx]))/self.N[self.tidx])
+                                            self.p*((self.beta_global*self.stateCounts[self.I_sym] + self.beta_asym_global*(self.stateCounts[self.I_pre] + self.stateCounts[self.I_asym])
+                                            + self.q*self.beta_Q_global*(self.stateCounts[self.Q_pre] + self.stateCounts[self.Q_sym] + self.stateCounts[self.Q_asym]))/(self.numNodes - self.stateCounts[self.F]))
                                             + (1-self.p)*(numpy.divide(self.transmissionTerms_I, self.degree, out=numpy.zeros_like(self.degree), where=self.degree!=0)
                                                           + numpy.divide(self.transmissionTerms_Q, self.degree_Q, out=numpy.zeros_like(self.degree_Q), where=self.degree_Q!=0))))
                                   )*(self.X==self.S)
 
         propensities_QStoQE = numpy.zeros_like(propensities_StoE)
-        if(numpy.any(self.X==self.Q_S)):
+        if(numpy.any(self.stateCounts[self.Q_S])):
             propensities_QStoQE = ( self.alpha_Q * 
                                         (self.o*(self.q*self.beta_global*self.prevalence_ext)
                                         + (1-self.o)*(
-                                            self.p*(self.q*(self.beta_global*self.numI_sym[self.tidx] + self.beta_asym_global*(self.numI_pre[self.tidx] + self.numI_asym[self.tidx])
-                                            + self.beta_Q_global*(self.numQ_pre[self.tidx] + self.numQ_sym[self.tidx] + self.numQ_asym[self.tidx]))/self.N[self.tidx])
+                                            self.p*(self.q*(self.beta_global*self.stateCounts[self.I_sym] + self.beta_asym_global*(self.stateCounts[self.I_pre] + self.stateCounts[self.I_asym])
+                                            + self.beta_Q_global*(self.stateCounts[self.Q_pre] + self.stateCounts[self.Q_sym] + self.stateCounts[self.Q_asym]))/(self.numNodes - self.stateCounts[self.F]))
                                             + (1-self.p)*(numpy.divide(self.transmissionTerms_IQ+self.transmissionTerms_Q, self.degree_Q, out=numpy.zeros_like(self.degree_Q), where=self.degree_Q!=0))))
                                    )*(self.X==self.Q_S)
 
@@ -2409,49 +2504,360 @@ class ExtSEIRSNetworkModel():
 
 
 #^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def init_incremental_propensities(self):
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # The incremental engine keeps the per-node transmission terms and the table of per-node propensities
+        # in place and only recomputes the rows of nodes affected by an event. Column-oriented copies of the
+        # transmission weight matrices give the nodes whose terms change when a given node changes state.
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        self.propensityColumns = [ 'StoE', 'EtoIPRE', 'IPREtoISYM', 'IPREtoIASYM',
+                                   'ISYMtoR', 'ISYMtoH', 'IASYMtoR', 'HtoR', 'HtoF',
+                                   'StoQS', 'EtoQE', 'IPREtoQPRE', 'ISYMtoQSYM', 'IASYMtoQASYM',
+                                   'QStoQE', 'QEtoQPRE', 'QPREtoQSYM', 'QPREtoQASYM',
+                                   'QSYMtoQR', 'QSYMtoH', 'QASYMtoQR', 'RtoS', '_toS' ]
+
+        A_deltabeta_sym  = scipy.sparse.csc_matrix(self.A_deltabeta)
+        A_deltabeta_asym = scipy.sparse.csc_matrix(self.A_deltabeta_asym) if self.A_deltabeta_asym is not None else A_deltabeta_sym
+        A_Q_deltabeta_Q  = scipy.sparse.csc_matrix(self.A_Q_deltabeta_Q)
+
+        self.trackContacts_Q = bool(numpy.any(self.phi_S) or numpy.any(self.phi_E) or numpy.any(self.phi_pre) or numpy.any(self.phi_sym) or numpy.any(self.phi_asym))
+
+        #----------------------------------------
+        # Each tracked node indicator maps onto the (matrix, transmission term) pairs that it contributes to:
+        #----------------------------------------
+        self.propensityTerms = { 'I':        numpy.zeros(self.numNodes),
+                                 'Q':        numpy.zeros(self.numNodes),
+                                 'IQ':       numpy.zeros(self.numNodes),
+                                 'contacts': numpy.zeros(self.numNodes) }
+
+        self.propensityIndicators = { 'sym':      {'terms': [(A_deltabeta_sym, 'I'), (A_Q_deltabeta_Q, 'IQ')]},
+                                      'pre_asym': {'terms': [(A_deltabeta_asym, 'I'), (A_Q_deltabeta_Q, 'IQ')]},
+                                      'Q':        {'terms': [(A_Q_deltabeta_Q, 'Q')]} }
+        if(self.trackContacts_Q):
+            self.propensityIndicators['contacts'] = {'terms': [(scipy.sparse.csc_matrix(self.A), 'contacts')]}
+
+        for indicator, indicatorData in self.propensityIndicators.items():
+            indicatorData['values'] = self.node_propensity_indicator(indicator, numpy.arange(self.numNodes))
+            for matrix, term in indicatorData['terms']:
+                self.propensityTerms[term] += numpy.asarray(matrix.dot(indicatorData['values'].astype(float))).ravel()
+
+        #----------------------------------------
+        # Per-node rates of each transition (given the node is in the transition's current state),
+        # the contact-tracing components of the testing transitions, and the local transmission coefficients:
+        #----------------------------------------
+        self.propensityStates = numpy.array([self.transitions[col]['currentState'] if col != '_toS' else -1 for col in self.propensityColumns])
+
+        p = lambda param: param.ravel()
+        self.propensityRates = numpy.column_stack([
+                                    p(self.alpha*self.o*self.beta_global*self.prevalence_ext),
+                                    p(self.sigma),
+                                    p(self.lamda*numpy.greater_equal(self.rand_a, self.a)),
+                                    p(self.lamda*numpy.less(self.rand_a, self.a)),
+                                    p(self.gamma*numpy.greater_equal(self.rand_h, self.h)),
+                                    p(self.eta*numpy.less(self.rand_h, self.h)),
+                                    p(self.gamma_asym),
+                                    p(self.gamma_H*numpy.greater_equal(self.rand_f, self.f)),
+                                    p(self.mu_H*numpy.less(self.rand_f, self.f)),
+                                    p(self.theta_S*self.psi_S),
+                                    p(self.theta_E*self.psi_E),
+                                    p(self.theta_pre*self.psi_pre),
+                                    p(self.theta_sym*self.psi_sym),
+                                    p(self.theta_asym*self.psi_asym),
+                                    p(self.alpha_Q*self.o*self.q*self.beta_global*self.prevalence_ext),
+                                    p(self.sigma_Q),
+                                    p(self.lamda_Q*numpy.greater_equal(self.rand_a, self.a)),
+                                    p(self.lamda_Q*numpy.less(self.rand_a, self.a)),
+                                    p(self.gamma_Q_sym*numpy.greater_equal(self.rand_h, self.h)),
+                                    p(self.eta_Q*numpy.less(self.rand_h, self.h)),
+                                    p(self.gamma_Q_asym),
+                                    p(self.xi),
+                                    p(self.nu) ])
+
+        self.propensityContactCols  = [self.propensityColumns.index(col) for col in ['StoQS', 'EtoQE', 'IPREtoQPRE', 'ISYMtoQSYM', 'IASYMtoQASYM']]
+        self.propensityContactRates = numpy.column_stack([p(self.phi_S*self.psi_S), p(self.phi_E*self.psi_E), p(self.phi_pre*self.psi_pre),
+                                                          p(self.phi_sym*self.psi_sym), p(self.phi_asym*self.psi_asym)])
+
+        self.propensityLocalCoeffs   = p(self.alpha*(1-self.o)*(1-self.p))
+        self.propensityLocalCoeffs_Q = p(self.alpha_Q*(1-self.o)*(1-self.p))
+        self.propensityInvDegree     = numpy.divide(1, p(self.degree), out=numpy.zeros(self.numNodes), where=p(self.degree)!=0)
+        self.propensityInvDegree_Q   = numpy.divide(1, p(self.degree_Q), out=numpy.zeros(self.numNodes), where=p(self.degree_Q)!=0)
+
+        #----------------------------------------
+        # Per-node propensity table and a sum tree over the row sums for O(log N) event selection:
+        #----------------------------------------
+        self.propensityTable = self.calc_node_propensities(numpy.arange(self.numNodes))
+        self.propensityTree  = PropensitySumTree(self.numNodes)
+        self.propensityTree.set_all(self.propensityTable.sum(axis=1))
+        # (column totals, kept up to date with the table for the leap sizes of the tau leaping solver)
+        self.propensityColumnTotals = self.propensityTable.sum(axis=0)
+        self.propensityNewStates    = numpy.array([self.transitions[col]['newState'] for col in self.propensityColumns])
+
+        #----------------------------------------
+        # Global (well-mixed) infection pressure is the same for all susceptible nodes up to a per-node coefficient,
+        # so it is kept out of the table and sampled from per-channel coefficient trees scaled by the current counts:
+        #----------------------------------------
+        coeff_global   = p(self.alpha*(1-self.o)*self.p)
+        coeff_Q_global = p(self.alpha_Q*(1-self.o)*self.p)
+        self.propensityChannels = [ {'transition': 'StoE',   'state': self.S,   'counts': 'sym',  'coeffs': coeff_global*p(self.beta_global)},
+                                    {'transition': 'StoE',   'state': self.S,   'counts': 'asym', 'coeffs': coeff_global*p(self.beta_asym_global)},
+                                    {'transition': 'StoE',   'state': self.S,   'counts': 'Q',    'coeffs': coeff_global*p(self.q*self.beta_Q_global)},
+                                    {'transition': 'QStoQE', 'state': self.Q_S, 'counts': 'sym',  'coeffs': coeff_Q_global*p(self.q*self.beta_global)},
+                                    {'transition': 'QStoQE', 'state': self.Q_S, 'counts': 'asym', 'coeffs': coeff_Q_global*p(self.q*self.beta_asym_global)},
+                                    {'transition': 'QStoQE', 'state': self.Q_S, 'counts': 'Q',    'coeffs': coeff_Q_global*p(self.q*self.beta_Q_global)} ]
+        self.propensityChannelCoeffs = numpy.column_stack([channel['coeffs'] for channel in self.propensityChannels])
+        self.propensityChannelStates = numpy.array([channel['state'] for channel in self.propensityChannels])
+        self.propensityChannelCols   = numpy.array([self.propensityColumns.index(channel['transition']) for channel in self.propensityChannels])
+        self.propensityChannelTree   = PropensitySumTree(self.numNodes, columns=len(self.propensityChannels))
+        self.propensityChannelTree.set_all(self.propensityChannelCoeffs*(self.X==self.propensityChannelStates))
+        self.propensityLastStates    = self.X.ravel().copy()
+
+        return None
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def node_propensity_indicator(self, indicator, nodes):
+        X = self.X[nodes,0]
+        if(indicator == 'sym'):
+            return (X==self.I_sym)
+        elif(indicator == 'pre_asym'):
+            return ((X==self.I_pre)|(X==self.I_asym))
+        elif(indicator == 'Q'):
+            return ((X==self.Q_pre)|(X==self.Q_sym)|(X==self.Q_asym))
+        elif(indicator == 'contacts'):
+            return ((self.positive[nodes,0])&(X!=self.R)&(X!=self.Q_R)&(X!=self.F))
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def calc_node_propensities(self, nodes):
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Same (exponential_rates) propensities as calc_propensities() restricted to the given nodes,
+        # excluding the global interaction terms of StoE and QStoQE, which are sampled separately.
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        X = self.X[nodes]
+
+        propensities = self.propensityRates[nodes]
+        if(self.trackContacts_Q):
+            # (incremental updates can leave round-off residue around zero)
+            propensities[:, self.propensityContactCols] += self.propensityContactRates[nodes] * numpy.maximum(self.propensityTerms['contacts'][nodes], 0)[:,None]
+
+        transmissionTerms_I  = numpy.maximum(self.propensityTerms['I'][nodes], 0)
+        transmissionTerms_Q  = numpy.maximum(self.propensityTerms['Q'][nodes], 0)
+        transmissionTerms_IQ = numpy.maximum(self.propensityTerms['IQ'][nodes], 0)
+        propensities[:, self.propensityColumns.index('StoE')]   += self.propensityLocalCoeffs[nodes] * (transmissionTerms_I*self.propensityInvDegree[nodes] + transmissionTerms_Q*self.propensityInvDegree_Q[nodes])
+        propensities[:, self.propensityColumns.index('QStoQE')] += self.propensityLocalCoeffs_Q[nodes] * (transmissionTerms_IQ+transmissionTerms_Q)*self.propensityInvDegree_Q[nodes]
+
+        stateMask = (X==self.propensityStates)
+        stateMask[:, -1] = (X[:,0]!=self.F)
+
+        return propensities*stateMask
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def update_incremental_propensities(self, nodes):
+        if(self.propensity_mode != 'incremental' or self.propensityTree is None):
+            # Nothing to maintain; the engine is (re)built from the current state when next needed.
+            return None
+
+        nodes = numpy.atleast_1d(numpy.asarray(nodes, dtype=int).ravel())
+        if(len(nodes) == 0):
+            return None
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Propagate indicator changes of the given nodes to their neighbors' transmission terms:
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        affectedNodes = [nodes]
+        for indicator, indicatorData in self.propensityIndicators.items():
+            newValues = self.node_propensity_indicator(indicator, nodes)
+            changes   = newValues.astype(int) - indicatorData['values'][nodes].astype(int)
+            changed   = (changes != 0)
+            if(numpy.any(changed)):
+                for matrix, term in indicatorData['terms']:
+                    # Gather the column entries (neighbors and weights) of all of the changed nodes at once:
+                    starts  = matrix.indptr[nodes[changed]]
+                    lengths = matrix.indptr[nodes[changed]+1] - starts
+                    entries = numpy.repeat(starts, lengths) + numpy.arange(lengths.sum()) - numpy.repeat(numpy.cumsum(lengths)-lengths, lengths)
+                    nbrs    = matrix.indices[entries]
+                    numpy.add.at(self.propensityTerms[term], nbrs, numpy.repeat(changes[changed], lengths)*matrix.data[entries])
+                    affectedNodes.append(nbrs)
+            indicatorData['values'][nodes] = newValues
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Recompute the propensity rows of the changed and affected nodes:
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        affectedNodes = numpy.unique(numpy.concatenate(affectedNodes)) if len(affectedNodes) > 1 else nodes
+        newRows = self.calc_node_propensities(affectedNodes)
+        self.propensityColumnTotals += (newRows - self.propensityTable[affectedNodes]).sum(axis=0)
+        self.propensityTable[affectedNodes] = newRows
+        self.propensityTree.update(affectedNodes, newRows.sum(axis=1))
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Update global interaction channels for nodes entering/leaving the S and Q_S states:
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        changedNodes = nodes[self.X[nodes,0] != self.propensityLastStates[nodes]]
+        if(len(changedNodes) > 0):
+            self.propensityChannelTree.update(changedNodes, self.propensityChannelCoeffs[changedNodes]*(self.X[changedNodes]==self.propensityChannelStates))
+            self.propensityLastStates[changedNodes] = self.X[changedNodes,0]
+
+        return None
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def select_incremental_transition(self, r2):
+        if(self.propensityTree is None):
+            self.init_incremental_propensities()
+
+        channelScales, channelTotals = self.incremental_channel_totals()
+
+        tableTotal = self.propensityTree.total()
+        alpha      = tableTotal + channelTotals.sum()
+        if(alpha <= 0):
+            return 0, None, None
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Descend the sum tree(s) to the node and transition type of the event:
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        target = r2*alpha
+        if(target < tableTotal):
+            transitionNode, residual = self.propensityTree.find(target)
+            nodePropensities = self.propensityTable[transitionNode]
+            transitionCol    = min(numpy.searchsorted(nodePropensities.cumsum(), residual, side='right'), len(nodePropensities)-1)
+            if(nodePropensities[transitionCol] <= 0):
+                transitionCol = numpy.flatnonzero(nodePropensities)[-1]
+            return alpha, transitionNode, self.propensityColumns[transitionCol]
+
+        # (if round-off leaves the target just past the last non-empty channel, the tree descent clamps to its last node)
+        target         -= tableTotal
+        channelCumsum   = channelTotals.cumsum()
+        channelIdx      = min(numpy.searchsorted(channelCumsum, target, side='right'), numpy.flatnonzero(channelTotals)[-1])
+        target         -= channelCumsum[channelIdx] - channelTotals[channelIdx]
+        transitionNode, _ = self.propensityChannelTree.find(target/channelScales[channelIdx], column=channelIdx)
+        return alpha, transitionNode, self.propensityChannels[channelIdx]['transition']
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def incremental_channel_totals(self):
+        # Global interaction channels are scaled by the current (well-mixed) infectious counts; returns the scale
+        # and the total propensity of each channel:
+        N = (self.numNodes - self.stateCounts[self.F])
+        countScales   = { 'sym':  self.stateCounts[self.I_sym]/N if N > 0 else 0,
+                          'asym': (self.stateCounts[self.I_pre] + self.stateCounts[self.I_asym])/N if N > 0 else 0,
+                          'Q':    (self.stateCounts[self.Q_pre] + self.stateCounts[self.Q_sym] + self.stateCounts[self.Q_asym])/N if N > 0 else 0 }
+        channelScales = numpy.array([countScales[channel['counts']] for channel in self.propensityChannels])
+        return channelScales, channelScales*self.propensityChannelTree.total()
+
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def set_node_state(self, node, newState):
+        # Change the state of this node, updating the state counters (overall and for the node's groups)
+        # and the isolation bookkeeping from the old state -> new state transition:
+        oldState = self.X[node,0]
+        if(oldState == newState):
+            return
+        self.X[node] = newState
+        self.stateCounts[oldState] -= 1
+        self.stateCounts[newState] += 1
+        if(self.nodeGroupData):
+            nodeGroups = self.nodeGroupsOfNode[node]
+            self.nodeGroupStateCounts[nodeGroups, oldState] -= 1
+            self.nodeGroupStateCounts[nodeGroups, newState] += 1
+        #----------------------------------------
+        if(self.isIsolationState[newState] and not self.isIsolationState[oldState]):
+            # Entering isolation; schedule the exit for when the node's isolation timer will reach the isolation time:
+            self.isolatedNodes.add(node)
+            self.isolationStartTime[node] = self.t
+            self.isolationVersion[node] += 1
+            heapq.heappush(self.isolationExitQueue, (self.t + self.node_isolation_time(node) - self.timer_isolation[node], node, self.isolationVersion[node]))
+        elif(self.isIsolationState[oldState] and not self.isIsolationState[newState]):
+            # Leaving isolation; keep the accumulated isolation time and invalidate the scheduled exit:
+            self.isolatedNodes.discard(node)
+            self.timer_isolation[node] += self.t - self.isolationStartTime[node]
+            self.isolationVersion[node] += 1
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def set_node_states(self, nodes, newStates):
+        # set_node_state() for an array of distinct nodes at once:
+        oldStates = self.X[nodes,0]
+        changed   = (oldStates != newStates)
+        nodes, oldStates, newStates = nodes[changed], oldStates[changed], newStates[changed]
+        if(len(nodes) == 0):
+            return
+        self.X[nodes,0] = newStates
+        self.stateCounts += numpy.bincount(newStates, minlength=self.numStateCodes) - numpy.bincount(oldStates, minlength=self.numStateCodes)
+        if(self.nodeGroupData):
+            nodeGroups = [self.nodeGroupsOfNode[node] for node in nodes]
+            numGroups  = [len(groups) for groups in nodeGroups]
+            nodeGroups = numpy.concatenate(nodeGroups)
+            numpy.add.at(self.nodeGroupStateCounts, (nodeGroups, numpy.repeat(oldStates, numGroups)), -1)
+            numpy.add.at(self.nodeGroupStateCounts, (nodeGroups, numpy.repeat(newStates, numGroups)), 1)
+        #----------------------------------------
+        entering = nodes[self.isIsolationState[newStates] & ~self.isIsolationState[oldStates]]
+        if(len(entering) > 0):
+            self.isolatedNodes.update(entering.tolist())
+            self.isolationStartTime[entering] = self.t
+            self.isolationVersion[entering] += 1
+            for node in entering.tolist():
+                heapq.heappush(self.isolationExitQueue, (self.t + self.node_isolation_time(node) - self.timer_isolation[node], node, self.isolationVersion[node]))
+        leaving = nodes[self.isIsolationState[oldStates] & ~self.isIsolationState[newStates]]
+        if(len(leaving) > 0):
+            self.isolatedNodes.difference_update(leaving.tolist())
+            self.timer_isolation[leaving] += self.t - self.isolationStartTime[leaving]
+            self.isolationVersion[leaving] += 1
+
 #^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
     def set_isolation(self, node, isolate):
-        # Move this node in/out of the appropriate isolation state:
-        if(isolate == True):
-            if(self.X[node] == self.S):
-                self.X[node] = self.Q_S
-            elif(self.X[node] == self.E):
-                self.X[node] = self.Q_E
-            elif(self.X[node] == self.I_pre):
-                self.X[node] = self.Q_pre
-            elif(self.X[node] == self.I_sym):
-                self.X[node] = self.Q_sym
-            elif(self.X[node] == self.I_asym):
-                self.X[node] = self.Q_asym
-            elif(self.X[node] == self.R):
-                self.X[node] = self.Q_R
-        elif(isolate == False):
-            if(self.X[node] == self.Q_S):
-                self.X[node] = self.S
-            elif(self.X[node] == self.Q_E):
-                self.X[node] = self.E
-            elif(self.X[node] == self.Q_pre):
-                self.X[node] = self.I_pre
-            elif(self.X[node] == self.Q_sym):
-                self.X[node] = self.I_sym
-            elif(self.X[node] == self.Q_asym):
-                self.X[node] = self.I_asym
-            elif(self.X[node] == self.Q_R):
-                self.X[node] = self.R
-        # Reset the isolation timer:
-        self.timer_isolation[node] = 0
+        # (node may be a single node or an array of nodes)
+        nodes = numpy.asarray(node, dtype=int).ravel()
+        # Move these nodes in/out of the appropriate isolation state:
+        newStates = (self.isolationStateOf if isolate else self.releaseStateOf)[self.X[nodes,0]]
+        changedNodes = []
+        for node, newState in zip(nodes.tolist(), newStates.tolist()):
+            if(newState != self.X[node,0]):
+                self.set_node_state(node, newState)
+                changedNodes.append(node)
+            # Reset the isolation timer (and reschedule the exit of a node that remains isolated):
+            self.timer_isolation[node] = 0
+            if(node in self.isolatedNodes):
+                self.isolationStartTime[node] = self.t
+                self.isolationVersion[node] += 1
+                heapq.heappush(self.isolationExitQueue, (self.t + self.node_isolation_time(node), node, self.isolationVersion[node]))
+        self.update_incremental_propensities(numpy.unique(changedNodes))
 
 #^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
     def set_tested(self, node, tested):
+        # (node may be a single node or an array of nodes)
+        self.update_status_counts(node, self.tested, tested, 'numTestedNodes', 'nodeGroupTestedCounts')
         self.tested[node] = tested
         self.testedInCurrentState[node] = tested
 
 #^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
     def set_positive(self, node, positive):
+        # (node may be a single node or an array of nodes)
+        self.update_status_counts(node, self.positive, positive, 'numPositiveNodes', 'nodeGroupPositiveCounts')
         self.positive[node] = positive
+        self.update_incremental_propensities(numpy.unique(node))
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def update_status_counts(self, node, statuses, newStatus, countAttr, groupCountsAttr):
+        # Update the overall and per-group counters of a node status (tested, positive) for the nodes whose status changes:
+        nodes = numpy.unique(numpy.asarray(node, dtype=int).ravel())
+        changedNodes = nodes[statuses[nodes,0] != newStatus]
+        if(len(changedNodes) == 0):
+            return
+        delta = 1 if newStatus else -1
+        setattr(self, countAttr, getattr(self, countAttr) + delta*len(changedNodes))
+        if(self.nodeGroupData):
+            numpy.add.at(getattr(self, groupCountsAttr), numpy.concatenate([self.nodeGroupsOfNode[n] for n in changedNodes]), delta)
 
 #^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
@@ -2459,103 +2865,23 @@ class ExtSEIRSNetworkModel():
         exposedNodes = numpy.random.choice(range(self.numNodes), size=num_new_exposures, replace=False)
         for exposedNode in exposedNodes:
             if(self.X[exposedNode]==self.S):
-                self.X[exposedNode] = self.E
+                self.set_node_state(exposedNode, self.E)
             elif(self.X[exposedNode]==self.Q_S):
-                self.X[exposedNode] = self.Q_E
+                self.set_node_state(exposedNode, self.Q_E)
+        self.update_incremental_propensities(exposedNodes)
 
 
 #^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 #^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^   
 
     def increase_data_series_length(self):
-        self.tseries     = numpy.pad(self.tseries, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numS        = numpy.pad(self.numS, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numE        = numpy.pad(self.numE, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numI_pre    = numpy.pad(self.numI_pre, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numI_sym    = numpy.pad(self.numI_sym, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numI_asym   = numpy.pad(self.numI_asym, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numH        = numpy.pad(self.numH, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numR        = numpy.pad(self.numR, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numF        = numpy.pad(self.numF, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numQ_S      = numpy.pad(self.numQ_S, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numQ_E      = numpy.pad(self.numQ_E, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numQ_pre    = numpy.pad(self.numQ_pre, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numQ_sym    = numpy.pad(self.numQ_sym, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numQ_asym   = numpy.pad(self.numQ_asym, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numQ_R      = numpy.pad(self.numQ_R, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.N           = numpy.pad(self.N, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numTested   = numpy.pad(self.numTested, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-        self.numPositive = numpy.pad(self.numPositive, [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-
-        if(self.store_Xseries):
-            self.Xseries = numpy.pad(self.Xseries, [(0, 6*self.numNodes), (0,0)], mode='constant', constant_values=0)
-
-        if(self.nodeGroupData):
-            for groupName in self.nodeGroupData:
-                self.nodeGroupData[groupName]['numS']        = numpy.pad(self.nodeGroupData[groupName]['numS'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['numE']        = numpy.pad(self.nodeGroupData[groupName]['numE'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['numI_pre']    = numpy.pad(self.nodeGroupData[groupName]['numI_pre'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['numI_sym']    = numpy.pad(self.nodeGroupData[groupName]['numI_sym'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['numI_asym']   = numpy.pad(self.nodeGroupData[groupName]['numI_asym'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['numH']        = numpy.pad(self.nodeGroupData[groupName]['numH'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['numR']        = numpy.pad(self.nodeGroupData[groupName]['numR'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['numF']        = numpy.pad(self.nodeGroupData[groupName]['numF'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['numQ_S']      = numpy.pad(self.nodeGroupData[groupName]['numQ_S'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['numQ_E']      = numpy.pad(self.nodeGroupData[groupName]['numQ_E'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['numQ_pre']    = numpy.pad(self.nodeGroupData[groupName]['numQ_pre'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['numQ_sym']    = numpy.pad(self.nodeGroupData[groupName]['numQ_sym'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['numQ_asym']   = numpy.pad(self.nodeGroupData[groupName]['numQ_asym'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['numQ_R']      = numpy.pad(self.nodeGroupData[groupName]['numQ_R'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['N']           = numpy.pad(self.nodeGroupData[groupName]['N'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['numTested']   = numpy.pad(self.nodeGroupData[groupName]['numTested'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-                self.nodeGroupData[groupName]['numPositive'] = numpy.pad(self.nodeGroupData[groupName]['numPositive'], [(0, 6*self.numNodes)], mode='constant', constant_values=0)
-
+        self.recorder.increase_capacity(self)
         return None
 
 #^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^ 
 
     def finalize_data_series(self):
-        self.tseries     = numpy.array(self.tseries, dtype=float)[:self.tidx+1]
-        self.numS        = numpy.array(self.numS, dtype=float)[:self.tidx+1]
-        self.numE        = numpy.array(self.numE, dtype=float)[:self.tidx+1]
-        self.numI_pre    = numpy.array(self.numI_pre, dtype=float)[:self.tidx+1]
-        self.numI_sym    = numpy.array(self.numI_sym, dtype=float)[:self.tidx+1]
-        self.numI_asym   = numpy.array(self.numI_asym, dtype=float)[:self.tidx+1]
-        self.numH        = numpy.array(self.numH, dtype=float)[:self.tidx+1]
-        self.numR        = numpy.array(self.numR, dtype=float)[:self.tidx+1]
-        self.numF        = numpy.array(self.numF, dtype=float)[:self.tidx+1]
-        self.numQ_S      = numpy.array(self.numQ_S, dtype=float)[:self.tidx+1]
-        self.numQ_E      = numpy.array(self.numQ_E, dtype=float)[:self.tidx+1]
-        self.numQ_pre    = numpy.array(self.numQ_pre, dtype=float)[:self.tidx+1]
-        self.numQ_sym    = numpy.array(self.numQ_sym, dtype=float)[:self.tidx+1]
-        self.numQ_asym   = numpy.array(self.numQ_asym, dtype=float)[:self.tidx+1]
-        self.numQ_R      = numpy.array(self.numQ_R, dtype=float)[:self.tidx+1]
-        self.N           = numpy.array(self.N, dtype=float)[:self.tidx+1]
-        self.numTested   = numpy.array(self.numTested, dtype=float)[:self.tidx+1]
-        self.numPositive = numpy.array(self.numPositive, dtype=float)[:self.tidx+1]
-
-        if(self.store_Xseries):
-            self.Xseries = self.Xseries[:self.tidx+1, :]
-
-        if(self.nodeGroupData):
-            for groupName in self.nodeGroupData:
-                self.nodeGroupData[groupName]['numS']        = numpy.array(self.nodeGroupData[groupName]['numS'], dtype=float)[:self.tidx+1]
-                self.nodeGroupData[groupName]['numE']        = numpy.array(self.nodeGroupData[groupName]['numE'], dtype=float)[:self.tidx+1]
-                self.nodeGroupData[groupName]['numI_pre']    = numpy.array(self.nodeGroupData[groupName]['numI_pre'], dtype=float)[:self.tidx+1]
-                self.nodeGroupData[groupName]['numI_sym']    = numpy.array(self.nodeGroupData[groupName]['numI_sym'], dtype=float)[:self.tidx+1]
-                self.nodeGroupData[groupName]['numI_asym']   = numpy.array(self.nodeGroupData[groupName]['numI_asym'], dtype=float)[:self.tidx+1]
-                self.nodeGroupData[groupName]['numR']        = numpy.array(self.nodeGroupData[groupName]['numR'], dtype=float)[:self.tidx+1]
-                self.nodeGroupData[groupName]['numF']        = numpy.array(self.nodeGroupData[groupName]['numF'], dtype=float)[:self.tidx+1]
-                self.nodeGroupData[groupName]['numQ_S']      = numpy.array(self.nodeGroupData[groupName]['numQ_S'], dtype=float)[:self.tidx+1]
-                self.nodeGroupData[groupName]['numQ_E']      = numpy.array(self.nodeGroupData[groupName]['numQ_E'], dtype=float)[:self.tidx+1]
-                self.nodeGroupData[groupName]['numQ_pre']    = numpy.array(self.nodeGroupData[groupName]['numQ_pre'], dtype=float)[:self.tidx+1]
-                self.nodeGroupData[groupName]['numQ_sym']    = numpy.array(self.nodeGroupData[groupName]['numQ_sym'], dtype=float)[:self.tidx+1]
-                self.nodeGroupData[groupName]['numQ_asym']   = numpy.array(self.nodeGroupData[groupName]['numQ_asym'], dtype=float)[:self.tidx+1]
-                self.nodeGroupData[groupName]['numQ_R']      = numpy.array(self.nodeGroupData[groupName]['numQ_R'], dtype=float)[:self.tidx+1]
-                self.nodeGroupData[groupName]['N']           = numpy.array(self.nodeGroupData[groupName]['N'], dtype=float)[:self.tidx+1]
-                self.nodeGroupData[groupName]['numTested']   = numpy.array(self.nodeGroupData[groupName]['numTested'], dtype=float)[:self.tidx+1]
-                self.nodeGroupData[groupName]['numPositive'] = numpy.array(self.nodeGroupData[groupName]['numPositive'], dtype=float)[:self.tidx+1]
-
+        self.recorder.finalize(self)
         return None
 
 #^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
@@ -2563,49 +2889,99 @@ class ExtSEIRSNetworkModel():
 
     def run_iteration(self):
 
-        if(self.tidx >= len(self.tseries)-1):
-            # Room has run out in the timeseries storage arrays; double the size of these arrays:
-            self.increase_data_series_length()
-
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        # Generate 2 random numbers uniformly distributed in (0,1)
+        # Advance the simulation by one event, or by one leap of the tau leaping solver:
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        r1 = numpy.random.rand()
-        r2 = numpy.random.rand()
+        if(self.solver_mode == 'tau_leaping' and self.leapExactStepsLeft <= 0):
+            # (the incremental engine's propensity table is used as is; the full engine recomputes the propensities)
+            propensities, transitionTypes = self.calc_propensities() if self.propensity_mode == 'full' else (None, None)
+            leapTime = self.select_leap_time(*self.calc_leap_flows(propensities, transitionTypes))
+            if(leapTime is not None):
+                self.run_leap(leapTime, propensities, transitionTypes)
+            else:
+                # Too few events are expected for a leap, so take exact steps for a while:
+                self.leapExactStepsLeft = self.tau_leap_exact_steps - 1
+                self.run_event(propensities, transitionTypes)
+        else:
+            self.leapExactStepsLeft -= 1
+            self.run_event()
 
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        # Calculate propensities
+
+        self.tidx += 1
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Update testing and isolation statuses
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        propensities, transitionTypes = self.calc_propensities()
 
-        if(propensities.sum() > 0):
+        # Release the nodes whose scheduled isolation exit time has been reached:
+        while(self.isolationExitQueue and self.isolationExitQueue[0][0] <= self.t):
+            exitTime, isoNode, version = heapq.heappop(self.isolationExitQueue)
+            if(version == self.isolationVersion[isoNode]):
+                self.set_isolation(node=isoNode, isolate=False)
 
-            #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-            # Calculate alpha
-            #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-            propensities_flat   = propensities.ravel(order='F')
-            cumsum              = propensities_flat.cumsum()
-            alpha               = propensities_flat.sum()
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Store system states
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        self.recorder.record(self)
 
-            #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-            # Compute the time until the next event takes place
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Terminate if tmax reached or num infections is 0:
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        if(self.t >= self.tmax or (self.current_num_infected() < 1 and self.current_num_isolated() < 1)):
+            self.finalize_data_series()
+            return False
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+        return True
+
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def run_event(self, propensities=None, transitionTypes=None):
+        # Simulate the next event (exact stochastic simulation), given the current propensities if already calculated:
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Generate 2 random numbers uniformly distributed in (0,1)
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        r1 = numpy.random.rand()
+        r2 = numpy.random.rand()
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Calculate propensities and alpha, and compute which event takes place
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        if(self.propensity_mode == 'incremental'):
+            alpha, transitionNode, transitionType = self.select_incremental_transition(r2)
+
+        else:
+            if(propensities is None):
+                propensities, transitionTypes = self.calc_propensities()
+
+            propensities_flat   = propensities.ravel(order='F')
+            cumsum              = propensities_flat.cumsum()
+            alpha               = propensities_flat.sum()
+
+            if(alpha > 0):
+                transitionIdx   = numpy.searchsorted(cumsum,r2*alpha)
+                transitionNode  = transitionIdx % self.numNodes
+                transitionType  = transitionTypes[ int(transitionIdx/self.numNodes) ]
+
+        if(alpha > 0):
+
+            #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+            # Compute the time until the next event takes place
             #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
             tau = (1/alpha)*numpy.log(float(1/r1))
             self.t += tau
             self.timer_state += tau
 
-            #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-            # Compute which event takes place
-            #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-            transitionIdx   = numpy.searchsorted(cumsum,r2*alpha)
-            transitionNode  = transitionIdx % self.numNodes
-            transitionType  = transitionTypes[ int(transitionIdx/self.numNodes) ]
-
             #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
             # Perform updates triggered by rate propensities:
             #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
             assert(self.X[transitionNode] == self.transitions[transitionType]['currentState'] and self.X[transitionNode]!=self.F), "Assertion error: Node "+str(transitionNode)+" has unexpected current state "+str(self.X[transitionNode])+" given the intended transition of "+str(transitionType)+"."
-            self.X[transitionNode] = self.transitions[transitionType]['newState']
+            self.set_node_state(transitionNode, self.transitions[transitionType]['newState'])
 
             self.testedInCurrentState[transitionNode] = False
 
@@ -2615,8 +2991,8 @@ class ExtSEIRSNetworkModel():
 
             # Save information about infection events when they occur:
             if(transitionType == 'StoE' or transitionType == 'QStoQE'):
-                transitionNode_GNbrs  = list(self.G[transitionNode].keys())
-                transitionNode_GQNbrs = list(self.G_Q[transitionNode].keys())
+                transitionNode_GNbrs  = self.A.indices[self.A.indptr[transitionNode]:self.A.indptr[transitionNode+1]].tolist()
+                transitionNode_GQNbrs = self.A_Q.indices[self.A_Q.indptr[transitionNode]:self.A_Q.indptr[transitionNode+1]].tolist()
                 self.infectionsLog.append({ 't':                            self.t,
                                             'infected_node':                transitionNode,
                                             'infection_type':               transitionType,
@@ -2630,6 +3006,8 @@ class ExtSEIRSNetworkModel():
 
             if(transitionType in ['EtoQE', 'IPREtoQPRE', 'ISYMtoQSYM', 'IASYMtoQASYM', 'ISYMtoH']):
                 self.set_positive(node=transitionNode, positive=True)
+            else:
+                self.update_incremental_propensities(transitionNode)
 
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -2639,77 +3017,157 @@ class ExtSEIRSNetworkModel():
             self.t += tau
             self.timer_state += tau
 
-        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        return None
 
-        self.tidx += 1
-        
-        self.tseries[self.tidx]     = self.t
-        self.numS[self.tidx]        = numpy.clip(numpy.count_nonzero(self.X==self.S), a_min=0, a_max=self.numNodes)
-        self.numE[self.tidx]        = numpy.clip(numpy.count_nonzero(self.X==self.E), a_min=0, a_max=self.numNodes)
-        self.numI_pre[self.tidx]    = numpy.clip(numpy.count_nonzero(self.X==self.I_pre), a_min=0, a_max=self.numNodes)
-        self.numI_sym[self.tidx]    = numpy.clip(numpy.count_nonzero(self.X==self.I_sym), a_min=0, a_max=self.numNodes)
-        self.numI_asym[self.tidx]   = numpy.clip(numpy.count_nonzero(self.X==self.I_asym), a_min=0, a_max=self.numNodes)
-        self.numH[self.tidx]        = numpy.clip(numpy.count_nonzero(self.X==self.H), a_min=0, a_max=self.numNodes)
-        self.numR[self.tidx]        = numpy.clip(numpy.count_nonzero(self.X==self.R), a_min=0, a_max=self.numNodes)
-        self.numF[self.tidx]        = numpy.clip(numpy.count_nonzero(self.X==self.F), a_min=0, a_max=self.numNodes)
-        self.numQ_S[self.tidx]      = numpy.clip(numpy.count_nonzero(self.X==self.Q_S), a_min=0, a_max=self.numNodes)
-        self.numQ_E[self.tidx]      = numpy.clip(numpy.count_nonzero(self.X==self.Q_E), a_min=0, a_max=self.numNodes)
-        self.numQ_pre[self.tidx]    = numpy.clip(numpy.count_nonzero(self.X==self.Q_pre), a_min=0, a_max=self.numNodes)
-        self.numQ_sym[self.tidx]    = numpy.clip(numpy.count_nonzero(self.X==self.Q_sym), a_min=0, a_max=self.numNodes)
-        self.numQ_asym[self.tidx]   = numpy.clip(numpy.count_nonzero(self.X==self.Q_asym), a_min=0, a_max=self.numNodes)
-        self.numQ_R[self.tidx]      = numpy.clip(numpy.count_nonzero(self.X==self.Q_R), a_min=0, a_max=self.numNodes)
-        self.numTested[self.tidx]   = numpy.clip(numpy.count_nonzero(self.tested), a_min=0, a_max=self.numNodes)
-        self.numPositive[self.tidx] = numpy.clip(numpy.count_nonzero(self.positive), a_min=0, a_max=self.numNodes)
-        
-        self.N[self.tidx]           = numpy.clip((self.numNodes - self.numF[self.tidx]), a_min=0, a_max=self.numNodes)
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def calc_leap_flows(self, propensities=None, transitionTypes=None):
+        # The total propensity, and the total rates at which individuals enter and leave each state: from the given
+        # propensities (full engine), or from the column totals of the incremental engine's propensity table and
+        # its global interaction channel totals (so that sizing a leap does not touch every node).
+        if(propensities is not None):
+            if(self.leapNewStates is None):
+                self.leapNewStates = numpy.array([self.transitions[transitionType]['newState'] for transitionType in transitionTypes])
+            nodeRates = propensities.sum(axis=1)
+            outflows  = numpy.bincount(self.X[:,0], weights=nodeRates, minlength=self.numStateCodes)
+            inflows   = numpy.bincount(self.leapNewStates, weights=propensities.sum(axis=0), minlength=self.numStateCodes)
+            return nodeRates.sum(), inflows, outflows
+
+        if(self.propensityTree is None):
+            self.init_incremental_propensities()
+        channelScales, channelTotals = self.incremental_channel_totals()
+        # (incremental updates can leave round-off residue around zero)
+        columnTotals = numpy.maximum(self.propensityColumnTotals, 0)
+        outflows = (numpy.bincount(self.propensityStates[:-1], weights=columnTotals[:-1], minlength=self.numStateCodes)
+                    + numpy.bincount(self.propensityChannelStates, weights=channelTotals, minlength=self.numStateCodes))
+        if(columnTotals[-1] > 0):
+            # (the '_toS' transition leaves any non-fatality state, so its outflows are summed by node state)
+            outflows += numpy.bincount(self.X[:,0], weights=self.propensityTable[:,-1], minlength=self.numStateCodes)
+        inflows  = (numpy.bincount(self.propensityNewStates, weights=columnTotals, minlength=self.numStateCodes)
+                    + numpy.bincount(self.propensityNewStates[self.propensityChannelCols], weights=channelTotals, minlength=self.numStateCodes))
+        return self.propensityTree.total() + channelTotals.sum(), inflows, outflows
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def select_leap_time(self, alpha, inflows, outflows):
 
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        # Update testing and isolation statuses
+        # Choose the largest leap over which the expected change (mean and standard deviation) of each state count
+        # stays within tau_leap_epsilon of the count (Cao, Gillespie & Petzold 2006), treating the counts of individuals
+        # in each state as the species. Only the counts that propensities depend on are bounded: those of the states
+        # of transmission and of states with transitions out of them (the R, Q_R and F counts only accumulate).
+        # Returns None when the leap (after it is cut short at the next day, isolation exit or tmax) would be expected
+        # to hold fewer than tau_leap_min_events events, in which case an exact step should be taken instead.
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        if(alpha <= 0):
+            return None
 
-        isolatedNodes = numpy.argwhere((self.X==self.Q_S)|(self.X==self.Q_E)|(self.X==self.Q_pre)|(self.X==self.Q_sym)|(self.X==self.Q_asym)|(self.X==self.Q_R))[:,0].flatten()
-        self.timer_isolation[isolatedNodes] = self.timer_isolation[isolatedNodes] + tau
+        meanRates = inflows - outflows
+        varRates  = inflows + outflows
 
-        nodesExitingIsolation = numpy.argwhere(self.timer_isolation >= self.isolationTime)
-        for isoNode in nodesExitingIsolation:
-            self.set_isolation(node=isoNode, isolate=False)
+        reactants = (self.leapStateOrders > 1) | (outflows > 0)
+        bounds    = numpy.maximum(self.tau_leap_epsilon*self.stateCounts/self.leapStateOrders, 1)
+        tau       = min(numpy.min(numpy.divide(bounds, numpy.abs(meanRates), out=numpy.full(self.numStateCodes, numpy.inf), where=reactants&(meanRates!=0))),
+                        numpy.min(numpy.divide(bounds**2, varRates, out=numpy.full(self.numStateCodes, numpy.inf), where=reactants&(varRates!=0))))
 
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        # Store system states
+        # Leaps end at the next whole day (where interventions are applied by the TTI simulation loops),
+        # the next scheduled isolation exit and tmax:
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        if(self.store_Xseries):
-            self.Xseries[self.tidx,:] = self.X.T
+        tau = min(tau, numpy.floor(self.t)+1 - self.t, max(self.tmax - self.t, 0))
+        # (stale exit entries at the head of the queue would otherwise cut the leap short for nothing)
+        while(self.isolationExitQueue and self.isolationExitQueue[0][2] != self.isolationVersion[self.isolationExitQueue[0][1]]):
+            heapq.heappop(self.isolationExitQueue)
+        if(self.isolationExitQueue):
+            tau = min(tau, max(self.isolationExitQueue[0][0] - self.t, 0))
 
-        if(self.nodeGroupData):
-            for groupName in self.nodeGroupData:
-                self.nodeGroupData[groupName]['numS'][self.tidx]        = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.S)
-                self.nodeGroupData[groupName]['numE'][self.tidx]        = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.E)
-                self.nodeGroupData[groupName]['numI_pre'][self.tidx]    = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.I_pre)
-                self.nodeGroupData[groupName]['numI_sym'][self.tidx]    = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.I_sym)
-                self.nodeGroupData[groupName]['numI_asym'][self.tidx]   = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.I_asym)
-                self.nodeGroupData[groupName]['numH'][self.tidx]        = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.H)
-                self.nodeGroupData[groupName]['numR'][self.tidx]        = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.R)
-                self.nodeGroupData[groupName]['numF'][self.tidx]        = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.F)
-                self.nodeGroupData[groupName]['numQ_S'][self.tidx]      = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.Q_S)
-                self.nodeGroupData[groupName]['numQ_E'][self.tidx]      = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.Q_E)
-                self.nodeGroupData[groupName]['numQ_pre'][self.tidx]    = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.Q_pre)
-                self.nodeGroupData[groupName]['numQ_sym'][self.tidx]    = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.Q_sym)
-                self.nodeGroupData[groupName]['numQ_asym'][self.tidx]   = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.Q_asym)
-                self.nodeGroupData[groupName]['numQ_R'][self.tidx]      = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.X==self.Q_R)
-                self.nodeGroupData[groupName]['N'][self.tidx]           = numpy.clip((self.nodeGroupData[groupName]['numS'][0] + self.nodeGroupData[groupName]['numE'][0] + self.nodeGroupData[groupName]['numI'][0] + self.nodeGroupData[groupName]['numQ_E'][0] + self.nodeGroupData[groupName]['numQ_I'][0] + self.nodeGroupData[groupName]['numR'][0]), a_min=0, a_max=self.numNodes)
-                self.nodeGroupData[groupName]['numTested'][self.tidx]   = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.tested)
-                self.nodeGroupData[groupName]['numPositive'][self.tidx] = numpy.count_nonzero(self.nodeGroupData[groupName]['mask']*self.positive)
+        # A leap cut short to only a few expected events is not worth its approximation error:
+        if(alpha*tau < self.tau_leap_min_events):
+            return None
+        return tau
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def run_leap(self, tau, propensities=None, transitionTypes=None):
 
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        # Terminate if tmax reached or num infections is 0:
+        # Over the leap, with the propensities held at their current values, each node leaves its current state with
+        # probability 1-exp(-rate*tau), where rate is the sum of its transition propensities, by one of its transitions
+        # chosen in proportion to their propensities (so each node transitions at most once per leap):
         #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        if(self.t >= self.tmax or (self.total_num_infected(self.tidx) < 1 and self.total_num_isolated(self.tidx) < 1)):
-            self.finalize_data_series()
-            return False
+        if(propensities is not None):
+            nodeRates        = propensities.sum(axis=1)
+            transitionNodes  = numpy.flatnonzero(numpy.random.rand(self.numNodes) < -numpy.expm1(-nodeRates*tau))
+            transitionCols   = self.select_row_columns(propensities[transitionNodes], numpy.random.rand(len(transitionNodes))*nodeRates[transitionNodes])
+            newStates        = self.leapNewStates[transitionCols]
+            transitionTypes  = numpy.array(transitionTypes)[transitionCols]
+        else:
+            # With the incremental engine, the same transitions are drawn without visiting every node: each node's
+            # transitions occur as Poisson processes over the leap, so Poisson numbers of events are drawn from the
+            # sum trees of the table and of each global interaction channel, and every node that has any of them
+            # takes one of its events picked at random (which leaves it with probability 1-exp(-rate*tau), by a
+            # transition chosen in proportion to its propensity):
+            channelScales, channelTotals = self.incremental_channel_totals()
+            tableTotal = self.propensityTree.total()
+            numEvents  = numpy.random.poisson(tableTotal*tau)
+            eventNodes, residuals = self.propensityTree.find_all(numpy.random.rand(numEvents)*tableTotal)
+            eventNodes = [eventNodes]
+            eventCols  = [self.select_row_columns(self.propensityTable[eventNodes[0]], residuals)]
+            for channelIdx in numpy.flatnonzero(channelTotals > 0):
+                numEvents = numpy.random.poisson(channelTotals[channelIdx]*tau)
+                channelNodes, _ = self.propensityChannelTree.find_all(numpy.random.rand(numEvents)*self.propensityChannelTree.total()[channelIdx], column=channelIdx)
+                eventNodes.append(channelNodes)
+                eventCols.append(numpy.full(numEvents, self.propensityChannelCols[channelIdx]))
+            order      = numpy.random.permutation(sum(len(nodes) for nodes in eventNodes))
+            eventNodes = numpy.concatenate(eventNodes)[order]
+            eventCols  = numpy.concatenate(eventCols)[order]
+            transitionNodes, firstEvents = numpy.unique(eventNodes, return_index=True)
+            transitionCols   = eventCols[firstEvents]
+            newStates        = self.propensityNewStates[transitionCols]
+            transitionTypes  = numpy.array(self.propensityColumns)[transitionCols]
+
+        self.t += tau
+        self.timer_state += tau
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Perform the transitions (as of the end of the leap) all at once:
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        self.set_node_states(transitionNodes, newStates)
+
+        # Save information about infection events when they occur:
+        infectionNodes = transitionNodes[(transitionTypes == 'StoE') | (transitionTypes == 'QStoQE')]
+        for transitionNode, transitionType in zip(infectionNodes.tolist(), transitionTypes[(transitionTypes == 'StoE') | (transitionTypes == 'QStoQE')].tolist()):
+            transitionNode_GNbrs  = self.A.indices[self.A.indptr[transitionNode]:self.A.indptr[transitionNode+1]].tolist()
+            transitionNode_GQNbrs = self.A_Q.indices[self.A_Q.indptr[transitionNode]:self.A_Q.indptr[transitionNode+1]].tolist()
+            self.infectionsLog.append({ 't':                            self.t,
+                                        'infected_node':                transitionNode,
+                                        'infection_type':               transitionType,
+                                        'infected_node_degree':         self.degree[transitionNode],
+                                        'local_contact_nodes':          transitionNode_GNbrs,
+                                        'local_contact_node_states':    self.X[transitionNode_GNbrs].flatten(),
+                                        'isolation_contact_nodes':      transitionNode_GQNbrs,
+                                        'isolation_contact_node_states':self.X[transitionNode_GQNbrs].flatten() })
+
+        self.testedInCurrentState[transitionNodes] = False
+        self.timer_state[transitionNodes] = 0.0
+
+        positiveNodes = transitionNodes[numpy.isin(transitionTypes, ['EtoQE', 'IPREtoQPRE', 'ISYMtoQSYM', 'IASYMtoQASYM', 'ISYMtoH'])]
+        self.update_status_counts(positiveNodes, self.positive, True, 'numPositiveNodes', 'nodeGroupPositiveCounts')
+        self.positive[positiveNodes] = True
+        # (one propensity update for all of the leap's state and positive status changes)
+        self.update_incremental_propensities(transitionNodes)
 
-        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        return None
 
-        return True
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def select_row_columns(self, rows, targets):
+        # The column of each row at which the row's cumulative sum exceeds its target (if round-off leaves a target
+        # past the last nonzero entry of a row, that entry's column):
+        cumsums         = rows.cumsum(axis=1)
+        columns         = numpy.minimum((cumsums <= targets[:,None]).sum(axis=1), rows.shape[1]-1)
+        lastNonzeroCols = rows.shape[1]-1 - numpy.argmax(rows[:,::-1] > 0, axis=1)
+        return numpy.minimum(columns, lastNonzeroCols)
 
 
 #^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
@@ -2773,20 +3231,20 @@ class ExtSEIRSNetworkModel():
                         print("t = %.2f" % self.t)
                     if(verbose==True):
                         print("t = %.2f" % self.t)
-                        print("\t S      = " + str(self.numS[self.tidx]))
-                        print("\t E      = " + str(self.numE[self.tidx]))
-                        print("\t I_pre  = " + str(self.numI_pre[self.tidx]))
-                        print("\t I_sym  = " + str(self.numI_sym[self.tidx]))
-                        print("\t I_asym = " + str(self.numI_asym[self.tidx]))
-                        print("\t H      = " + str(self.numH[self.tidx]))
-                        print("\t R      = " + str(self.numR[self.tidx]))
-                        print("\t F      = " + str(self.numF[self.tidx]))
-                        print("\t Q_S    = " + str(self.numQ_S[self.tidx]))
-                        print("\t Q_E    = " + str(self.numQ_E[self.tidx]))
-                        print("\t Q_pre  = " + str(self.numQ_pre[self.tidx]))
-                        print("\t Q_sym  = " + str(self.numQ_sym[self.tidx]))
-                        print("\t Q_asym = " + str(self.numQ_asym[self.tidx]))
-                        print("\t Q_R    = " + str(self.numQ_R[self.tidx]))
+                        print("\t S      = " + str(self.stateCounts[self.S]))
+                        print("\t E      = " + str(self.stateCounts[self.E]))
+                        print("\t I_pre  = " + str(self.stateCounts[self.I_pre]))
+                        print("\t I_sym  = " + str(self.stateCounts[self.I_sym]))
+                        print("\t I_asym = " + str(self.stateCounts[self.I_asym]))
+                        print("\t H      = " + str(self.stateCounts[self.H]))
+                        print("\t R      = " + str(self.stateCounts[self.R]))
+                        print("\t F      = " + str(self.stateCounts[self.F]))
+                        print("\t Q_S    = " + str(self.stateCounts[self.Q_S]))
+                        print("\t Q_E    = " + str(self.stateCounts[self.Q_E]))
+                        print("\t Q_pre  = " + str(self.stateCounts[self.Q_pre]))
+                        print("\t Q_sym  = " + str(self.stateCounts[self.Q_sym]))
+                        print("\t Q_asym = " + str(self.stateCounts[self.Q_asym]))
+                        print("\t Q_R    = " + str(self.stateCounts[self.Q_R]))
                         
                     print_reset = False
                 elif(not print_reset and (int(self.t) % 10 != 0)):
@@ -3177,6 +3635,1113 @@ class ExtSEIRSNetworkModel():
 
 
 
+class BatchExtSEIRSNetworkModel():
+    """
+    A class to simulate many independent replicates of the Extended SEIRS Stochastic Network Model in lock-step
+    ===================================================
+    Params:
+            models          List of ExtSEIRSNetworkModel instances (one per replicate) with the same number of nodes.
+                            Each replicate keeps its own network, parameters, and initial state; the batch
+                            holds their node states as a (replicates x nodes) array and advances every running
+                            replicate by one event per iteration on its own clock. Replicates drop out of the
+                            batch as they finish, and their results are written back to the corresponding model
+                            objects. (exponential_rates transition mode only)
+            seed            Seed for the per-replicate random number streams (spawned from one SeedSequence,
+                            so a replicate's trajectory does not depend on the other replicates in the batch),
+                            or a list of one seed per replicate
+
+    Propensities are maintained incrementally as in the models' 'incremental' propensity mode, over all replicates
+    at once: an event only recomputes the propensity rows of the nodes it affects (found through block-diagonal,
+    column-oriented copies of the replicates' transmission matrices), and the global interaction terms are kept
+    as per-replicate channel sums scaled by the current counts. The nodes are grouped into blocks of about sqrt(N)
+    nodes with per-replicate partial sums, so that the next event is found within one block rather than over
+    all nodes, and isolation exits are only looked up in the replicates whose earliest scheduled exit has passed.
+    A daily policy (see run_tti_sim_batch) is applied to a replicate's model object at the start of each of its days;
+    the model is brought up to date with the batch beforehand and the policy's changes are read back afterwards.
+    """
+    def __init__(self, models, seed=None):
+
+        assert(len(models) > 0), "At least one replicate model is required."
+        assert(all(model.transition_mode == 'exponential_rates' for model in models)), "The batched simulator only supports the 'exponential_rates' transition mode."
+        assert(all(model.solver_mode == 'exact' for model in models)), "The batched simulator only supports the 'exact' solver mode."
+        assert(len(set(model.numNodes for model in models)) == 1), "All replicate models must have the same number of nodes."
+        assert(not any(model.store_Xseries or model.nodeGroupData for model in models)), "The batched simulator does not record Xseries or node group data series."
+
+        self.models         = list(models)
+        self.numReplicates  = len(self.models)
+        self.numNodes       = self.models[0].numNodes
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Node states:
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        self.S          = 1
+        self.E          = 2
+        self.I_pre      = 3
+        self.I_sym      = 4
+        self.I_asym     = 5
+        self.H          = 6
+        self.R          = 7
+        self.F          = 8
+        self.Q_S        = 11
+        self.Q_E        = 12
+        self.Q_pre      = 13
+        self.Q_sym      = 14
+        self.Q_asym     = 15
+        self.Q_R        = 17
+        self.numStateCodes = 18
+
+        self.transitionTypes = [ 'StoE', 'EtoIPRE', 'IPREtoISYM', 'IPREtoIASYM',
+                                 'ISYMtoR', 'ISYMtoH', 'IASYMtoR', 'HtoR', 'HtoF',
+                                 'StoQS', 'EtoQE', 'IPREtoQPRE', 'ISYMtoQSYM', 'IASYMtoQASYM',
+                                 'QStoQE', 'QEtoQPRE', 'QPREtoQSYM', 'QPREtoQASYM',
+                                 'QSYMtoQR', 'QSYMtoH', 'QASYMtoQR', 'RtoS', '_toS' ]
+        self.numTransitionTypes = len(self.transitionTypes)
+        # New state resulting from each transition type (the '_toS' transition applies to any non-fatality state):
+        self.transitionNewStates = numpy.array([self.models[0].transitions[transitionType]['newState'] for transitionType in self.transitionTypes])
+        # Transitions after which the node is known to be positive:
+        self.transitionSetsPositive = numpy.isin(self.transitionTypes, ['EtoQE', 'IPREtoQPRE', 'ISYMtoQSYM', 'IASYMtoQASYM', 'ISYMtoH'])
+        # Isolation state corresponding to each state code (and vice versa), for releasing nodes from isolation:
+        self.releasedState = numpy.arange(self.numStateCodes)
+        self.releasedState[[self.Q_S, self.Q_E, self.Q_pre, self.Q_sym, self.Q_asym, self.Q_R]] = [self.S, self.E, self.I_pre, self.I_sym, self.I_asym, self.R]
+        self.isIsolatedState = numpy.isin(numpy.arange(self.numStateCodes), [self.Q_S, self.Q_E, self.Q_pre, self.Q_sym, self.Q_asym, self.Q_R])
+        self.isInfectedState = numpy.isin(numpy.arange(self.numStateCodes), [self.E, self.I_pre, self.I_sym, self.I_asym, self.H, self.Q_E, self.Q_pre, self.Q_sym, self.Q_asym])
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Replicate states and timekeeping (replicates x nodes):
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        self.X               = numpy.vstack([model.X.reshape((1, self.numNodes)) for model in self.models]).astype(int)
+        self.tested          = numpy.vstack([model.tested.reshape((1, self.numNodes)) for model in self.models]).astype(bool)
+        self.positive        = numpy.vstack([model.positive.reshape((1, self.numNodes)) for model in self.models]).astype(bool)
+        self.testedInCurrentState = numpy.vstack([model.testedInCurrentState.reshape((1, self.numNodes)) for model in self.models]).astype(bool)
+
+        self.t      = numpy.array([model.t for model in self.models], dtype=float)
+        self.tmax   = numpy.array([model.tmax for model in self.models], dtype=float)
+        self.tidx   = numpy.zeros(self.numReplicates, dtype=int)
+
+        # The models' state timers are kept as the time at which each node entered its current state
+        # (timer_state = t - stateStartTime), so that advancing a replicate's clock does not touch all of its nodes:
+        self.stateStartTime  = self.t[:,None] - numpy.vstack([model.timer_state.reshape((1, self.numNodes)) for model in self.models]).astype(float)
+
+        # Counts of nodes in each state code, and of tested and positive nodes, per replicate:
+        self.stateCounts = numpy.vstack([numpy.bincount(self.X[r], minlength=self.numStateCodes) for r in range(self.numReplicates)])
+        self.numTestedNodes   = numpy.count_nonzero(self.tested, axis=1)
+        self.numPositiveNodes = numpy.count_nonzero(self.positive, axis=1)
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Isolation bookkeeping, as in the models: the isolation time accumulated before the current isolation
+        # (timer_isolation), when the current isolation started, and when it is scheduled to end (inf if not isolated),
+        # plus the earliest scheduled exit of each replicate:
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # (per-replicate isolation times may be scalars or per-node arrays)
+        self.isolationTime      = numpy.vstack([numpy.broadcast_to(numpy.asarray(model.isolationTime, dtype=float).ravel(), (self.numNodes,)) for model in self.models])
+        self.timer_isolation    = numpy.zeros((self.numReplicates, self.numNodes))
+        self.isolationStartTime = numpy.zeros((self.numReplicates, self.numNodes))
+        self.isolationExitTime  = numpy.full((self.numReplicates, self.numNodes), numpy.inf)
+        self.nextIsolationExit  = numpy.full(self.numReplicates, numpy.inf)
+        for r, model in enumerate(self.models):
+            model.update_isolation_timers()
+            self.read_isolation_schedule(r)
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Per-replicate random number streams (events, and the daily policy of run_tti_sim_batch):
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        self.seed           = seed
+        seedSeqs            = ([numpy.random.SeedSequence(replicateSeed) for replicateSeed in seed] if isinstance(seed, (list, tuple, numpy.ndarray))
+                                else numpy.random.SeedSequence(seed).spawn(self.numReplicates))
+        assert(len(seedSeqs) == self.numReplicates), "Expecting one seed per replicate."
+        streamSeqs          = [seedSeq.spawn(2) for seedSeq in seedSeqs]
+        self.rngs           = [numpy.random.default_rng(eventSeq) for eventSeq, policySeq in streamSeqs]
+        self.policyRngs     = [numpy.random.RandomState(numpy.random.MT19937(policySeq)) for eventSeq, policySeq in streamSeqs]
+        # Uniform draws are taken from per-replicate buffers that are refilled from each replicate's own stream:
+        self.randBufferSize = 1024
+        self.randBuffer     = numpy.vstack([rng.random(self.randBufferSize) for rng in self.rngs])
+        self.randBufferIdx  = numpy.zeros(self.numReplicates, dtype=int)
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Incremental propensity engine over all replicates (see init_propensities):
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        self.init_propensities()
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Data series (replicates x timesteps), grown as needed:
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        self.dataSeries = list(SeriesRecorder.seriesNames)
+        for series in self.dataSeries:
+            setattr(self, series, numpy.zeros((self.numReplicates, 6*self.numNodes)))
+        self.record_data_series(numpy.arange(self.numReplicates))
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Running replicates:
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        self.running          = numpy.ones(self.numReplicates, dtype=bool)
+        self.activeReplicates = numpy.flatnonzero(self.running)
+
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def init_propensities(self):
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # The per-node rates and coefficients come from each model's incremental propensity engine, stacked as
+        # (replicates x nodes [x columns]) arrays. The transmission terms are flat arrays indexed by
+        # replicate*numNodes + node, matching the block-diagonal transmission matrices over all replicates.
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        for model in self.models:
+            model.init_incremental_propensities()
+        stacked = lambda attr: numpy.stack([getattr(model, attr) for model in self.models])
+
+        self.propensityStates        = self.models[0].propensityStates
+        self.propensityRates         = stacked('propensityRates')
+        self.propensityContactCols   = self.models[0].propensityContactCols
+        self.propensityContactRates  = stacked('propensityContactRates')
+        self.propensityLocalCoeffs   = stacked('propensityLocalCoeffs')
+        self.propensityLocalCoeffs_Q = stacked('propensityLocalCoeffs_Q')
+        self.propensityInvDegree     = stacked('propensityInvDegree')
+        self.propensityInvDegree_Q   = stacked('propensityInvDegree_Q')
+        self.col_StoE                = self.transitionTypes.index('StoE')
+        self.col_QStoQE              = self.transitionTypes.index('QStoQE')
+
+        self.trackContacts_Q = any(model.trackContacts_Q for model in self.models)
+
+        blockColumns = lambda matrices: scipy.sparse.block_diag([scipy.sparse.csc_matrix(matrix, dtype=float) for matrix in matrices], format='csc')
+        A_deltabeta_sym  = blockColumns([model.A_deltabeta for model in self.models])
+        A_deltabeta_asym = blockColumns([model.A_deltabeta_asym if model.A_deltabeta_asym is not None else model.A_deltabeta for model in self.models])
+        A_Q_deltabeta_Q  = blockColumns([model.A_Q_deltabeta_Q for model in self.models])
+
+        self.propensityIndicators = { 'sym':      {'terms': [(A_deltabeta_sym, 'I'), (A_Q_deltabeta_Q, 'IQ')]},
+                                      'pre_asym': {'terms': [(A_deltabeta_asym, 'I'), (A_Q_deltabeta_Q, 'IQ')]},
+                                      'Q':        {'terms': [(A_Q_deltabeta_Q, 'Q')]} }
+        if(self.trackContacts_Q):
+            self.propensityIndicators['contacts'] = {'terms': [(blockColumns([model.A for model in self.models]), 'contacts')]}
+
+        allNodes = numpy.arange(self.numReplicates*self.numNodes)
+        self.propensityTerms = {term: numpy.zeros(self.numReplicates*self.numNodes) for term in ['I', 'Q', 'IQ', 'contacts']}
+        for indicator, indicatorData in self.propensityIndicators.items():
+            indicatorData['values'] = self.node_propensity_indicator(indicator, allNodes)
+            for matrix, term in indicatorData['terms']:
+                self.propensityTerms[term] += matrix.dot(indicatorData['values'].astype(float))
+
+        #----------------------------------------
+        # Propensity table (replicates x nodes x transition types), its per-node row sums, and the sums of those
+        # over blocks of blockSize consecutive nodes (the last block may be partial):
+        #----------------------------------------
+        self.propensityTable = self.calc_node_propensities(allNodes).reshape((self.numReplicates, self.numNodes, self.numTransitionTypes))
+        self.nodePropensities = self.propensityTable.sum(axis=2)
+        self.blockSize  = int(numpy.ceil(numpy.sqrt(self.numNodes)))
+        self.numBlocks  = int(numpy.ceil(self.numNodes/self.blockSize))
+        self.blockPropensities = self.block_totals(self.nodePropensities)
+
+        #----------------------------------------
+        # Global interaction channels: per-replicate sums of the channel coefficients of the nodes in each channel's
+        # state, scaled by the current infectious counts ('sym', 'asym', 'Q') when sampling:
+        #----------------------------------------
+        channels = self.models[0].propensityChannels
+        self.propensityChannelCoeffs = stacked('propensityChannelCoeffs')
+        self.propensityChannelStates = numpy.array([channel['state'] for channel in channels])
+        self.propensityChannelCounts = numpy.array([['sym', 'asym', 'Q'].index(channel['counts']) for channel in channels])
+        self.propensityChannelCols   = numpy.array([self.transitionTypes.index(channel['transition']) for channel in channels])
+        self.channelSums = numpy.zeros((self.numReplicates, len(channels)))
+        self.channelBlockSums = numpy.zeros((self.numReplicates, self.numBlocks, len(channels)))
+        self.update_channel_sums(numpy.arange(self.numReplicates))
+
+        # The models' own incremental engines are not kept up to date by the batch (they are rebuilt if a model is run again):
+        for model in self.models:
+            model.propensityTree = None
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def node_propensity_indicator(self, indicator, nodes):
+        # (nodes are flat replicate*numNodes + node indices)
+        X = self.X.ravel()[nodes]
+        if(indicator == 'sym'):
+            return (X==self.I_sym)
+        elif(indicator == 'pre_asym'):
+            return ((X==self.I_pre)|(X==self.I_asym))
+        elif(indicator == 'Q'):
+            return ((X==self.Q_pre)|(X==self.Q_sym)|(X==self.Q_asym))
+        elif(indicator == 'contacts'):
+            return ((self.positive.ravel()[nodes])&(X!=self.R)&(X!=self.Q_R)&(X!=self.F))
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def calc_node_propensities(self, nodes):
+        # Same propensities as ExtSEIRSNetworkModel.calc_node_propensities() for the given flat replicate*numNodes + node
+        # indices (excluding the global interaction terms of StoE and QStoQE, which are sampled from the channels):
+        X = self.X.ravel()[nodes]
+
+        propensities = self.propensityRates.reshape((-1, self.numTransitionTypes))[nodes]
+        if(self.trackContacts_Q):
+            # (incremental updates can leave round-off residue around zero)
+            propensities[:, self.propensityContactCols] += self.propensityContactRates.reshape((-1, len(self.propensityContactCols)))[nodes] * numpy.maximum(self.propensityTerms['contacts'][nodes], 0)[:,None]
+
+        transmissionTerms_I  = numpy.maximum(self.propensityTerms['I'][nodes], 0)
+        transmissionTerms_Q  = numpy.maximum(self.propensityTerms['Q'][nodes], 0)
+        transmissionTerms_IQ = numpy.maximum(self.propensityTerms['IQ'][nodes], 0)
+        invDegree_Q = self.propensityInvDegree_Q.ravel()[nodes]
+        propensities[:, self.col_StoE]   += self.propensityLocalCoeffs.ravel()[nodes] * (transmissionTerms_I*self.propensityInvDegree.ravel()[nodes] + transmissionTerms_Q*invDegree_Q)
+        propensities[:, self.col_QStoQE] += self.propensityLocalCoeffs_Q.ravel()[nodes] * (transmissionTerms_IQ+transmissionTerms_Q)*invDegree_Q
+
+        stateMask = (X[:,None]==self.propensityStates)
+        stateMask[:, -1] = (X!=self.F)
+
+        return propensities*stateMask
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def update_propensities(self, replicates, nodes):
+        # Propagate the state/positive status changes of the given (replicate, node) pairs to the transmission terms
+        # of their neighbors, and recompute the propensity rows of the changed and affected nodes:
+        flatNodes = numpy.unique(replicates*self.numNodes + nodes)
+        if(len(flatNodes) == 0):
+            return None
+
+        affectedNodes = [flatNodes]
+        for indicator, indicatorData in self.propensityIndicators.items():
+            newValues = self.node_propensity_indicator(indicator, flatNodes)
+            changes   = newValues.astype(int) - indicatorData['values'][flatNodes].astype(int)
+            changed   = (changes != 0)
+            if(numpy.any(changed)):
+                for matrix, term in indicatorData['terms']:
+                    # Gather the column entries (neighbors and weights) of all of the changed nodes at once:
+                    starts  = matrix.indptr[flatNodes[changed]]
+                    lengths = matrix.indptr[flatNodes[changed]+1] - starts
+                    entries = numpy.repeat(starts, lengths) + numpy.arange(lengths.sum()) - numpy.repeat(numpy.cumsum(lengths)-lengths, lengths)
+                    nbrs    = matrix.indices[entries]
+                    numpy.add.at(self.propensityTerms[term], nbrs, numpy.repeat(changes[changed], lengths)*matrix.data[entries])
+                    affectedNodes.append(nbrs)
+            indicatorData['values'][flatNodes] = newValues
+
+        affectedNodes = numpy.unique(numpy.concatenate(affectedNodes)) if len(affectedNodes) > 1 else flatNodes
+        affectedReps, affectedNodes = numpy.divmod(affectedNodes, self.numNodes)
+        self.propensityTable[affectedReps, affectedNodes] = self.calc_node_propensities(affectedReps*self.numNodes + affectedNodes)
+        self.nodePropensities[affectedReps, affectedNodes] = self.propensityTable[affectedReps, affectedNodes].sum(axis=1)
+
+        # Recompute the block sums of the affected blocks (from scratch, so that they do not accumulate round-off):
+        blockReps, blocks = numpy.divmod(numpy.unique(affectedReps*self.numBlocks + affectedNodes//self.blockSize), self.numBlocks)
+        blockNodes, inBlock = self.block_nodes(blocks)
+        self.blockPropensities[blockReps, blocks] = (self.nodePropensities[blockReps[:,None], blockNodes]*inBlock).sum(axis=1)
+        changedReps, changedNodes = numpy.divmod(flatNodes, self.numNodes)
+        blockReps, blocks = numpy.divmod(numpy.unique(changedReps*self.numBlocks + changedNodes//self.blockSize), self.numBlocks)
+        blockNodes, inBlock = self.block_nodes(blocks)
+        self.channelBlockSums[blockReps, blocks] = self.channel_weights(blockReps[:,None], blockNodes, inBlock).sum(axis=1)
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def update_channel_sums(self, replicates):
+        # Recompute the global interaction channel sums of these replicates from scratch
+        # (between recomputations, set_node_states() keeps them up to date incrementally), and their block sums:
+        inChannelState = (self.X[replicates][:,:,None] == self.propensityChannelStates)
+        weights = self.propensityChannelCoeffs[replicates]*inChannelState
+        self.channelSums[replicates] = weights.sum(axis=1)
+        self.channelBlockSums[replicates] = self.block_totals(weights)
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def block_totals(self, values):
+        # Sums of (replicates x nodes [x columns]) values over the blocks of nodes:
+        padded = numpy.zeros((values.shape[0], self.numBlocks*self.blockSize) + values.shape[2:])
+        padded[:, :self.numNodes] = values
+        return padded.reshape((values.shape[0], self.numBlocks, self.blockSize) + values.shape[2:]).sum(axis=2)
+
+    def block_nodes(self, blocks):
+        # The node indices of the given blocks (one row per block), clipped to the last node, and which of them are in the block:
+        blockNodes = blocks[:,None]*self.blockSize + numpy.arange(self.blockSize)
+        return numpy.minimum(blockNodes, self.numNodes-1), (blockNodes < self.numNodes)
+
+    def channel_weights(self, replicates, nodes, in_block, channels=None):
+        # Channel coefficients of the given (replicate, node) index arrays for the nodes in each channel's state
+        # (for all channels, along a last axis, or for the given channel of each row), zero outside the block:
+        if(channels is None):
+            inChannelState = (self.X[replicates, nodes][:,:,None] == self.propensityChannelStates)
+            return self.propensityChannelCoeffs[replicates, nodes]*inChannelState*in_block[:,:,None]
+        inChannelState = (self.X[replicates, nodes] == self.propensityChannelStates[channels][:,None])
+        return self.propensityChannelCoeffs[replicates, nodes, channels[:,None]]*inChannelState*in_block
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def draw_uniforms(self, replicates, num_draws):
+        # Take num_draws uniform numbers in [0,1) for each given replicate from its own stream:
+        exhausted = replicates[self.randBufferIdx[replicates] + num_draws > self.randBufferSize]
+        for r in exhausted:
+            self.randBuffer[r]    = self.rngs[r].random(self.randBufferSize)
+            self.randBufferIdx[r] = 0
+        draws = self.randBuffer[replicates[:,None], self.randBufferIdx[replicates][:,None] + numpy.arange(num_draws)]
+        self.randBufferIdx[replicates] += num_draws
+        return draws
+
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def set_node_states(self, replicates, nodes, newStates):
+        # Vectorized state changes for (replicate, node) pairs (at most one per node), keeping the per-replicate
+        # state counts, the global interaction channel sums, and the isolation bookkeeping in sync:
+        oldStates = self.X[replicates, nodes]
+        self.X[replicates, nodes] = newStates
+        numpy.subtract.at(self.stateCounts, (replicates, oldStates), 1)
+        numpy.add.at(self.stateCounts, (replicates, newStates), 1)
+        numpy.add.at(self.channelSums, replicates, self.propensityChannelCoeffs[replicates, nodes]
+                                                    * ((newStates[:,None]==self.propensityChannelStates).astype(int) - (oldStates[:,None]==self.propensityChannelStates)))
+        #----------------------------------------
+        # Entering isolation; schedule the exit for when the node's isolation timer will reach the isolation time:
+        entering = self.isIsolatedState[newStates] & ~self.isIsolatedState[oldStates]
+        if(numpy.any(entering)):
+            enteringReps, enteringNodes = replicates[entering], nodes[entering]
+            self.isolationStartTime[enteringReps, enteringNodes] = self.t[enteringReps]
+            self.isolationExitTime[enteringReps, enteringNodes]  = self.t[enteringReps] + self.isolationTime[enteringReps, enteringNodes] - self.timer_isolation[enteringReps, enteringNodes]
+            numpy.minimum.at(self.nextIsolationExit, enteringReps, self.isolationExitTime[enteringReps, enteringNodes])
+        # Leaving isolation; keep the accumulated isolation time (and find the next exit of the replicates whose earliest exit this was):
+        leaving = self.isIsolatedState[oldStates] & ~self.isIsolatedState[newStates]
+        if(numpy.any(leaving)):
+            leavingReps, leavingNodes = replicates[leaving], nodes[leaving]
+            self.timer_isolation[leavingReps, leavingNodes]  += self.t[leavingReps] - self.isolationStartTime[leavingReps, leavingNodes]
+            earliest = numpy.unique(leavingReps[self.isolationExitTime[leavingReps, leavingNodes] <= self.nextIsolationExit[leavingReps]])
+            self.isolationExitTime[leavingReps, leavingNodes] = numpy.inf
+            self.nextIsolationExit[earliest] = self.isolationExitTime[earliest].min(axis=1)
+        return oldStates
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def introduce_exposures(self, replicate, num_new_exposures):
+        rng = self.rngs[replicate]
+        exposedNodes = rng.choice(self.numNodes, size=min(num_new_exposures, self.numNodes), replace=False)
+        newStates = self.X[replicate, exposedNodes].copy()
+        newStates[newStates==self.S]   = self.E
+        newStates[newStates==self.Q_S] = self.Q_E
+        replicates = numpy.full(len(exposedNodes), replicate)
+        self.set_node_states(replicates, exposedNodes, newStates)
+        self.update_propensities(replicates, exposedNodes)
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def read_isolation_schedule(self, replicate):
+        # Take over the isolation bookkeeping of the replicate's model (whose isolation timers are up to date):
+        model     = self.models[replicate]
+        isolated  = self.isIsolatedState[self.X[replicate]]
+        self.timer_isolation[replicate]    = model.timer_isolation
+        self.isolationStartTime[replicate] = model.isolationStartTime
+        self.isolationExitTime[replicate]  = numpy.where(isolated, model.isolationStartTime + self.isolationTime[replicate] - model.timer_isolation, numpy.inf)
+        self.nextIsolationExit[replicate]  = self.isolationExitTime[replicate].min()
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def write_replicate_state(self, replicate):
+        # Bring the replicate's model object up to date with the batch (node states and statuses, timers, counters,
+        # and isolation schedule), so that the model's own methods can be applied to it:
+        model = self.models[replicate]
+        isolated = self.isIsolatedState[self.X[replicate]]
+        model.t                     = float(self.t[replicate])
+        model.tmax                  = float(self.tmax[replicate])
+        model.X                     = self.X[replicate].reshape((self.numNodes, 1)).copy()
+        model.tested                = self.tested[replicate].reshape((self.numNodes, 1)).copy()
+        model.positive              = self.positive[replicate].reshape((self.numNodes, 1)).copy()
+        model.testedInCurrentState  = self.testedInCurrentState[replicate].reshape((self.numNodes, 1)).copy()
+        model.timer_state           = (self.t[replicate] - self.stateStartTime[replicate]).reshape((self.numNodes, 1))
+        model.timer_isolation       = self.timer_isolation[replicate] + isolated*(self.t[replicate] - self.isolationStartTime[replicate])
+        model.propensityTree        = None
+        model.update_state_counts()
+        model.reset_isolation_schedule()
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def read_replicate_state(self, replicate):
+        # Take over the changes made to the replicate's model object since write_replicate_state():
+        model = self.models[replicate]
+        newX        = model.X.ravel().astype(int)
+        newPositive = model.positive.ravel().astype(bool)
+        changedNodes = numpy.flatnonzero((newX != self.X[replicate]) | (newPositive != self.positive[replicate]))
+        replicates   = numpy.full(len(changedNodes), replicate)
+        stateChanged = (newX[changedNodes] != self.X[replicate, changedNodes])
+        self.set_node_states(replicates[stateChanged], changedNodes[stateChanged], newX[changedNodes[stateChanged]])
+        self.tested[replicate]               = model.tested.ravel()
+        self.positive[replicate]             = newPositive
+        self.testedInCurrentState[replicate] = model.testedInCurrentState.ravel()
+        self.stateStartTime[replicate]       = self.t[replicate] - model.timer_state.ravel()
+        self.numTestedNodes[replicate]       = model.numTestedNodes
+        self.numPositiveNodes[replicate]     = model.numPositiveNodes
+        model.update_isolation_timers()
+        self.read_isolation_schedule(replicate)
+        self.update_propensities(replicates, changedNodes)
+        self.update_channel_sums(numpy.array([replicate]))
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def apply_daily_policy(self, replicate, daily_policy):
+        # Apply daily_policy(replicate, model) to the up-to-date model object of the replicate:
+        self.write_replicate_state(replicate)
+        daily_policy(replicate, self.models[replicate])
+        self.read_replicate_state(replicate)
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def increase_data_series_length(self):
+        # Double the number of timestep slots for all replicates:
+        for series in self.dataSeries:
+            data = getattr(self, series)
+            setattr(self, series, numpy.hstack([data, numpy.zeros_like(data)]))
+        return None
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def record_data_series(self, replicates):
+        tidx    = self.tidx[replicates]
+        counts  = self.stateCounts[replicates]
+        self.tseries[replicates, tidx]     = self.t[replicates]
+        self.numS[replicates, tidx]        = counts[:, self.S]
+        self.numE[replicates, tidx]        = counts[:, self.E]
+        self.numI_pre[replicates, tidx]    = counts[:, self.I_pre]
+        self.numI_sym[replicates, tidx]    = counts[:, self.I_sym]
+        self.numI_asym[replicates, tidx]   = counts[:, self.I_asym]
+        self.numH[replicates, tidx]        = counts[:, self.H]
+        self.numR[replicates, tidx]        = counts[:, self.R]
+        self.numF[replicates, tidx]        = counts[:, self.F]
+        self.numQ_S[replicates, tidx]      = counts[:, self.Q_S]
+        self.numQ_E[replicates, tidx]      = counts[:, self.Q_E]
+        self.numQ_pre[replicates, tidx]    = counts[:, self.Q_pre]
+        self.numQ_sym[replicates, tidx]    = counts[:, self.Q_sym]
+        self.numQ_asym[replicates, tidx]   = counts[:, self.Q_asym]
+        self.numQ_R[replicates, tidx]      = counts[:, self.Q_R]
+        self.N[replicates, tidx]           = self.numNodes - counts[:, self.F]
+        self.numTested[replicates, tidx]   = self.numTestedNodes[replicates]
+        self.numPositive[replicates, tidx] = self.numPositiveNodes[replicates]
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def finalize_replicate(self, replicate):
+        # Write the replicate's final state back to its model object and pass its data series rows
+        # through the model's recorder, so downstream code can use the models as usual:
+        model = self.models[replicate]
+        length = self.tidx[replicate]+1
+        self.write_replicate_state(replicate)
+        rows = numpy.vstack([getattr(self, series)[replicate, 1:length] for series in self.dataSeries])
+        for i in range(rows.shape[1]):
+            model.recorder.offer(model, rows[:,i])
+        model.tidx                  = int(model.tidx + self.tidx[replicate])
+        model.finalize_data_series()
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def replicate_results(self):
+        # Summary outcomes of each replicate (from the data series recorded so far):
+        results = []
+        for r in range(self.numReplicates):
+            tidx = self.tidx[r]
+            results.append({ 't':                   self.t[r],
+                             'num_events':          tidx,
+                             'total_infected':      self.numNodes - self.numS[r, tidx] - self.numQ_S[r, tidx],
+                             'peak_H':              numpy.max(self.numH[r, :tidx+1]),
+                             'num_F':               self.numF[r, tidx],
+                             'num_positive':        self.numPositive[r, tidx] })
+        return results
+
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def select_transitions(self, replicates, r2):
+        # The node and transition type of the next event of each of the given replicates (given one uniform number
+        # per replicate), and the total propensity of each replicate (0 if it has no possible events, in which case
+        # its node and transition type are meaningless):
+        counts   = self.stateCounts[replicates]
+        N        = (self.numNodes - counts[:, self.F]).astype(float)
+        infectiousCounts = numpy.column_stack([counts[:, self.I_sym], counts[:, self.I_pre] + counts[:, self.I_asym],
+                                               counts[:, self.Q_pre] + counts[:, self.Q_sym] + counts[:, self.Q_asym]])
+        countScales   = numpy.divide(infectiousCounts, N[:,None], out=numpy.zeros(infectiousCounts.shape), where=N[:,None]>0)
+        channelScales = countScales[:, self.propensityChannelCounts]
+        channelTotals = numpy.maximum(self.channelSums[replicates], 0)*channelScales
+
+        blockCumsum = self.blockPropensities[replicates].cumsum(axis=1)
+        tableTotal  = blockCumsum[:,-1]
+        alpha       = tableTotal + channelTotals.sum(axis=1)
+
+        transitionNodes = numpy.zeros(len(replicates), dtype=int)
+        transitionCols  = numpy.zeros(len(replicates), dtype=int)
+        target          = r2*alpha
+
+        #----------------------------------------
+        # Events from the propensity table (the block, the node within the block, then the transition type within the node's row):
+        #----------------------------------------
+        fromTable = numpy.flatnonzero((alpha > 0) & (target < tableTotal))
+        if(len(fromTable) > 0):
+            reps       = replicates[fromTable]
+            blocks, residual = self.select_in_rows(blockCumsum[fromTable], self.blockPropensities[reps], target[fromTable])
+            blockNodes, inBlock = self.block_nodes(blocks)
+            nodeIdx, residual = self.select_in_rows(None, self.nodePropensities[reps[:,None], blockNodes]*inBlock, residual)
+            tableNodes = blockNodes[numpy.arange(len(fromTable)), nodeIdx]
+            rows       = self.propensityTable[reps, tableNodes]
+            tableCols  = numpy.minimum((rows.cumsum(axis=1) <= residual[:,None]).sum(axis=1), self.numTransitionTypes-1)
+            emptyCols  = (rows[numpy.arange(len(fromTable)), tableCols] <= 0)
+            tableCols[emptyCols] = self.numTransitionTypes-1 - numpy.argmax(rows[emptyCols, ::-1] > 0, axis=1)
+            transitionNodes[fromTable] = tableNodes
+            transitionCols[fromTable]  = tableCols
+
+        #----------------------------------------
+        # Events from the global interaction channels (the channel, then the node weighted by its channel coefficient):
+        #----------------------------------------
+        fromChannels = numpy.flatnonzero((alpha > 0) & (target >= tableTotal))
+        if(len(fromChannels) > 0):
+            channelTarget = target[fromChannels] - tableTotal[fromChannels]
+            channelCumsum = channelTotals[fromChannels].cumsum(axis=1)
+            lastChannels  = channelTotals.shape[1]-1 - numpy.argmax(channelTotals[fromChannels, ::-1] > 0, axis=1)
+            channels      = numpy.minimum((channelCumsum <= channelTarget[:,None]).sum(axis=1), lastChannels)
+            rowIdx        = numpy.arange(len(fromChannels))
+            residual      = (channelTarget - (channelCumsum[rowIdx, channels] - channelTotals[fromChannels, channels]))/channelScales[fromChannels, channels]
+            reps          = replicates[fromChannels]
+            blockSums     = self.channelBlockSums[reps, :, channels]
+            blocks, residual = self.select_in_rows(None, blockSums, residual)
+            blockNodes, inBlock = self.block_nodes(blocks)
+            nodeIdx, residual = self.select_in_rows(None, self.channel_weights(reps[:,None], blockNodes, inBlock, channels), residual)
+            transitionNodes[fromChannels] = blockNodes[rowIdx, nodeIdx]
+            transitionCols[fromChannels]  = self.propensityChannelCols[channels]
+
+        return alpha, transitionNodes, transitionCols
+
+    def select_in_rows(self, cumsums, weights, targets):
+        # The index in each row of weights at which its cumulative sum (given, or computed here) exceeds the row's target,
+        # and the residual target within that entry. (Round-off can leave a target at or past the row's last non-zero
+        # entry, in which case that entry is taken.)
+        if(cumsums is None):
+            cumsums = weights.cumsum(axis=1)
+        rowIdx  = numpy.arange(len(targets))
+        lastIdx = weights.shape[1]-1 - numpy.argmax(weights[:, ::-1] > 0, axis=1)
+        idx     = numpy.minimum((cumsums <= targets[:,None]).sum(axis=1), lastIdx)
+        return idx, targets - (cumsums[rowIdx, idx] - weights[rowIdx, idx])
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def run_iteration(self):
+
+        reps = self.activeReplicates
+
+        if(numpy.max(self.tidx[reps]) >= self.tseries.shape[1]-1):
+            # Room has run out in the timeseries storage arrays; double the size of these arrays:
+            self.increase_data_series_length()
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Generate 2 random numbers uniformly distributed in (0,1) for each running replicate
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        randoms = self.draw_uniforms(reps, 2)
+        r1 = 1.0 - randoms[:,0]
+        r2 = randoms[:,1]
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Compute which event takes place in each replicate, and when
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        alpha, transitionNodes, transitionCols = self.select_transitions(reps, r2)
+
+        tau = numpy.full(len(reps), 0.01)
+        eventful = alpha > 0
+        tau[eventful] = (1/alpha[eventful])*numpy.log(1/r1[eventful])
+        self.t[reps] += tau
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Perform the transitions:
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        transitionReps  = reps[eventful]
+        transitionNodes = transitionNodes[eventful]
+        transitionCols  = transitionCols[eventful]
+        self.set_node_states(transitionReps, transitionNodes, self.transitionNewStates[transitionCols])
+        self.testedInCurrentState[transitionReps, transitionNodes] = False
+        self.stateStartTime[transitionReps, transitionNodes] = self.t[transitionReps]
+        settingPositive = self.transitionSetsPositive[transitionCols] & ~self.positive[transitionReps, transitionNodes]
+        self.positive[transitionReps[settingPositive], transitionNodes[settingPositive]] = True
+        numpy.add.at(self.numPositiveNodes, transitionReps[settingPositive], 1)
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Release the nodes whose scheduled isolation exit time has been reached
+        # (and reset their isolation timers, as the models' set_isolation() does):
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        exitReps = reps[self.nextIsolationExit[reps] <= self.t[reps]]
+        exitingRepIdx, exitingNodes = numpy.nonzero(self.isolationExitTime[exitReps] <= self.t[exitReps,None])
+        exitingReps = exitReps[exitingRepIdx]
+        if(len(exitingNodes) > 0):
+            self.set_node_states(exitingReps, exitingNodes, self.releasedState[self.X[exitingReps, exitingNodes]])
+            self.timer_isolation[exitingReps, exitingNodes] = 0
+
+        self.update_propensities(numpy.concatenate([transitionReps, exitingReps]), numpy.concatenate([transitionNodes, exitingNodes]))
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+        self.tidx[reps] += 1
+        self.record_data_series(reps)
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Replicates that reached tmax or have no infections left drop out of the batch:
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        counts   = self.stateCounts[reps]
+        finished = (self.t[reps] >= self.tmax[reps]) | ((counts[:, self.isInfectedState].sum(axis=1) < 1) & (counts[:, self.isIsolatedState].sum(axis=1) < 1))
+        if(numpy.any(finished)):
+            self.running[reps[finished]] = False
+            for r in reps[finished]:
+                self.finalize_replicate(r)
+            self.activeReplicates = numpy.flatnonzero(self.running)
+
+        #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+        return numpy.any(self.running)
+
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+    def run(self, T, average_introductions_per_day=0, daily_policy=None, print_interval=10, verbose='t'):
+        # average_introductions_per_day may be one value for all replicates or one value per replicate.
+        # daily_policy(replicate, model), if given, is applied to each running replicate's model object at the start
+        # of each of the replicate's days (after that day's introductions), as run_tti_sim does for a single model.
+        if(T>0):
+            self.tmax += T
+        else:
+            return False
+
+        # Replicates that were finalized by a previous run but have time remaining rejoin the batch:
+        resumed = numpy.flatnonzero(~self.running & (self.t < self.tmax))
+        for r in resumed:
+            self.tidx[r] = 0
+        self.running[resumed] = True
+        self.record_data_series(resumed)
+        self.activeReplicates = numpy.flatnonzero(self.running)
+
+        introductionRates = numpy.broadcast_to(numpy.asarray(average_introductions_per_day, dtype=float), (self.numReplicates,))
+        lastDay = numpy.floor(self.t).astype(int) - 1
+
+        #%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+        # Run the simulation loop:
+        #%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+        print_reset = True
+        running     = len(self.activeReplicates) > 0
+        while running:
+
+            running = self.run_iteration()
+
+            #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+            # Introduce external exposures and apply the daily policy at the start of each new day of each replicate:
+            #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+            newDayReps = self.activeReplicates[self.t[self.activeReplicates].astype(int) != lastDay[self.activeReplicates]]
+            for r in newDayReps:
+                lastDay[r] = int(self.t[r])
+                if(introductionRates[r] > 0):
+                    numNewExposures = self.rngs[r].poisson(lam=introductionRates[r])
+                    if(numNewExposures > 0):
+                        self.introduce_exposures(r, numNewExposures)
+                if(daily_policy is not None):
+                    self.apply_daily_policy(r, daily_policy)
+
+            #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+            if(print_interval and running):
+                tmin = numpy.min(self.t[self.activeReplicates])
+                if(print_reset and (int(tmin) % print_interval == 0)):
+                    if(verbose=="t" or verbose==True):
+                        print("t = %.2f (%d of %d replicates running)" % (tmin, len(self.activeReplicates), self.numReplicates))
+                    print_reset = False
+                elif(not print_reset and (int(tmin) % 10 != 0)):
+                    print_reset = True
+
+        return True
+
+
+#%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+
+
+
+
+
+
+
 
 
 
+########################################################
+#@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@#
+#@                                                    @#
+#@  MODEL DATA STRUCTURES                             @#
+#@                                                    @#
+#@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@#
+########################################################
+
+class PropensitySumTree():
+    """
+    A binary sum tree over a fixed number of non-negative weights (e.g., per-node propensities)
+    ===================================================
+    Supports O(log n) weight updates and O(log n) selection of the leaf at which a cumulative
+    weight target falls, as used to sample Gillespie events without re-summing all propensities.
+    With columns > 1, several independent trees over the same leaves are kept side by side.
+    Internal nodes are recomputed from their children on update, so round-off does not accumulate.
+    """
+    def __init__(self, size, columns=1):
+        self.size     = int(size)
+        self.columns  = int(columns)
+        self.capacity = 1
+        while(self.capacity < self.size):
+            self.capacity *= 2
+        self.tree     = numpy.zeros((2*self.capacity, self.columns))
+
+    def set_all(self, weights):
+        self.tree[:] = 0
+        self.tree[self.capacity:self.capacity+self.size] = numpy.reshape(weights, (self.size, self.columns))
+        level = self.capacity
+        while(level > 1):
+            level = level//2
+            self.tree[level:2*level] = self.tree[2*level:4*level:2] + self.tree[2*level+1:4*level:2]
+
+    def update(self, indices, weights):
+        indices = numpy.atleast_1d(indices) + self.capacity
+        if(len(indices) == 0):
+            return
+        self.tree[indices] = numpy.reshape(weights, (len(indices), self.columns))
+        if(len(indices) == 1):
+            idx = int(indices[0])//2
+            while(idx >= 1):
+                self.tree[idx] = self.tree[2*idx] + self.tree[2*idx+1]
+                idx = idx//2
+        else:
+            # (duplicate parents just recompute the same sum, which is cheaper than deduplicating each level)
+            parents = indices//2
+            while(parents[0] >= 1):
+                self.tree[parents] = self.tree[2*parents] + self.tree[2*parents+1]
+                parents = parents//2
+
+    def total(self):
+        return self.tree[1] if self.columns > 1 else self.tree[1,0]
+
+    def find(self, target, column=0):
+        # Returns the leaf index at which the cumulative weight exceeds target, and the residual target within that leaf.
+        # Zero-weight subtrees are never entered, so targets at or beyond the total resolve to the last non-zero leaf.
+        tree = self.tree[:,column]
+        idx  = 1
+        while(idx < self.capacity):
+            left = 2*idx
+            if(target < tree[left] or tree[left+1] <= 0):
+                idx = left
+            else:
+                target -= tree[left]
+                idx = left+1
+        return idx-self.capacity, target
+
+    def find_all(self, targets, column=0):
+        # find() for an array of targets at once (descending the tree one level at a time for all of them):
+        tree    = self.tree[:,column]
+        targets = numpy.array(targets, dtype=float)
+        idx     = numpy.ones(len(targets), dtype=int)
+        while(len(targets) > 0 and idx[0] < self.capacity):
+            left   = 2*idx
+            goLeft = (targets < tree[left]) | (tree[left+1] <= 0)
+            targets[~goLeft] -= tree[left[~goLeft]]
+            idx    = numpy.where(goLeft, left, left+1)
+        return idx-self.capacity, targets
+
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+class SeriesRecorder():
+    """
+    Records the data series of an ExtSEIRSNetworkModel (tseries, numS, ..., numPositive, node group series, Xseries)
+    ===================================================
+    Params:
+            interval        None to record a row at every event (default), or the simulated time between recorded rows
+                            (e.g., 1 for one row per simulated day); the final state is always recorded
+            capacity        Number of rows to preallocate (defaults to 6*numNodes for per-event recording)
+
+    Rows are written into preallocated contiguous arrays (one row per column, series along the first axis)
+    that double in size when full, and the model's series attributes are bound to views of the recorded rows.
+    The peak value of every series over all events (not only the recorded rows) is tracked as well.
+
+    With an interval, the rows are samples of the state at t0, t0+interval, t0+2*interval, ... (multiples of the
+    interval), whether or not any event happened in between: the state at a sample time is the state after the last
+    event up to that time, stamped with the sample time. Node group series and Xseries are then kept for the last
+    event as well, which costs a copy of them at every event.
+    """
+    seriesNames = ['tseries', 'numS', 'numE', 'numI_pre', 'numI_sym', 'numI_asym', 'numH', 'numR', 'numF',
+                   'numQ_S', 'numQ_E', 'numQ_pre', 'numQ_sym', 'numQ_asym', 'numQ_R', 'N', 'numTested', 'numPositive']
+
+    recordsAuxiliarySeries = True   # whether node group series and Xseries are recorded (when enabled on the model)
+
+    def __init__(self, interval=None, capacity=None):
+        self.interval = interval
+        self.initialCapacity = capacity
+
+    def start(self, model):
+        capacity = self.initialCapacity if self.initialCapacity is not None else (6*model.numNodes if self.interval is None else 128)
+        self.numNodes       = model.numNodes
+        self.numRows        = 0
+        self.data           = numpy.zeros((len(self.seriesNames), capacity))
+        self.groupData      = {}
+        if(self.recordsAuxiliarySeries and model.nodeGroupData):
+            self.groupData  = {groupName: numpy.zeros((len(self.seriesNames)-1, capacity)) for groupName in model.nodeGroupData}
+        self.Xdata          = numpy.zeros((capacity, model.numNodes), dtype='uint8') if (self.recordsAuxiliarySeries and model.store_Xseries) else None
+        row = model.current_series_row()
+        self.peaks          = row.copy()
+        self.lastRow        = row
+        self.lastAuxiliary  = None
+        self.store_row(model, row)
+        if(self.interval is not None):
+            self.nextSample = int(numpy.floor(row[0]/self.interval))+1
+            self.lastAuxiliary = self.auxiliary_rows(model)
+        self.bind(model)
+
+    def record(self, model):
+        # Called by the model after every event:
+        self.offer(model, model.current_series_row())
+
+    def offer(self, model, row):
+        numpy.maximum(self.peaks, row, out=self.peaks)
+        if(self.interval is None):
+            self.lastRow = row
+            self.store_row(model, row)
+            return
+        # Every sample time passed since the previous event holds the state after that event:
+        while(row[0] > self.nextSample*self.interval):
+            sampleRow    = self.lastRow.copy()
+            sampleRow[0] = self.nextSample*self.interval
+            self.store_row(model, sampleRow, self.lastAuxiliary)
+            self.nextSample += 1
+        self.lastRow       = row
+        self.lastAuxiliary = self.auxiliary_rows(model)
+        self.lastRowStored = False
+
+    def auxiliary_rows(self, model):
+        # Current node group series rows and Xseries row, when recorded (None otherwise):
+        if(not self.groupData and self.Xdata is None):
+            return None
+        return ({groupName: model.node_group_series_row(groupName) for groupName in self.groupData},
+                model.X.T.copy() if self.Xdata is not None else None)
+
+    def store_row(self, model, row, auxiliary=None):
+        # Stores the row, with the node group series and Xseries rows given (as from auxiliary_rows) or current ones:
+        if(self.numRows >= self.data.shape[1]):
+            # Room has run out in the preallocated storage; double its size:
+            self.increase_capacity(model)
+        self.data[:, self.numRows] = row
+        groupRows, Xrow = auxiliary if auxiliary is not None else (None, None)
+        for groupName, groupData in self.groupData.items():
+            groupData[:, self.numRows] = groupRows[groupName] if groupRows is not None else model.node_group_series_row(groupName)
+        if(self.Xdata is not None):
+            self.Xdata[self.numRows, :] = Xrow if Xrow is not None else model.X.T
+        self.numRows += 1
+        self.lastRowStored = True
+
+    def increase_capacity(self, model):
+        self.data = numpy.hstack([self.data, numpy.zeros_like(self.data)])
+        for groupName in self.groupData:
+            self.groupData[groupName] = numpy.hstack([self.groupData[groupName], numpy.zeros_like(self.groupData[groupName])])
+        if(self.Xdata is not None):
+            self.Xdata = numpy.vstack([self.Xdata, numpy.zeros_like(self.Xdata)])
+        # Keep the model's series attributes valid while the run continues:
+        self.bind(model)
+
+    def bind(self, model, length=None):
+        for j, series in enumerate(self.seriesNames):
+            setattr(model, series, self.data[j, :length])
+        for groupName, groupData in self.groupData.items():
+            for j, series in enumerate(self.seriesNames[1:]):
+                model.nodeGroupData[groupName][series] = groupData[j, :length]
+        if(self.Xdata is not None):
+            model.Xseries = self.Xdata[:length]
+
+    def finalize(self, model):
+        # Always end with the final state, then bind views of the recorded rows to the model:
+        if(not self.lastRowStored):
+            self.store_row(model, self.lastRow, self.lastAuxiliary)
+        self.bind(model, self.numRows)
+
+    def summary(self):
+        final = dict(zip(self.seriesNames, self.lastRow))
+        peak  = dict(zip(self.seriesNames, self.peaks))
+        return {'t':            final['tseries'],
+                # (every node that has left the susceptible states has been infected, including fatalities)
+                'attack_rate':  (self.numNodes - final['numS'] - final['numQ_S'])/self.numNodes,
+                'peak_numH':    peak['numH'],
+                'numF':         final['numF'],
+                'final':        final,
+                'peak':         peak}
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+class SummaryRecorder(SeriesRecorder):
+    """
+    Keeps only the initial and final rows of the data series, plus the peak of every series over all events
+    ===================================================
+    The reported outcomes (final attack rate, peak numH, numF) are available from summary().
+    """
+    def __init__(self):
+        SeriesRecorder.__init__(self, interval=None, capacity=2)
+
+    def offer(self, model, row):
+        numpy.maximum(self.peaks, row, out=self.peaks)
+        self.lastRow = row
+        self.lastRowStored = False
+
+    def finalize(self, model):
+        self.numRows = 1
+        self.store_row(model, self.lastRow)
+        self.bind(model, self.numRows)
+
+#^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+class ChunkedSinkRecorder(SeriesRecorder):
+    """
+    Streams the recorded rows of the data series to a CSV file in fixed-size chunks
+    ===================================================
+    Params:
+            path            CSV file to write (overwritten when the model is created)
+            interval        None to record a row at every event (default), or the simulated time between recorded rows
+            chunk_size      Number of rows buffered in memory before they are appended to the file
+
+    Only the main data series are written (node group series and Xseries are not recorded). After the run,
+    the model's series attributes hold the initial and final rows; load() reads the full series back.
+    """
+    recordsAuxiliarySeries = False
+
+    def __init__(self, path, interval=None, chunk_size=10000):
+        SeriesRecorder.__init__(self, interval=interval, capacity=chunk_size)
+        self.path = path
+
+    def start(self, model):
+        with open(self.path, 'w') as sinkFile:
+            sinkFile.write(','.join(self.seriesNames)+'\n')
+        self.numRowsWritten = 0
+        self.firstRow       = None
+        SeriesRecorder.start(self, model)
+        self.firstRow       = self.data[:, 0].copy()
+
+    def store_row(self, model, row, auxiliary=None):
+        if(self.numRows >= self.data.shape[1]):
+            self.write_chunk()
+        SeriesRecorder.store_row(self, model, row, auxiliary)
+
+    def write_chunk(self):
+        if(self.numRows > 0):
+            with open(self.path, 'a') as sinkFile:
+                numpy.savetxt(sinkFile, self.data[:, :self.numRows].T, delimiter=',', fmt='%.10g')
+            self.numRowsWritten += self.numRows
+            self.numRows = 0
+
+    def bind(self, model, length=None):
+        # (the in-memory chunk is reused, so the model gets copies of the initial and latest rows)
+        for j, series in enumerate(self.seriesNames):
+            setattr(model, series, numpy.array([self.lastRow[j]] if self.firstRow is None else [self.firstRow[j], self.lastRow[j]]))
+
+    def finalize(self, model):
+        if(not self.lastRowStored):
+            self.store_row(model, self.lastRow)
+        self.write_chunk()
+        self.bind(model)
+
+    def load(self):
+        data = numpy.loadtxt(self.path, delimiter=',', skiprows=1, ndmin=2)
+        return {series: data[:, j] for j, series in enumerate(self.seriesNames)}
+
+
+
+#%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+class ModelProfiler():
+    """
+    Accumulates per-phase wall-clock timers and event counters for ExtSEIRSNetworkModel simulations
+    ===================================================
+    Params:
+            methods         Names of the model methods timed as phases (defaults to ModelProfiler.profiledMethods)
+
+    A profiler given to the model (profiler=...) replaces the listed methods of that model instance, and the record
+    method of its recorder, with timed wrappers, so uninstrumented models run unchanged code. Phase times are
+    inclusive of the phases nested within them (run_iteration includes calc_propensities, run_event, record, ...).
+    Code outside of the model times its own phases with phase(name); run_tti_sim times its daily policy this way.
+    Events are the state transitions made by the stochastic solver (run_event, run_leap), counted by transition type;
+    state changes made outside of the solver (e.g., isolation and release by the testing policy) are counted separately.
+    """
+    profiledMethods = ['run_iteration', 'calc_propensities', 'select_incremental_transition', 'update_incremental_propensities',
+                       'run_event', 'select_leap_time', 'run_leap', 'set_isolation', 'introduce_exposures']
+
+    solverMethods   = ['run_event', 'run_leap']
+
+    def __init__(self, methods=None):
+        self.methods = methods if methods is not None else self.profiledMethods
+        self.reset()
+
+    def reset(self):
+        self.phaseTimes         = {}
+        self.phaseCalls         = {}
+        self.eventCounts        = {}
+        self.otherStateChanges  = {}
+        self.numEvents          = 0
+        self.solverDepth        = 0
+        self.model              = None
+        self.startTime          = time.perf_counter()
+        self.lastTime           = self.startTime
+        self.startSimTime       = 0
+
+    def attach(self, model):
+        self.model        = model
+        self.startTime    = time.perf_counter()
+        self.lastTime     = self.startTime
+        self.startSimTime = model.t
+        for method in self.methods:
+            if(hasattr(model, method)):
+                setattr(model, method, self.timed(method, getattr(model, method)))
+        model.recorder.record = self.timed('record', model.recorder.record)
+        model.set_node_state  = self.counted(model, model.set_node_state)
+
+    def add_time(self, phase, seconds):
+        self.lastTime = time.perf_counter()
+        self.phaseTimes[phase] = self.phaseTimes.get(phase, 0.0) + seconds
+        self.phaseCalls[phase] = self.phaseCalls.get(phase, 0) + 1
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        startTime = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_time(name, time.perf_counter() - startTime)
+
+    def timed(self, phase, method):
+        solverPhase = phase in self.solverMethods
+        def timed_method(*args, **kwargs):
+            startTime = time.perf_counter()
+            self.solverDepth += solverPhase
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.solverDepth -= solverPhase
+                self.add_time(phase, time.perf_counter() - startTime)
+        return timed_method
+
+    def counted(self, model, set_node_state):
+        transitionNames = {(transition['currentState'], transition['newState']): transitionType for transitionType, transition in model.transitions.items()}
+        stateNames      = {getattr(model, state): state for state in ['S', 'E', 'I_pre', 'I_sym', 'I_asym', 'H', 'R', 'F',
+                                                                      'Q_S', 'Q_E', 'Q_pre', 'Q_sym', 'Q_asym', 'Q_R']}
+        def counted_set_node_state(node, newState):
+            oldState = model.X[node,0]
+            set_node_state(node, newState)
+            if(oldState != newState):
+                transitionType = transitionNames.get((oldState, newState), stateNames[oldState]+'->'+stateNames[newState])
+                if(self.solverDepth > 0):
+                    self.eventCounts[transitionType] = self.eventCounts.get(transitionType, 0) + 1
+                    self.numEvents += 1
+                else:
+                    self.otherStateChanges[transitionType] = self.otherStateChanges.get(transitionType, 0) + 1
+        return counted_set_node_state
+
+    def report(self):
+        # Summary of the accumulated timers and counters (plain numbers, so it can be stored as JSON); the wall time runs
+        # from attaching to the model to the end of the last timed phase, and events are per second of that wall time:
+        wallTime = self.lastTime - self.startTime
+        simTime  = (self.model.t - self.startSimTime) if self.model is not None else 0
+        return {'wall_time':            wallTime,
+                'sim_time':             float(simTime),
+                'num_iterations':       self.phaseCalls.get('run_iteration', 0),
+                'num_events':           self.numEvents,
+                'events_per_sec':       self.numEvents/wallTime if wallTime > 0 else 0,
+                'time_per_sim_day':     float(wallTime/simTime) if simTime > 0 else 0,
+                'phases':               {phase: {'seconds':self.phaseTimes[phase], 'calls':self.phaseCalls[phase]} for phase in self.phaseTimes},
+                'events':               dict(self.eventCounts),
+                'other_state_changes':  {transitionType: int(count) for transitionType, count in self.otherStateChanges.items()}}
+
+
+#%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+#%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
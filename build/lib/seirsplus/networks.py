@@ -1,6 +1,14 @@
 from __future__ import division
+import hashlib
+import json
+import os
+import random
+import shutil
+import uuid
+
 import numpy
 import scipy
+import scipy.sparse
 import networkx
 from . import FARZ
 from .models import *
@@ -8,75 +16,161 @@ from .models import *
 import matplotlib.pyplot as pyplot
 
 
+# Bumped whenever a change to the generator changes the network generated from the same parameters and seed,
+# so that stale cached networks are not reused:
+WORKPLACE_NETWORK_CACHE_VERSION = 1
+
+
 
 
 def generate_workplace_contact_network(num_cohorts=1, num_nodes_per_cohort=100, num_teams_per_cohort=10,
                                         mean_intracohort_degree=6, pct_contacts_intercohort=0.2,
                                         farz_params={'alpha':5.0, 'gamma':5.0, 'beta':0.5, 'r':1, 'q':0.0, 'phi':10, 
                                                      'b':0, 'epsilon':1e-6, 'directed': False, 'weighted': False},
-                                        distancing_scales=[]):
+                                        distancing_scales=[], graph_format='networkx', seed=None, cache_dir=None, mmap=False):
+    # Returns the workplace contact network (a networkx Graph, or its scipy csr_matrix adjacency if graph_format='csr'),
+    # together with the node indices of each cohort and team.
+    # The network is drawn from the global random and numpy.random streams, or from private streams seeded by seed.
+    # If a cache_dir is given (which requires a seed), networks are stored there under a digest of the generator
+    # parameters and seed, and later calls with the same parameters and seed load the stored network instead
+    # (with mmap=True, the adjacency arrays are memory-mapped rather than read into memory).
+
+    assert(graph_format in ['networkx', 'csr']), "Unrecognized graph format (support for 'networkx' and 'csr')."
+
+    if(cache_dir is not None):
+        assert(seed is not None), "A seed is required to cache workplace networks."
+        cachePath = os.path.join(cache_dir, 'workplace-'+workplace_network_cache_key(num_cohorts, num_nodes_per_cohort, num_teams_per_cohort,
+                                                                                     mean_intracohort_degree, pct_contacts_intercohort, farz_params, seed))
+        if(os.path.isdir(cachePath)):
+            workplaceAdjMatrix, cohorts_indices, teams_indices = load_workplace_network(cachePath, mmap=mmap)
+        else:
+            workplaceAdjMatrix, cohorts_indices, teams_indices = generate_workplace_adjacency_matrix(num_cohorts, num_nodes_per_cohort, num_teams_per_cohort,
+                                                                                                    mean_intracohort_degree, pct_contacts_intercohort, farz_params, seed)
+            save_workplace_network(cachePath, workplaceAdjMatrix, cohorts_indices, teams_indices)
+    else:
+        workplaceAdjMatrix, cohorts_indices, teams_indices = generate_workplace_adjacency_matrix(num_cohorts, num_nodes_per_cohort, num_teams_per_cohort,
+                                                                                                mean_intracohort_degree, pct_contacts_intercohort, farz_params, seed)
+
+    if(graph_format == 'networkx'):
+        workplaceNetwork = networkx.from_scipy_sparse_matrix(workplaceAdjMatrix)
+        return workplaceNetwork, cohorts_indices, teams_indices
+    else:
+        return workplaceAdjMatrix, cohorts_indices, teams_indices
+
+
+def generate_workplace_adjacency_matrix(num_cohorts, num_nodes_per_cohort, num_teams_per_cohort,
+                                        mean_intracohort_degree, pct_contacts_intercohort, farz_params, seed=None):
+
+    farzRNG  = random.Random(seed) if seed is not None else random
+    numpyRNG = numpy.random.RandomState(seed) if seed is not None else numpy.random
 
     #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Generate FARZ networks of intra-cohort contacts:
     #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-    cohortNetworks = []
+    # The cohort adjacency matrices lie along the diagonal of the workplace adjacency matrix,
+    # so their CSR arrays are concatenated, shifted by the node and nonzero offsets of each cohort:
+    indptrs, indices, data = [numpy.zeros(1, dtype=numpy.int64)], [], []
 
-    teams_indices = {}
+    cohorts_indices = {}
+    teams_indices   = {}
+    cohortSizes     = []
 
+    cohortStartIdx = 0
     for i in range(num_cohorts):
 
         numNodes            = num_nodes_per_cohort[i] if isinstance(num_nodes_per_cohort, list) else num_nodes_per_cohort
         numTeams            = num_teams_per_cohort[i] if isinstance(num_teams_per_cohort, list) else num_teams_per_cohort
         cohortMeanDegree    = mean_intracohort_degree[i] if isinstance(mean_intracohort_degree, list) else mean_intracohort_degree
 
-        farz_params.update({'n':numNodes, 'k':numTeams, 'm':cohortMeanDegree})
+        cohortGraph, cohortTeams = FARZ.realize(**dict(farz_params, n=numNodes, k=numTeams, m=cohortMeanDegree), rng=farzRNG)
 
-        cohortNetwork, cohortTeamLabels = FARZ.generate(farz_params=farz_params)
+        cohortAdjMatrix = cohortGraph.to_csr()
+        indptrs.append(cohortAdjMatrix.indptr[1:].astype(numpy.int64) + indptrs[-1][-1])
+        indices.append(cohortAdjMatrix.indices.astype(numpy.int64) + cohortStartIdx)
+        data.append(cohortAdjMatrix.data)
 
-        cohortNetworks.append(cohortNetwork)
+        cohorts_indices['c'+str(i)] = list(range(cohortStartIdx, cohortStartIdx+numNodes))
 
-        for node, teams in cohortTeamLabels.items():
-            for team in teams:
+        for node in range(numNodes):
+            for team, _ in cohortTeams.memberships[node]:
                 try:
-                    teams_indices['c'+str(i)+'-t'+str(team)].append(node)
+                    teams_indices['c'+str(i)+'-t'+str(team)].append(node+cohortStartIdx)
                 except KeyError:
-                    teams_indices['c'+str(i)+'-t'+str(team)] = [node]    
+                    teams_indices['c'+str(i)+'-t'+str(team)] = [node+cohortStartIdx]
 
-    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    # Establish inter-cohort contacts:
-    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        cohortSizes.append(numNodes)
+        cohortStartIdx += numNodes
 
-    cohortsAdjMatrices = [networkx.adj_matrix(cohortNetwork) for cohortNetwork in cohortNetworks]
+    N = cohortStartIdx
 
-    workplaceAdjMatrix = scipy.sparse.block_diag(cohortsAdjMatrices)
-    workplaceNetwork   = networkx.from_scipy_sparse_matrix(workplaceAdjMatrix)
+    workplaceAdjMatrix = scipy.sparse.csr_matrix((numpy.concatenate(data), numpy.concatenate(indices), numpy.concatenate(indptrs)), shape=(N, N))
 
-    N = workplaceNetwork.number_of_nodes()
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Establish inter-cohort contacts:
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-    cohorts_indices = {}
-    cohortStartIdx  = -1
-    cohortFinalIdx  = -1
-    for c, cohortNetwork in enumerate(cohortNetworks):
-
-        cohortStartIdx = cohortFinalIdx + 1
-        cohortFinalIdx = cohortStartIdx + cohortNetwork.number_of_nodes() - 1
-        cohorts_indices['c'+str(c)] = list(range(cohortStartIdx, cohortFinalIdx))
-
-        for team, indices in teams_indices.items():
-            if('c'+str(c) in team):
-                teams_indices[team] = [idx+cohortStartIdx for idx in indices]
-
-        for i in list(range(cohortNetwork.number_of_nodes())):
-            i_intraCohortDegree = cohortNetwork.degree[i]
-            i_interCohortDegree = int( ((1/(1-pct_contacts_intercohort))*i_intraCohortDegree)-i_intraCohortDegree )
-            # Add intercohort edges:
-            if(len(cohortNetworks) > 1):
-                for d in list(range(i_interCohortDegree)):
-                    j = numpy.random.choice(list(range(0, cohortStartIdx))+list(range(cohortFinalIdx+1, N)))
-                    workplaceNetwork.add_edge(i, j)
-
-    return workplaceNetwork, cohorts_indices, teams_indices
+    if(num_cohorts > 1 and pct_contacts_intercohort > 0):
+        cohortSizes         = numpy.array(cohortSizes)
+        cohortStarts        = numpy.cumsum(cohortSizes) - cohortSizes
+        cohortOfNode        = numpy.repeat(numpy.arange(num_cohorts), cohortSizes)
+
+        intraCohortDegree   = numpy.diff(workplaceAdjMatrix.indptr)
+        interCohortDegree   = ((1/(1-pct_contacts_intercohort))*intraCohortDegree - intraCohortDegree).astype(int)
+
+        # Each inter-cohort contact of a node is drawn uniformly from the nodes outside its cohort
+        # (as a draw from [0, N - cohort size) shifted past the cohort's own index range):
+        sources             = numpy.repeat(numpy.arange(N), interCohortDegree)
+        sourceCohorts       = cohortOfNode[sources]
+        targets             = numpyRNG.randint(0, N - cohortSizes[sourceCohorts])
+        targets             = targets + (targets >= cohortStarts[sourceCohorts]) * cohortSizes[sourceCohorts]
+
+        # Repeated contacts between the same pair of nodes make a single edge:
+        edgeKeys            = numpy.unique(numpy.minimum(sources, targets)*N + numpy.maximum(sources, targets))
+        u, v                = edgeKeys // N, edgeKeys % N
+        interCohortAdjMatrix = scipy.sparse.csr_matrix((numpy.ones(2*len(edgeKeys)), (numpy.concatenate([u, v]), numpy.concatenate([v, u]))), shape=(N, N))
+
+        workplaceAdjMatrix  = (workplaceAdjMatrix + interCohortAdjMatrix).tocsr()
+        workplaceAdjMatrix.sort_indices()
+
+    return workplaceAdjMatrix, cohorts_indices, teams_indices
+
+
+def workplace_network_cache_key(num_cohorts, num_nodes_per_cohort, num_teams_per_cohort,
+                                mean_intracohort_degree, pct_contacts_intercohort, farz_params, seed):
+    # A stable digest of everything the generated network depends on:
+    params = {'version':WORKPLACE_NETWORK_CACHE_VERSION, 'num_cohorts':num_cohorts, 'num_nodes_per_cohort':num_nodes_per_cohort,
+              'num_teams_per_cohort':num_teams_per_cohort, 'mean_intracohort_degree':mean_intracohort_degree,
+              'pct_contacts_intercohort':pct_contacts_intercohort, 'farz_params':farz_params, 'seed':seed}
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def save_workplace_network(path, adjacency_matrix, cohorts_indices, teams_indices):
+    # The network is written to a temporary directory that is then renamed into place,
+    # so concurrent workers generating the same network never load a partially written one.
+    tempPath = path+'.tmp-'+uuid.uuid4().hex[:8]
+    os.makedirs(tempPath)
+    numpy.save(os.path.join(tempPath, 'indptr.npy'), adjacency_matrix.indptr)
+    numpy.save(os.path.join(tempPath, 'indices.npy'), adjacency_matrix.indices)
+    numpy.save(os.path.join(tempPath, 'data.npy'), adjacency_matrix.data)
+    with open(os.path.join(tempPath, 'groups.json'), 'w') as groupsFile:
+        json.dump({'shape':list(adjacency_matrix.shape), 'cohorts':cohorts_indices, 'teams':teams_indices}, groupsFile)
+    try:
+        os.rename(tempPath, path)
+    except OSError:
+        # (another worker stored the same network first)
+        shutil.rmtree(tempPath, ignore_errors=True)
+
+
+def load_workplace_network(path, mmap=False):
+    mmapMode = 'r' if mmap else None
+    with open(os.path.join(path, 'groups.json')) as groupsFile:
+        groups = json.load(groupsFile)
+    adjacencyMatrix = scipy.sparse.csr_matrix((numpy.load(os.path.join(path, 'data.npy'), mmap_mode=mmapMode),
+                                               numpy.load(os.path.join(path, 'indices.npy'), mmap_mode=mmapMode),
+                                               numpy.load(os.path.join(path, 'indptr.npy'), mmap_mode=mmapMode)),
+                                              shape=tuple(groups['shape']))
+    return adjacencyMatrix, groups['cohorts'], groups['teams']
 
 
 # %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
@@ -1,4 +1,5 @@
 from __future__ import division
+import contextlib
 import pickle
 import numpy
 
@@ -16,58 +17,16 @@ def run_tti_sim(model, T,
                 isolation_compliance_positive_individual=[None], isolation_compliance_positive_groupmate=[None],
                 isolation_compliance_positive_contact=[None], isolation_compliance_positive_contactgroupmate=[None],
                 isolation_lag_symptomatic=1, isolation_lag_positive=1, isolation_lag_contact=0, isolation_groups=None,
-                cadence_testing_days=None, cadence_cycle_length=110, temporal_falseneg_rates=None
+                cadence_testing_days=None, cadence_cycle_length=None, temporal_falseneg_rates=None,
+                testing_scenario=None, verbose=True
                 ):
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-    # Testing cadences involve a repeating 28 day cycle starting on a Monday
-    # (0:Mon, 1:Tue, 2:Wed, 3:Thu, 4:Fri, 5:Sat, 6:Sun, 7:Mon, 8:Tues, ...)
-    # For each cadence, testing is done on the day numbers included in the associated list.
-    if (cadence_testing_days is None):
-        cadence_testing_days = {
-            'everyday': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25,
-                         26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44, 45, 46, 47, 48, 49,
-                         50, 51, 52, 53, 54, 55, 56, 57, 58, 59, 60, 61, 62, 63, 64, 65, 66, 67, 68, 69, 70, 71, 72, 73,
-                         74, 75, 76, 77, 78, 79, 80, 81, 82, 83, 84, 85, 86, 87, 88, 89, 90, 91, 92, 93, 94, 95, 96, 97,
-                         98, 99, 100, 101, 102, 103, 104],
-            'workday': [0, 1, 2, 3, 4, 7, 8, 9, 10, 11, 14, 15, 16, 17, 18, 21, 22, 23, 24, 25, 28, 29, 30, 31, 32, 35,
-                        36, 37, 38, 39, 42, 43, 44, 45, 46, 49, 50, 51, 52, 53, 56, 57, 58, 59, 60, 63, 64, 65, 66, 67,
-                        70, 71, 72, 73, 74, 77, 78, 79, 80, 81, 84, 85, 86, 87, 88, 91, 92, 93, 94, 95, 98, 99, 100,
-                        101, 102],
-            'semiweekly': [0, 3, 7, 10, 14, 17, 21, 24, 37, 30, 33, 36, 39, 42, 45, 48, 51, 54, 57, 60, 63, 66, 69, 72,
-                           75, 78, 81, 84, 87, 90, 93, 96, 99, 102],
-            'weekly': [0, 7, 14, 21, 28, 35, 42, 49, 56, 63, 70, 77, 84, 91, 98],
-            'biweekly': [0, 14, 28, 42, 56, 70, 84, 98],
-            'monthly': [0, 28, 56, 84],
-            'none': [109],
-            'cycle_start': [0]
-        }
-
-    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-
-    if (temporal_falseneg_rates is None):
-        temporal_falseneg_rates = {
-            model.E: {0: 1.00, 1: 1.00, 2: 1.00, 3: 1.00},
-            model.I_pre: {0: 0.25, 1: 0.25, 2: 0.22},
-            model.I_sym: {0: 0.19, 1: 0.16, 2: 0.16, 3: 0.17, 4: 0.19, 5: 0.22, 6: 0.26, 7: 0.29, 8: 0.34, 9: 0.38,
-                          10: 0.43, 11: 0.48, 12: 0.52, 13: 0.57, 14: 0.62, 15: 0.66, 16: 0.70, 17: 0.76, 18: 0.79,
-                          19: 0.82, 20: 0.85, 21: 0.88, 22: 0.90, 23: 0.92, 24: 0.93, 25: 0.95, 26: 0.96, 27: 0.97,
-                          28: 0.97, 29: 0.98, 30: 0.98, 31: 0.99},
-            model.I_asym: {0: 0.19, 1: 0.16, 2: 0.16, 3: 0.17, 4: 0.19, 5: 0.22, 6: 0.26, 7: 0.29, 8: 0.34, 9: 0.38,
-                           10: 0.43, 11: 0.48, 12: 0.52, 13: 0.57, 14: 0.62, 15: 0.66, 16: 0.70, 17: 0.76, 18: 0.79,
-                           19: 0.82, 20: 0.85, 21: 0.88, 22: 0.90, 23: 0.92, 24: 0.93, 25: 0.95, 26: 0.96, 27: 0.97,
-                           28: 0.97, 29: 0.98, 30: 0.98, 31: 0.99},
-            model.Q_E: {0: 1.00, 1: 1.00, 2: 1.00, 3: 1.00},
-            model.Q_pre: {0: 0.25, 1: 0.25, 2: 0.22},
-            model.Q_sym: {0: 0.19, 1: 0.16, 2: 0.16, 3: 0.17, 4: 0.19, 5: 0.22, 6: 0.26, 7: 0.29, 8: 0.34, 9: 0.38,
-                          10: 0.43, 11: 0.48, 12: 0.52, 13: 0.57, 14: 0.62, 15: 0.66, 16: 0.70, 17: 0.76, 18: 0.79,
-                          19: 0.82, 20: 0.85, 21: 0.88, 22: 0.90, 23: 0.92, 24: 0.93, 25: 0.95, 26: 0.96, 27: 0.97,
-                          28: 0.97, 29: 0.98, 30: 0.98, 31: 0.99},
-            model.Q_asym: {0: 0.19, 1: 0.16, 2: 0.16, 3: 0.17, 4: 0.19, 5: 0.22, 6: 0.26, 7: 0.29, 8: 0.34, 9: 0.38,
-                           10: 0.43, 11: 0.48, 12: 0.52, 13: 0.57, 14: 0.62, 15: 0.66, 16: 0.70, 17: 0.76, 18: 0.79,
-                           19: 0.82, 20: 0.85, 21: 0.88, 22: 0.90, 23: 0.92, 24: 0.93, 25: 0.95, 26: 0.96, 27: 0.97,
-                           28: 0.97, 29: 0.98, 30: 0.98, 31: 0.99},
-        }
+    # With verbose=False the per-day exposure and intervention lines are not printed. When the model has a profiler
+    # (see ModelProfiler), the time spent on the daily introductions and interventions is accumulated as its
+    # 'daily_introductions' and 'daily_policy' phases.
+    profiler = getattr(model, 'profiler', None)
+    timedPhase = profiler.phase if profiler is not None else (lambda name: contextlib.nullcontext())
 
     # %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
     # Custom simulation loop:
@@ -79,18 +38,27 @@ def run_tti_sim(model, T,
     timeOfLastIntervention = -1
     timeOfLastIntroduction = -1
 
-    testingDays = cadence_testing_days[testing_cadence]
+    policy, testingDays = build_tti_policy(model, T,
+                                           testing_cadence=testing_cadence, test_falseneg_rate=test_falseneg_rate,
+                                           cadence_testing_days=cadence_testing_days, cadence_cycle_length=cadence_cycle_length,
+                                           temporal_falseneg_rates=temporal_falseneg_rates, testing_scenario=testing_scenario,
+                                           pct_tested_per_day=pct_tested_per_day, max_pct_tests_for_symptomatics=max_pct_tests_for_symptomatics,
+                                           max_pct_tests_for_traces=max_pct_tests_for_traces, random_testing_degree_bias=random_testing_degree_bias,
+                                           testing_compliance_symptomatic=testing_compliance_symptomatic,
+                                           testing_compliance_traced=testing_compliance_traced,
+                                           testing_compliance_random=testing_compliance_random,
+                                           tracing_compliance=tracing_compliance, num_contacts_to_trace=num_contacts_to_trace,
+                                           pct_contacts_to_trace=pct_contacts_to_trace, tracing_lag=tracing_lag,
+                                           isolation_compliance_symptomatic_individual=isolation_compliance_symptomatic_individual,
+                                           isolation_compliance_symptomatic_groupmate=isolation_compliance_symptomatic_groupmate,
+                                           isolation_compliance_positive_individual=isolation_compliance_positive_individual,
+                                           isolation_compliance_positive_groupmate=isolation_compliance_positive_groupmate,
+                                           isolation_compliance_positive_contact=isolation_compliance_positive_contact,
+                                           isolation_compliance_positive_contactgroupmate=isolation_compliance_positive_contactgroupmate,
+                                           isolation_lag_symptomatic=isolation_lag_symptomatic, isolation_lag_positive=isolation_lag_positive,
+                                           isolation_lag_contact=isolation_lag_contact, isolation_groups=isolation_groups)
     cadenceDayNumber = 0
 
-    tests_per_day = int(model.numNodes * pct_tested_per_day)
-    max_tracing_tests_per_day = int(tests_per_day * max_pct_tests_for_traces)
-    max_symptomatic_tests_per_day = int(tests_per_day * max_pct_tests_for_symptomatics)
-
-    tracingPoolQueue = [[] for i in range(tracing_lag)]
-    isolationQueue_symptomatic = [[] for i in range(isolation_lag_symptomatic)]
-    isolationQueue_positive = [[] for i in range(isolation_lag_positive)]
-    isolationQueue_contact = [[] for i in range(isolation_lag_contact)]
-
     model.tmax = T
     running = True
     while running:
@@ -102,14 +70,16 @@ def run_tti_sim(model, T,
         # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         if (int(model.t) != int(timeOfLastIntroduction)):
 
-            timeOfLastIntroduction = model.t
+            with timedPhase('daily_introductions'):
 
-            numNewExposures = numpy.random.poisson(lam=average_introductions_per_day)
+                timeOfLastIntroduction = model.t
 
-            model.introduce_exposures(num_new_exposures=numNewExposures)
+                numNewExposures = numpy.random.poisson(lam=average_introductions_per_day)
 
-            if (numNewExposures > 0):
-                print("[NEW EXPOSURE @ t = %.2f (%d exposed)]" % (model.t, numNewExposures))
+                model.introduce_exposures(num_new_exposures=numNewExposures)
+
+                if (numNewExposures > 0 and verbose):
+                    print("[NEW EXPOSURE @ t = %.2f (%d exposed)]" % (model.t, numNewExposures))
 
         # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         # Execute testing policy at designated intervals:
@@ -117,328 +87,29 @@ def run_tti_sim(model, T,
 
         if (int(model.t) != int(timeOfLastIntervention)):
 
-            cadenceDayNumber = int(model.t % cadence_cycle_length)
-
-            timeOfLastIntervention = model.t
-
-            currentNumInfected = model.total_num_infected()[model.tidx]
-            currentPctInfected = model.total_num_infected()[model.tidx] / model.numNodes
-
-            if (currentPctInfected >= intervention_start_pct_infected and not interventionOn):
-                interventionOn = True
-                interventionStartTime = model.t
-
-            if (interventionOn):
-
-                print("[INTERVENTIONS @ t = %.2f (%d (%.2f%%) infected)]" % (
-                model.t, currentNumInfected, currentPctInfected * 100))
-
-                nodeStates = model.X.flatten()
-                nodeTestedStatuses = model.tested.flatten()
-                nodeTestedInCurrentStateStatuses = model.testedInCurrentState.flatten()
-                nodePositiveStatuses = model.positive.flatten()
-
-                # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-
-                # tracingPoolQueue[0] = tracingPoolQueue[0]Queue.pop(0)
-
-                # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-
-                newIsolationGroup_symptomatic = []
-                newIsolationGroup_contact = []
+            with timedPhase('daily_policy'):
+
+                cadenceDayNumber = int(model.t) % len(testingDays)
+
+                timeOfLastIntervention = model.t
+
+                currentNumInfected = model.current_num_infected()
+                currentPctInfected = currentNumInfected / model.numNodes
 
-                # ----------------------------------------
-                # Isolate SYMPTOMATIC cases without a test:
-                # ----------------------------------------
-                numSelfIsolated_symptoms = 0
-                numSelfIsolated_symptomaticGroupmate = 0
-
-                if (any(isolation_compliance_symptomatic_individual)):
-                    symptomaticNodes = numpy.argwhere((nodeStates == model.I_sym)).flatten()
-                    for symptomaticNode in symptomaticNodes:
-                        if (isolation_compliance_symptomatic_individual[symptomaticNode]):
-                            if (model.X[symptomaticNode] == model.I_sym):
-                                numSelfIsolated_symptoms += 1
-                                newIsolationGroup_symptomatic.append(symptomaticNode)
-
-                            # ----------------------------------------
-                            # Isolate the GROUPMATES of this SYMPTOMATIC node without a test:
-                            # ----------------------------------------
-                            if (isolation_groups is not None and any(isolation_compliance_symptomatic_groupmate)):
-                                isolationGroupmates = next(
-                                    (group for group in isolation_groups if symptomaticNode in group), None)
-                                for isolationGroupmate in isolationGroupmates:
-                                    if (isolationGroupmate != symptomaticNode):
-                                        if (isolation_compliance_symptomatic_groupmate[isolationGroupmate]):
-                                            numSelfIsolated_symptomaticGroupmate += 1
-                                            newIsolationGroup_symptomatic.append(isolationGroupmate)
-
-                # ----------------------------------------
-                # Isolate the CONTACTS of detected POSITIVE cases without a test:
-                # ----------------------------------------
-                numSelfIsolated_positiveContact = 0
-                numSelfIsolated_positiveContactGroupmate = 0
-
-                if (any(isolation_compliance_positive_contact) or any(isolation_compliance_positive_contactgroupmate)):
-                    for contactNode in tracingPoolQueue[0]:
-                        if (isolation_compliance_positive_contact[contactNode]):
-                            newIsolationGroup_contact.append(contactNode)
-                            numSelfIsolated_positiveContact += 1
-
-                            # ----------------------------------------
-                        # Isolate the GROUPMATES of this self-isolating CONTACT without a test:
-                        # ----------------------------------------
-
-                        if (isolation_groups is not None and any(isolation_compliance_positive_contactgroupmate)):
-                            isolationGroupmates = next((group for group in isolation_groups if contactNode in group),
-                                                       None)
-                            for isolationGroupmate in isolationGroupmates:
-                                # if(isolationGroupmate != contactNode):
-                                if (isolation_compliance_positive_contactgroupmate[isolationGroupmate]):
-                                    newIsolationGroup_contact.append(isolationGroupmate)
-                                    numSelfIsolated_positiveContactGroupmate += 1
-
-                # ----------------------------------------
-                # Update the nodeStates list after self-isolation updates to model.X:
-                # ----------------------------------------
-                nodeStates = model.X.flatten()
-
-                # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-
-                # ----------------------------------------
-                # Allow SYMPTOMATIC individuals to self-seek tests
-                # regardless of cadence testing days
-                # ----------------------------------------
-                symptomaticSelection = []
-
-                if (any(testing_compliance_symptomatic)):
-
-                    symptomaticPool = numpy.argwhere((testing_compliance_symptomatic == True)
-                                                     & (nodeTestedInCurrentStateStatuses == False)
-                                                     & (nodePositiveStatuses == False)
-                                                     & ((nodeStates == model.I_sym) | (nodeStates == model.Q_sym))
-                                                     ).flatten()
-
-                    numSymptomaticTests = min(len(symptomaticPool), max_symptomatic_tests_per_day)
-
-                    if (len(symptomaticPool) > 0):
-                        symptomaticSelection = symptomaticPool[
-                            numpy.random.choice(len(symptomaticPool), min(numSymptomaticTests, len(symptomaticPool)),
-                                                replace=False)]
-
-                # ----------------------------------------
-                # Test individuals randomly and via contact tracing
-                # on cadence testing days:
-                # ----------------------------------------
-
-                tracingSelection = []
-                randomSelection = []
-
-                if (cadenceDayNumber in testingDays):
-
-                    # ----------------------------------------
-                    # Apply a designated portion of this day's tests
-                    # to individuals identified by CONTACT TRACING:
-                    # ----------------------------------------
-
-                    tracingPool = tracingPoolQueue.pop(0)
-
-                    if (any(testing_compliance_traced)):
-
-                        numTracingTests = min(len(tracingPool),
-                                              min(tests_per_day - len(symptomaticSelection), max_tracing_tests_per_day))
-
-                        for trace in range(numTracingTests):
-                            traceNode = tracingPool.pop()
-                            if ((nodePositiveStatuses[traceNode] == False)
-                                    and (testing_compliance_traced[traceNode] == True)
-                                    and (model.X[traceNode] != model.R)
-                                    and (model.X[traceNode] != model.Q_R)
-                                    and (model.X[traceNode] != model.H)
-                                    and (model.X[traceNode] != model.F)):
-                                tracingSelection.append(traceNode)
-
-                    # ----------------------------------------
-                    # Apply the remainder of this day's tests to random testing:
-                    # ----------------------------------------
-
-                    if (any(testing_compliance_random)):
-
-                        testingPool = numpy.argwhere((testing_compliance_random == True)
-                                                     & (nodePositiveStatuses == False)
-                                                     & (nodeStates != model.R)
-                                                     & (nodeStates != model.Q_R)
-                                                     & (nodeStates != model.H)
-                                                     & (nodeStates != model.F)
-                                                     ).flatten()
-
-                        numRandomTests = max(
-                            min(tests_per_day - len(tracingSelection) - len(symptomaticSelection), len(testingPool)), 0)
-
-                        testingPool_degrees = model.degree.flatten()[testingPool]
-                        testingPool_degreeWeights = numpy.power(testingPool_degrees,
-                                                                random_testing_degree_bias) / numpy.sum(
-                            numpy.power(testingPool_degrees, random_testing_degree_bias))
-
-                        if (len(testingPool) > 0):
-                            randomSelection = testingPool[
-                                numpy.random.choice(len(testingPool), numRandomTests, p=testingPool_degreeWeights,
-                                                    replace=False)]
-
-                # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-
-                # ----------------------------------------
-                # Perform the tests on the selected individuals:
-                # ----------------------------------------
-
-                selectedToTest = numpy.concatenate((symptomaticSelection, tracingSelection, randomSelection)).astype(
-                    int)
-
-                numTested = 0
-                numTested_random = 0
-                numTested_tracing = 0
-                numTested_symptomatic = 0
-                numPositive = 0
-                numPositive_random = 0
-                numPositive_tracing = 0
-                numPositive_symptomatic = 0
-                numIsolated_positiveGroupmate = 0
-
-                newTracingPool = []
-
-                newIsolationGroup_positive = []
-
-                for i, testNode in enumerate(selectedToTest):
-
-                    model.set_tested(testNode, True)
-
-                    numTested += 1
-                    if (i < len(symptomaticSelection)):
-                        numTested_symptomatic += 1
-                    elif (i < len(symptomaticSelection) + len(tracingSelection)):
-                        numTested_tracing += 1
-                    else:
-                        numTested_random += 1
-
-                        # If the node to be tested is not infected, then the test is guaranteed negative,
-                    # so don't bother going through with doing the test:
-                    if (model.X[testNode] == model.S or model.X[testNode] == model.Q_S):
-                        pass
-                    # Also assume that latent infections are not picked up by tests:
-                    elif (model.X[testNode] == model.E or model.X[testNode] == model.Q_E):
-                        pass
-                    elif (model.X[testNode] == model.I_pre or model.X[testNode] == model.Q_pre
-                          or model.X[testNode] == model.I_sym or model.X[testNode] == model.Q_sym
-                          or model.X[testNode] == model.I_asym or model.X[testNode] == model.Q_asym):
-
-                        if (test_falseneg_rate == 'temporal'):
-                            testNodeState = model.X[testNode][0]
-                            testNodeTimeInState = model.timer_state[testNode][0]
-                            if (testNodeState in list(temporal_falseneg_rates.keys())):
-                                falseneg_prob = temporal_falseneg_rates[testNodeState][int(
-                                    min(testNodeTimeInState, max(list(temporal_falseneg_rates[testNodeState].keys()))))]
-                            else:
-                                falseneg_prob = 1.00
-                        else:
-                            falseneg_prob = test_falseneg_rate
-
-                        if (numpy.random.rand() < (1 - falseneg_prob)):
-                            # +++++++++++++++++++++++++++++++++++++++++++++
-                            # The tested node has returned a positive test
-                            # +++++++++++++++++++++++++++++++++++++++++++++
-                            numPositive += 1
-                            if (i < len(symptomaticSelection)):
-                                numPositive_symptomatic += 1
-                            elif (i < len(symptomaticSelection) + len(tracingSelection)):
-                                numPositive_tracing += 1
-                            else:
-                                numPositive_random += 1
-
-                                # Update the node's state to the appropriate detected case state:
-                            model.set_positive(testNode, True)
-
-                            # ----------------------------------------
-                            # Add this positive node to the isolation group:
-                            # ----------------------------------------
-                            if (isolation_compliance_positive_individual[testNode]):
-                                newIsolationGroup_positive.append(testNode)
-
-                            # ----------------------------------------
-                            # Add the groupmates of this positive node to the isolation group:
-                            # ----------------------------------------
-                            if (isolation_groups is not None and any(isolation_compliance_positive_groupmate)):
-                                isolationGroupmates = next((group for group in isolation_groups if testNode in group),
-                                                           None)
-                                for isolationGroupmate in isolationGroupmates:
-                                    if (isolationGroupmate != testNode):
-                                        if (isolation_compliance_positive_groupmate[isolationGroupmate]):
-                                            numIsolated_positiveGroupmate += 1
-                                            newIsolationGroup_positive.append(isolationGroupmate)
-
-                            # ----------------------------------------
-                            # Add this node's neighbors to the contact tracing pool:
-                            # ----------------------------------------
-                            if (any(tracing_compliance) or any(isolation_compliance_positive_contact) or any(
-                                    isolation_compliance_positive_contactgroupmate)):
-                                if (tracing_compliance[testNode]):
-                                    testNodeContacts = list(model.G[testNode].keys())
-                                    numpy.random.shuffle(testNodeContacts)
-                                    if (num_contacts_to_trace is None):
-                                        numContactsToTrace = int(pct_contacts_to_trace * len(testNodeContacts))
-                                    else:
-                                        numContactsToTrace = num_contacts_to_trace
-                                    newTracingPool.extend(testNodeContacts[0:numContactsToTrace])
-
-                # Add the nodes to be isolated to the isolation queue:
-                isolationQueue_positive.append(newIsolationGroup_positive)
-                isolationQueue_symptomatic.append(newIsolationGroup_symptomatic)
-                isolationQueue_contact.append(newIsolationGroup_contact)
-
-                # Add the nodes to be traced to the tracing queue:
-                tracingPoolQueue.append(newTracingPool)
-
-                print("\t" + str(numTested_symptomatic) + "\ttested due to symptoms  [+ " + str(
-                    numPositive_symptomatic) + " positive (%.2f %%) +]" % (
-                          numPositive_symptomatic / numTested_symptomatic * 100 if numTested_symptomatic > 0 else 0))
-                print("\t" + str(numTested_tracing) + "\ttested as traces        [+ " + str(
-                    numPositive_tracing) + " positive (%.2f %%) +]" % (
-                          numPositive_tracing / numTested_tracing * 100 if numTested_tracing > 0 else 0))
-                print("\t" + str(numTested_random) + "\ttested randomly         [+ " + str(
-                    numPositive_random) + " positive (%.2f %%) +]" % (
-                          numPositive_random / numTested_random * 100 if numTested_random > 0 else 0))
-                print("\t" + str(numTested) + "\ttested TOTAL            [+ " + str(
-                    numPositive) + " positive (%.2f %%) +]" % (numPositive / numTested * 100 if numTested > 0 else 0))
-
-                print("\t" + str(numSelfIsolated_symptoms) + " will isolate due to symptoms         (" + str(
-                    numSelfIsolated_symptomaticGroupmate) + " as groupmates of symptomatic)")
-                print("\t" + str(numPositive) + " will isolate due to positive test    (" + str(
-                    numIsolated_positiveGroupmate) + " as groupmates of positive)")
-                print("\t" + str(numSelfIsolated_positiveContact) + " will isolate due to positive contact (" + str(
-                    numSelfIsolated_positiveContactGroupmate) + " as groupmates of contact)")
-
-                # ----------------------------------------
-                # Update the status of nodes who are to be isolated:
-                # ----------------------------------------
-
-                numIsolated = 0
-
-                isolationGroup_symptomatic = isolationQueue_symptomatic.pop(0)
-                for isolationNode in isolationGroup_symptomatic:
-                    model.set_isolation(isolationNode, True)
-                    model.set_isolation(isolationNode, True)
-                    numIsolated += 1
-
-                isolationGroup_contact = isolationQueue_contact.pop(0)
-                for isolationNode in isolationGroup_contact:
-                    model.set_isolation(isolationNode, True)
-                    numIsolated += 1
-
-                isolationGroup_positive = isolationQueue_positive.pop(0)
-                for isolationNode in isolationGroup_positive:
-                    model.set_isolation(isolationNode, True)
-                    numIsolated += 1
-
-                print("\t" + str(numIsolated) + " entered isolation")
+                if (currentPctInfected >= intervention_start_pct_infected and not interventionOn):
+                    interventionOn = True
+                    interventionStartTime = model.t
+
+                if (interventionOn):
+
+                    if (verbose):
+                        print("[INTERVENTIONS @ t = %.2f (%d (%.2f%%) infected)]" % (
+                        model.t, currentNumInfected, currentPctInfected * 100))
+
+                    counts = policy.run_interventions(testing_day=testingDays[cadenceDayNumber])
+
+                    if (verbose):
+                        print_intervention_counts(counts)
 
             # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -448,5 +119,601 @@ def run_tti_sim(model, T,
 
     return interventionInterval
 
+
+def build_tti_policy(model, T, testing_cadence='everyday', test_falseneg_rate='temporal',
+                     cadence_testing_days=None, cadence_cycle_length=None, temporal_falseneg_rates=None,
+                     testing_scenario=None, rng=None, **policy_params):
+    # The TTIPolicy of a run_tti_sim run over T days and its testing calendar (whether each day of the cycle is a
+    # testing day). The testing calendar and the characteristics of the test used are given by the testing scenario
+    # (see TestingScenario). Without one, the scenario is made from testing_cadence (a cadence name, or a key of
+    # cadence_testing_days giving the testing day numbers of a cycle of cadence_cycle_length days), and from
+    # test_falseneg_rate and temporal_falseneg_rates (by default, the false negative rates of PCR_TEST).
+    # Given a cadence_cycle_length but no cadence_testing_days (as the former forked sim loops were called), the
+    # cadence names use the hard-coded testing days of those loops (see legacy_cadence_testing_days), so that such
+    # calls simulate the same calendar as before.
+    # The remaining keyword arguments are the testing, tracing and isolation parameters of TTIPolicy.
+    if (testing_scenario is None):
+        if (cadence_cycle_length is not None and cadence_testing_days is None and isinstance(testing_cadence, str)):
+            cadence_testing_days = legacy_cadence_testing_days(cadence_cycle_length)
+        if (test_falseneg_rate == 'temporal' and temporal_falseneg_rates is None):
+            test = PCR_TEST
+        else:
+            test = TestCharacteristics(falseneg_rate=test_falseneg_rate, falseneg_rates_by_day=temporal_falseneg_rates)
+        testing_scenario = TestingScenario(cadence=(testing_cadence if cadence_testing_days is None else cadence_testing_days[testing_cadence]),
+                                           test=test, horizon=cadence_cycle_length)
+
+    policy = TTIPolicy(model, test=testing_scenario.test, rng=rng, **policy_params)
+
+    return policy, testing_scenario.testing_days(T)
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+
+def run_tti_sim_batch(batch, T, tti_params={}, verbose=False):
+    # Runs the replicates of a BatchExtSEIRSNetworkModel for T days under the run_tti_sim policy.
+    # tti_params holds the keyword arguments of run_tti_sim, either one dict for all replicates or a list of one dict
+    # per replicate. Each replicate gets its own TTIPolicy, drawing from the replicate's policy random stream
+    # (batch.policyRngs), and its external exposures are drawn from the replicate's event stream; the policy is
+    # applied at the start of each of the replicate's days, after that day's introductions, as in run_tti_sim.
+    # Returns the intervention interval of each replicate.
+    replicateParams = [dict(params) for params in (tti_params if isinstance(tti_params, (list, tuple)) else [tti_params]*batch.numReplicates)]
+    assert (len(replicateParams) == batch.numReplicates), "Expecting one dict of parameters per replicate."
+
+    interventionStartPcts = [params.pop('intervention_start_pct_infected', 0) for params in replicateParams]
+    introductionRates = [params.pop('average_introductions_per_day', 0) for params in replicateParams]
+    for params in replicateParams:
+        params.pop('verbose', None)
+
+    policies = []
+    testingDays = []
+    for r, params in enumerate(replicateParams):
+        policy, days = build_tti_policy(batch.models[r], T, rng=batch.policyRngs[r], **params)
+        policies.append(policy)
+        testingDays.append(days)
+
+    interventionOn = numpy.zeros(batch.numReplicates, dtype=bool)
+    interventionStartTimes = [None] * batch.numReplicates
+
+    def daily_policy(replicate, model):
+        currentNumInfected = model.current_num_infected()
+        currentPctInfected = currentNumInfected / model.numNodes
+
+        if (currentPctInfected >= interventionStartPcts[replicate] and not interventionOn[replicate]):
+            interventionOn[replicate] = True
+            interventionStartTimes[replicate] = model.t
+
+        if (interventionOn[replicate]):
+
+            if (verbose):
+                print("[INTERVENTIONS @ replicate %d, t = %.2f (%d (%.2f%%) infected)]" % (
+                    replicate, model.t, currentNumInfected, currentPctInfected * 100))
+
+            days = testingDays[replicate]
+            counts = policies[replicate].run_interventions(testing_day=days[int(model.t) % len(days)])
+
+            if (verbose):
+                print_intervention_counts(counts)
+
+    batch.run(T, average_introductions_per_day=introductionRates, daily_policy=daily_policy, print_interval=(10 if verbose else 0))
+
+    return [(interventionStartTimes[r], batch.t[r]) for r in range(batch.numReplicates)]
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+
+def print_intervention_counts(counts):
+    print("\t" + str(counts['numTested_symptomatic']) + "\ttested due to symptoms  [+ " + str(
+        counts['numPositive_symptomatic']) + " positive (%.2f %%) +]" % (
+              counts['numPositive_symptomatic'] / counts['numTested_symptomatic'] * 100 if counts['numTested_symptomatic'] > 0 else 0))
+    print("\t" + str(counts['numTested_tracing']) + "\ttested as traces        [+ " + str(
+        counts['numPositive_tracing']) + " positive (%.2f %%) +]" % (
+              counts['numPositive_tracing'] / counts['numTested_tracing'] * 100 if counts['numTested_tracing'] > 0 else 0))
+    print("\t" + str(counts['numTested_random']) + "\ttested randomly         [+ " + str(
+        counts['numPositive_random']) + " positive (%.2f %%) +]" % (
+              counts['numPositive_random'] / counts['numTested_random'] * 100 if counts['numTested_random'] > 0 else 0))
+    print("\t" + str(counts['numTested']) + "\ttested TOTAL            [+ " + str(
+        counts['numPositive']) + " positive (%.2f %%) +]" % (counts['numPositive'] / counts['numTested'] * 100 if counts['numTested'] > 0 else 0))
+
+    print("\t" + str(counts['numSelfIsolated_symptoms']) + " will isolate due to symptoms         (" + str(
+        counts['numSelfIsolated_symptomaticGroupmate']) + " as groupmates of symptomatic)")
+    print("\t" + str(counts['numPositive']) + " will isolate due to positive test    (" + str(
+        counts['numIsolated_positiveGroupmate']) + " as groupmates of positive)")
+    print("\t" + str(counts['numSelfIsolated_positiveContact']) + " will isolate due to positive contact (" + str(
+        counts['numSelfIsolated_positiveContactGroupmate']) + " as groupmates of contact)")
+
+    print("\t" + str(counts['numIsolated']) + " entered isolation")
+
 # %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
 # %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+
+class TTIPolicy():
+    """
+    Testing, tracing and isolation policy applied by run_tti_sim on each intervention day
+    ===================================================
+    Params: the testing, tracing and isolation parameters of run_tti_sim, the TestCharacteristics of the test used,
+            and the random state the policy draws from (rng, a numpy RandomState; the global numpy.random state by default)
+
+    All per-node policy data is held in arrays: compliance masks, the isolation group of each node
+    (node -> group index) with group membership in CSR form (groupPtr, groupNodes), the false negative
+    rates as a lookup table indexed by (state, whole days in state), and the tracing/isolation queues
+    as ring buffers of node index arrays. Test outcomes are drawn for all of the day's tests at once.
+    """
+
+    def __init__(self, model, test=None,
+                 pct_tested_per_day=1.0, max_pct_tests_for_symptomatics=1.0, max_pct_tests_for_traces=1.0,
+                 random_testing_degree_bias=0,
+                 testing_compliance_symptomatic=[None], testing_compliance_traced=[None], testing_compliance_random=[None],
+                 tracing_compliance=[None], num_contacts_to_trace=None, pct_contacts_to_trace=1.0, tracing_lag=1,
+                 isolation_compliance_symptomatic_individual=[None], isolation_compliance_symptomatic_groupmate=[None],
+                 isolation_compliance_positive_individual=[None], isolation_compliance_positive_groupmate=[None],
+                 isolation_compliance_positive_contact=[None], isolation_compliance_positive_contactgroupmate=[None],
+                 isolation_lag_symptomatic=1, isolation_lag_positive=1, isolation_lag_contact=0, isolation_groups=None,
+                 rng=None):
+
+        self.model = model
+        # Random draws of the policy (defaults to the global numpy.random state):
+        self.rng = rng if rng is not None else numpy.random
+        numNodes = model.numNodes
+
+        self.tests_per_day = int(numNodes * pct_tested_per_day)
+        self.max_tracing_tests_per_day = int(self.tests_per_day * max_pct_tests_for_traces)
+        self.max_symptomatic_tests_per_day = int(self.tests_per_day * max_pct_tests_for_symptomatics)
+        self.random_testing_degree_bias = random_testing_degree_bias
+        self.num_contacts_to_trace = num_contacts_to_trace
+        self.pct_contacts_to_trace = pct_contacts_to_trace
+
+        # ----------------------------------------
+        # Compliance masks (a [None] compliance parameter disables the corresponding measure):
+        # ----------------------------------------
+        self.testing_compliance_symptomatic = compliance_mask(testing_compliance_symptomatic, numNodes)
+        self.testing_compliance_traced = compliance_mask(testing_compliance_traced, numNodes)
+        self.testing_compliance_random = compliance_mask(testing_compliance_random, numNodes)
+        self.tracing_compliance = compliance_mask(tracing_compliance, numNodes)
+        self.isolation_compliance_symptomatic_individual = compliance_mask(isolation_compliance_symptomatic_individual, numNodes)
+        self.isolation_compliance_symptomatic_groupmate = compliance_mask(isolation_compliance_symptomatic_groupmate, numNodes)
+        self.isolation_compliance_positive_individual = compliance_mask(isolation_compliance_positive_individual, numNodes)
+        self.isolation_compliance_positive_groupmate = compliance_mask(isolation_compliance_positive_groupmate, numNodes)
+        self.isolation_compliance_positive_contact = compliance_mask(isolation_compliance_positive_contact, numNodes)
+        self.isolation_compliance_positive_contactgroupmate = compliance_mask(isolation_compliance_positive_contactgroupmate, numNodes)
+
+        self.tracingOn = (self.tracing_compliance.any() or self.isolation_compliance_positive_contact.any()
+                          or self.isolation_compliance_positive_contactgroupmate.any())
+
+        # ----------------------------------------
+        # Isolation groups: the (first) group of each node and the group memberships in CSR form:
+        # ----------------------------------------
+        self.groupOfNode = numpy.full(numNodes, -1, dtype=int)
+        self.groupPtr = numpy.zeros(1, dtype=int)
+        self.groupNodes = numpy.zeros(0, dtype=int)
+        if (isolation_groups is not None and len(isolation_groups) > 0):
+            groups = [numpy.asarray(group, dtype=int).ravel() for group in isolation_groups]
+            groupSizes = numpy.array([len(group) for group in groups], dtype=int)
+            self.groupPtr = numpy.concatenate(([0], numpy.cumsum(groupSizes)))
+            self.groupNodes = numpy.concatenate(groups)
+            memberNodes, firstMembership = numpy.unique(self.groupNodes, return_index=True)
+            self.groupOfNode[memberNodes] = numpy.repeat(numpy.arange(len(groups)), groupSizes)[firstMembership]
+
+        # ----------------------------------------
+        # Contact lists of the nodes (CSR form of the model's adjacency matrix):
+        # ----------------------------------------
+        self.contactsPtr = model.A.indptr
+        self.contactsIdx = model.A.indices
+
+        # ----------------------------------------
+        # False negative probability of a test by (node state, whole days in that state):
+        # ----------------------------------------
+        self.falsenegRates = (test if test is not None else PCR_TEST).falseneg_table(model)
+
+        # ----------------------------------------
+        # Tracing and isolation queues (one entry per intervention day, released after the respective lag):
+        # ----------------------------------------
+        self.tracingPoolQueue = IndexRingBuffer(tracing_lag)
+        self.isolationQueue_symptomatic = IndexRingBuffer(isolation_lag_symptomatic)
+        self.isolationQueue_positive = IndexRingBuffer(isolation_lag_positive)
+        self.isolationQueue_contact = IndexRingBuffer(isolation_lag_contact)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def groupmates(self, nodes, compliance, include_self=False):
+        # The compliant members of the isolation groups of the given nodes
+        # (together with the node each groupmate was found through):
+        groups = self.groupOfNode[nodes]
+        nodes, groups = nodes[groups >= 0], groups[groups >= 0]
+        groupStarts = self.groupPtr[groups]
+        groupSizes = self.groupPtr[groups + 1] - groupStarts
+        offsets = numpy.arange(groupSizes.sum()) - numpy.repeat(numpy.cumsum(groupSizes) - groupSizes, groupSizes)
+        sourceNodes = numpy.repeat(nodes, groupSizes)
+        mates = self.groupNodes[numpy.repeat(groupStarts, groupSizes) + offsets]
+        selected = compliance[mates] if include_self else (compliance[mates] & (mates != sourceNodes))
+        return mates[selected]
+
+    def contacts_to_trace(self, nodes):
+        # A random selection of the contacts of each of the given nodes
+        # (pct_contacts_to_trace of its contacts, or num_contacts_to_trace of them if given):
+        contactStarts = self.contactsPtr[nodes]
+        numContacts = self.contactsPtr[nodes + 1] - contactStarts
+        if (self.num_contacts_to_trace is None):
+            numContactsToTrace = (self.pct_contacts_to_trace * numContacts).astype(int)
+        else:
+            numContactsToTrace = numpy.minimum(self.num_contacts_to_trace, numContacts)
+        offsets = numpy.arange(numContacts.sum()) - numpy.repeat(numpy.cumsum(numContacts) - numContacts, numContacts)
+        entries = numpy.repeat(contactStarts, numContacts) + offsets
+        # Shuffle the contacts of each node by sorting them on random keys within each node's block:
+        order = numpy.lexsort((self.rng.random(len(entries)), numpy.repeat(numpy.arange(len(nodes)), numContacts)))
+        return self.contactsIdx[entries[order[offsets < numpy.repeat(numContactsToTrace, numContacts)]]]
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def run_interventions(self, testing_day):
+        # Apply one day of the policy: self-isolation of symptomatic nodes and of the contacts of positive cases,
+        # testing of symptomatic nodes (every day) and of traced and random nodes (on testing days),
+        # tracing of the contacts of positive cases, and isolation of the nodes whose lag has passed.
+        # Returns the counts of the day's tests and isolations.
+        model = self.model
+
+        nodeStates = model.X.flatten()
+        nodeTestedInCurrentStateStatuses = model.testedInCurrentState.flatten()
+        nodePositiveStatuses = model.positive.flatten()
+
+        # ----------------------------------------
+        # Isolate SYMPTOMATIC cases (and their GROUPMATES) without a test:
+        # ----------------------------------------
+        symptomaticNodes = numpy.flatnonzero(nodeStates == model.I_sym)
+        selfIsolating_symptoms = symptomaticNodes[self.isolation_compliance_symptomatic_individual[symptomaticNodes]]
+        selfIsolating_symptomaticGroupmates = self.groupmates(selfIsolating_symptoms, self.isolation_compliance_symptomatic_groupmate)
+
+        # ----------------------------------------
+        # Isolate the CONTACTS of detected POSITIVE cases (and their GROUPMATES) without a test:
+        # ----------------------------------------
+        contactNodes = self.tracingPoolQueue.peek()
+        selfIsolating_positiveContacts = contactNodes[self.isolation_compliance_positive_contact[contactNodes]]
+        selfIsolating_positiveContactGroupmates = self.groupmates(contactNodes, self.isolation_compliance_positive_contactgroupmate, include_self=True)
+
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+        # ----------------------------------------
+        # Allow SYMPTOMATIC individuals to self-seek tests
+        # regardless of cadence testing days
+        # ----------------------------------------
+        symptomaticPool = numpy.flatnonzero(self.testing_compliance_symptomatic
+                                            & (nodeTestedInCurrentStateStatuses == False)
+                                            & (nodePositiveStatuses == False)
+                                            & ((nodeStates == model.I_sym) | (nodeStates == model.Q_sym)))
+        numSymptomaticTests = min(len(symptomaticPool), self.max_symptomatic_tests_per_day)
+        symptomaticSelection = symptomaticPool[self.rng.choice(len(symptomaticPool), numSymptomaticTests, replace=False)]
+
+        # ----------------------------------------
+        # Test individuals randomly and via contact tracing
+        # on cadence testing days:
+        # ----------------------------------------
+        tracingSelection = numpy.zeros(0, dtype=int)
+        randomSelection = numpy.zeros(0, dtype=int)
+
+        if (testing_day):
+
+            # ----------------------------------------
+            # Apply a designated portion of this day's tests
+            # to individuals identified by CONTACT TRACING
+            # (the most recently traced nodes of the pool are tested first):
+            # ----------------------------------------
+            tracingPool = self.tracingPoolQueue.pop()
+
+            if (self.testing_compliance_traced.any()):
+                numTracingTests = max(min(len(tracingPool), self.tests_per_day - len(symptomaticSelection), self.max_tracing_tests_per_day), 0)
+                traceNodes = tracingPool[::-1][:numTracingTests]
+                traceNodeStates = nodeStates[traceNodes]
+                tracingSelection = traceNodes[(nodePositiveStatuses[traceNodes] == False)
+                                              & self.testing_compliance_traced[traceNodes]
+                                              & (traceNodeStates != model.R) & (traceNodeStates != model.Q_R)
+                                              & (traceNodeStates != model.H) & (traceNodeStates != model.F)]
+
+            # ----------------------------------------
+            # Apply the remainder of this day's tests to random testing:
+            # ----------------------------------------
+            if (self.testing_compliance_random.any()):
+                testingPool = numpy.flatnonzero(self.testing_compliance_random
+                                                & (nodePositiveStatuses == False)
+                                                & (nodeStates != model.R) & (nodeStates != model.Q_R)
+                                                & (nodeStates != model.H) & (nodeStates != model.F))
+
+                numRandomTests = max(min(self.tests_per_day - len(tracingSelection) - len(symptomaticSelection), len(testingPool)), 0)
+
+                if (len(testingPool) > 0):
+                    testingPool_degreeWeights = numpy.power(model.degree.flatten()[testingPool], self.random_testing_degree_bias)
+                    testingPool_degreeWeights = testingPool_degreeWeights / numpy.sum(testingPool_degreeWeights)
+                    randomSelection = testingPool[self.rng.choice(len(testingPool), numRandomTests, p=testingPool_degreeWeights, replace=False)]
+
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+        # ----------------------------------------
+        # Perform the tests on the selected individuals:
+        # ----------------------------------------
+        selectedToTest = numpy.concatenate((symptomaticSelection, tracingSelection, randomSelection)).astype(int)
+        model.set_tested(selectedToTest, True)
+
+        testDays = numpy.minimum(model.timer_state[selectedToTest, 0].astype(int), self.falsenegRates.shape[1] - 1)
+        falsenegProbs = self.falsenegRates[nodeStates[selectedToTest], testDays]
+        testedPositive = self.rng.rand(len(selectedToTest)) < (1 - falsenegProbs)
+
+        positiveNodes = selectedToTest[testedPositive]
+        model.set_positive(positiveNodes, True)
+
+        numTested_symptomatic, numTested_tracing = len(symptomaticSelection), len(tracingSelection)
+        numPositive_symptomatic = numpy.count_nonzero(testedPositive[:numTested_symptomatic])
+        numPositive_tracing = numpy.count_nonzero(testedPositive[numTested_symptomatic:numTested_symptomatic + numTested_tracing])
+        numPositive_random = numpy.count_nonzero(testedPositive[numTested_symptomatic + numTested_tracing:])
+
+        # ----------------------------------------
+        # Isolate the positive nodes and their groupmates:
+        # ----------------------------------------
+        isolating_positive = positiveNodes[self.isolation_compliance_positive_individual[positiveNodes]]
+        isolating_positiveGroupmates = self.groupmates(positiveNodes, self.isolation_compliance_positive_groupmate)
+
+        # ----------------------------------------
+        # Add the positive nodes' contacts to the contact tracing pool:
+        # ----------------------------------------
+        newTracingPool = numpy.zeros(0, dtype=int)
+        if (self.tracingOn):
+            newTracingPool = self.contacts_to_trace(positiveNodes[self.tracing_compliance[positiveNodes]])
+
+        # Add the nodes to be isolated to the isolation queues, and the nodes to be traced to the tracing queue:
+        self.isolationQueue_positive.push(numpy.concatenate((isolating_positive, isolating_positiveGroupmates)))
+        self.isolationQueue_symptomatic.push(numpy.concatenate((selfIsolating_symptoms, selfIsolating_symptomaticGroupmates)))
+        self.isolationQueue_contact.push(numpy.concatenate((selfIsolating_positiveContacts, selfIsolating_positiveContactGroupmates)))
+        self.tracingPoolQueue.push(newTracingPool)
+
+        # ----------------------------------------
+        # Update the status of nodes who are to be isolated:
+        # ----------------------------------------
+        numIsolated = 0
+        for isolationGroup in (self.isolationQueue_symptomatic.pop(), self.isolationQueue_contact.pop(), self.isolationQueue_positive.pop()):
+            model.set_isolation(isolationGroup, True)
+            numIsolated += len(isolationGroup)
+
+        return {'numTested':                                len(selectedToTest),
+                'numTested_symptomatic':                    numTested_symptomatic,
+                'numTested_tracing':                        numTested_tracing,
+                'numTested_random':                         len(randomSelection),
+                'numPositive':                              len(positiveNodes),
+                'numPositive_symptomatic':                  numPositive_symptomatic,
+                'numPositive_tracing':                      numPositive_tracing,
+                'numPositive_random':                       numPositive_random,
+                'numSelfIsolated_symptoms':                 len(selfIsolating_symptoms),
+                'numSelfIsolated_symptomaticGroupmate':     len(selfIsolating_symptomaticGroupmates),
+                'numSelfIsolated_positiveContact':          len(selfIsolating_positiveContacts),
+                'numSelfIsolated_positiveContactGroupmate': len(selfIsolating_positiveContactGroupmates),
+                'numIsolated_positiveGroupmate':            len(isolating_positiveGroupmates),
+                'numIsolated':                              numIsolated}
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+
+def compliance_mask(compliance, numNodes):
+    # Boolean compliance of each node; a compliance parameter without any compliant node (e.g., [None]) disables the measure:
+    if (compliance is None or not any(compliance)):
+        return numpy.zeros(numNodes, dtype=bool)
+    return numpy.asarray(compliance, dtype=bool).ravel()
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+
+class IndexRingBuffer():
+    """
+    FIFO queue of node index arrays held in a circular buffer of slots (doubled in size when full)
+    ===================================================
+    Params:
+            length      Number of (empty) entries the queue starts with, i.e., the lag in days between
+                        an entry being pushed and it being popped when there is one push and one pop per day
+    """
+
+    def __init__(self, length=0):
+        self.slots = [numpy.zeros(0, dtype=int)] * max(2 * length, 4)
+        self.head = 0
+        self.size = length
+
+    def __len__(self):
+        return self.size
+
+    def push(self, nodes):
+        if (self.size == len(self.slots)):
+            self.slots = [self.slots[(self.head + i) % len(self.slots)] for i in range(self.size)] + [numpy.zeros(0, dtype=int)] * self.size
+            self.head = 0
+        self.slots[(self.head + self.size) % len(self.slots)] = numpy.asarray(nodes, dtype=int)
+        self.size += 1
+
+    def peek(self):
+        return self.slots[self.head] if self.size > 0 else numpy.zeros(0, dtype=int)
+
+    def pop(self):
+        if (self.size == 0):
+            return numpy.zeros(0, dtype=int)
+        nodes = self.slots[self.head]
+        self.slots[self.head] = numpy.zeros(0, dtype=int)
+        self.head = (self.head + 1) % len(self.slots)
+        self.size -= 1
+        return nodes
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+
+class TestingScenario():
+    """
+    Testing protocol of run_tti_sim: the calendar of cadence testing days and the test used
+    ===================================================
+    Params:
+            cadence     Rule generating the testing days (day 0 is the start of the simulation, taken to be a Monday):
+                        'everyday', 'workday' (Mon-Fri), 'semiweekly' (Mon, Thu), 'weekly', 'biweekly', 'monthly' (every 28 days),
+                        'cycle_start' (day 0 only), 'none', an integer N (every N days), or a list of testing day numbers
+            test        TestCharacteristics of the test used (default: PCR_TEST)
+            horizon     Number of days covered by the calendar, after which it repeats
+                        (default: the whole simulation, i.e., the calendar never repeats)
+
+    Symptomatic individuals may self-seek a test on any day, regardless of the calendar.
+    """
+
+    def __init__(self, cadence='everyday', test=None, horizon=None):
+        self.cadence = cadence
+        self.test = test if test is not None else PCR_TEST
+        self.horizon = horizon
+
+    def testing_days(self, T):
+        # Boolean mask of the testing days of the calendar:
+        return testing_calendar(self.cadence, self.horizon if self.horizon is not None else int(numpy.ceil(T)) + 1)
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+
+def legacy_cadence_testing_days(cadence_cycle_length):
+    # The testing day numbers of each cadence name hard-coded in the former forked sim loops: the 110-day cycle of
+    # sim_loops_altered, or (for longer cycles) the 310-day cycle of its self test, administered test and
+    # replication forks. These differ from the generated calendars of testing_calendar: 'semiweekly' tests on days
+    # 0, 3, 7, ..., 24, 37 and then every 3rd day from day 30, 'everyday' and 'workday' stop a few days before the
+    # end of the cycle (the 310-day 'workday' list also drifts off Mon-Fri after day 100), and 'none' tests on the
+    # last day of the cycle.
+    if (cadence_cycle_length <= 110):
+        return {'everyday':     list(range(105)),
+                'workday':      [day for day in range(103) if day % 7 < 5],
+                'semiweekly':   [0, 3, 7, 10, 14, 17, 21, 24, 37] + list(range(30, 103, 3)),
+                'weekly':       list(range(0, 99, 7)),
+                'biweekly':     list(range(0, 99, 14)),
+                'monthly':      list(range(0, 85, 28)),
+                'none':         [109],
+                'cycle_start':  [0]}
+    else:
+        return {'everyday':     list(range(301)),
+                'workday':      LEGACY_WORKDAYS_310,
+                'semiweekly':   [0, 3, 7, 10, 14, 17, 21, 24, 37] + list(range(30, 301, 3)),
+                'weekly':       list(range(0, 295, 7)),
+                'biweekly':     list(range(0, 99, 14)),
+                'monthly':      list(range(0, 281, 28)),
+                'none':         [309],
+                'cycle_start':  [0]}
+
+
+LEGACY_WORKDAYS_310 = [0, 1, 2, 3, 4, 7, 8, 9, 10, 11, 14, 15, 16, 17, 18, 21, 22, 23, 24, 25, 28, 29, 30, 31,
+                       32, 35, 36, 37, 38, 39, 42, 43, 44, 45, 46, 49, 50, 51, 52, 53, 56, 57, 58, 59, 60, 63, 64, 65,
+                       66, 67, 70, 71, 72, 73, 74, 77, 78, 79, 80, 81, 84, 85, 86, 87, 88, 91, 92, 93, 94, 95, 98, 99,
+                       100, 101, 102, 103, 106, 107, 108, 109, 110, 113, 114, 115, 116, 117, 120, 121, 122, 123, 124, 127, 128, 129, 130, 131,
+                       134, 135, 136, 137, 138, 141, 142, 143, 144, 145, 148, 149, 150, 151, 152, 155, 156, 157, 158, 159, 160, 163, 164, 165,
+                       166, 167, 170, 171, 172, 173, 174, 177, 178, 179, 180, 181, 184, 185, 186, 187, 188, 191, 192, 193, 194, 195, 198, 199,
+                       200, 201, 202, 205, 206, 207, 208, 209, 212, 213, 214, 215, 216, 219, 220, 221, 222, 223, 226, 227, 228, 229, 230, 233,
+                       234, 235, 236, 237, 240, 241, 242, 243, 245, 246, 247, 248, 249, 252, 253, 254, 255, 256, 259, 260, 261, 262, 263, 266,
+                       267, 268, 269, 270, 273, 274, 275, 276, 277, 280, 281, 282, 283, 284, 287, 288, 289, 290, 291, 294, 295, 296, 297, 298]
+
+
+def testing_calendar(cadence, horizon):
+    # Boolean mask of the testing days among the day numbers 0, ..., horizon-1 (see TestingScenario for the cadence rules):
+    days = numpy.arange(horizon)
+    if (isinstance(cadence, str)):
+        assert (cadence in ['everyday', 'workday', 'semiweekly', 'weekly', 'biweekly', 'monthly', 'cycle_start', 'none']), "Unrecognized testing cadence '" + cadence + "'."
+        if (cadence == 'everyday'):
+            return numpy.ones(horizon, dtype=bool)
+        elif (cadence == 'workday'):
+            return (days % 7 < 5)
+        elif (cadence == 'semiweekly'):
+            return (days % 7 == 0) | (days % 7 == 3)
+        elif (cadence == 'weekly'):
+            return (days % 7 == 0)
+        elif (cadence == 'biweekly'):
+            return (days % 14 == 0)
+        elif (cadence == 'monthly'):
+            return (days % 28 == 0)
+        elif (cadence == 'cycle_start'):
+            return (days == 0)
+        else:
+            return numpy.zeros(horizon, dtype=bool)
+    elif (numpy.ndim(cadence) == 0):
+        return (days % int(cadence) == 0)
+    else:
+        testingDays = numpy.zeros(horizon, dtype=bool)
+        cadence = numpy.asarray(cadence, dtype=int)
+        testingDays[cadence[cadence < horizon]] = True
+        return testingDays
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+
+class TestCharacteristics():
+    """
+    Declarative description of the test used by run_tti_sim
+    ===================================================
+    Params:
+            name                    Name of the test
+            falseneg_rate           'temporal' to use the falseneg_rates_by_day, or a constant false negative probability
+            falseneg_rates_by_day   False negative probabilities of a test on each day (0, 1, 2, ...) that a node has been in its
+                                    current state, as a list (or a {day: rate} dict) per infection stage: 'E', 'pre', 'sym', 'asym'
+                                    (applying to the isolated states as well), 'Q_E', 'Q_pre', 'Q_sym', 'Q_asym' (isolated states only),
+                                    or model state codes. The last rate given applies to all later days.
+
+    Only infectious (pre-symptomatic, symptomatic, asymptomatic) nodes can test positive; the tests of other nodes are negative.
+    """
+    stageStates = {'E': ['E', 'Q_E'], 'pre': ['I_pre', 'Q_pre'], 'sym': ['I_sym', 'Q_sym'], 'asym': ['I_asym', 'Q_asym']}
+
+    def __init__(self, name=None, falseneg_rate='temporal', falseneg_rates_by_day=None):
+        self.name = name
+        self.falseneg_rate = falseneg_rate
+        self.falseneg_rates_by_day = falseneg_rates_by_day if falseneg_rates_by_day is not None else {}
+
+    def falseneg_table(self, model):
+        # False negative probabilities as a lookup table indexed by (state code, whole days in state):
+        testableStates = [model.I_pre, model.I_sym, model.I_asym, model.Q_pre, model.Q_sym, model.Q_asym]
+        if (self.falseneg_rate != 'temporal'):
+            falsenegRates = numpy.ones((model.numStateCodes, 1))
+            falsenegRates[testableStates] = self.falseneg_rate
+            return falsenegRates
+
+        # Rates of each state code (stage-wide rates first, so that state-specific rates take precedence):
+        stateRates = {}
+        for key, rates in sorted(self.falseneg_rates_by_day.items(), key=lambda item: item[0] not in self.stageStates):
+            if (isinstance(rates, dict)):
+                lastDay = max(rates.keys())
+                rates = [rates[min(day, lastDay)] for day in range(lastDay + 1)]
+            if (key in self.stageStates):
+                states = [getattr(model, state) for state in self.stageStates[key]]
+            else:
+                states = [getattr(model, key) if isinstance(key, str) else key]
+            for state in states:
+                stateRates[state] = list(rates)
+
+        numDays = max([len(rates) for state, rates in stateRates.items() if state in testableStates] + [1])
+        falsenegRates = numpy.ones((model.numStateCodes, numDays))
+        for state in testableStates:
+            if (state in stateRates):
+                rates = stateRates[state]
+                falsenegRates[state] = rates + [rates[-1]] * (numDays - len(rates))
+        return falsenegRates
+
+
+PCR_TEST = TestCharacteristics(name='PCR', falseneg_rates_by_day={
+    'E':    [1.00, 1.00, 1.00, 1.00],
+    'pre':  [0.25, 0.25, 0.22],
+    'sym':  [0.19, 0.16, 0.16, 0.17, 0.19, 0.22, 0.26, 0.29, 0.34, 0.38, 0.43, 0.48, 0.52, 0.57, 0.62, 0.66, 0.70, 0.76, 0.79,
+             0.82, 0.85, 0.88, 0.90, 0.92, 0.93, 0.95, 0.96, 0.97, 0.97, 0.98, 0.98, 0.99],
+    'asym': [0.19, 0.16, 0.16, 0.17, 0.19, 0.22, 0.26, 0.29, 0.34, 0.38, 0.43, 0.48, 0.52, 0.57, 0.62, 0.66, 0.70, 0.76, 0.79,
+             0.82, 0.85, 0.88, 0.90, 0.92, 0.93, 0.95, 0.96, 0.97, 0.97, 0.98, 0.98, 0.99]})
+
+SELF_TEST = TestCharacteristics(name='self test', falseneg_rates_by_day={
+    'E':    [1.00, 1.00, 1.00, 1.00],
+    'pre':  [0.22, 0.22, 0.22],
+    'sym':  [0.22, 0.22, 0.22, 0.22, 0.22, 0.22, 0.26, 0.29, 0.34, 0.38, 0.43, 0.48, 0.52, 0.57, 0.62, 0.66, 0.70, 0.76, 0.79,
+             0.82, 0.85, 0.88, 0.90, 0.92, 0.93, 0.95, 0.96, 0.97, 0.97, 0.98, 0.98, 0.99],
+    'asym': [0.22, 0.22, 0.22, 0.22, 0.22, 0.22, 0.26, 0.29, 0.34, 0.38, 0.43, 0.48, 0.52, 0.57, 0.62, 0.66, 0.70, 0.76, 0.79,
+             0.82, 0.85, 0.88, 0.90, 0.92, 0.93, 0.95, 0.96, 0.97, 0.97, 0.98, 0.98, 0.99]})
+
+ADMINISTERED_TEST = TestCharacteristics(name='administered test', falseneg_rates_by_day={
+    'E':     [1.00, 1.00, 1.00, 1.00],
+    'pre':   [0.012, 0.012, 0.012],
+    'sym':   [0.012, 0.012, 0.012, 0.012, 0.012, 0.012, 0.26, 0.29, 0.34, 0.38, 0.43, 0.48, 0.52, 0.57, 0.62, 0.66, 0.70, 0.76, 0.79,
+              0.82, 0.85, 0.88, 0.90, 0.92, 0.93, 0.95, 0.96, 0.97, 0.97, 0.98, 0.98, 0.99],
+    'Q_sym': [0.012, 0.012, 0.012, 0.012, 0.012, 0.012, 0.012, 0.012, 0.012, 0.38, 0.43, 0.48, 0.52, 0.57, 0.62, 0.66, 0.70, 0.76, 0.79,
+              0.82, 0.85, 0.88, 0.90, 0.92, 0.93, 0.95, 0.96, 0.97, 0.97, 0.98, 0.98, 0.99],
+    'asym':  [0.012, 0.012, 0.012, 0.012, 0.012, 0.012, 0.012, 0.012, 0.012, 0.38, 0.43, 0.48, 0.52, 0.57, 0.62, 0.66, 0.70, 0.76, 0.79,
+              0.82, 0.85, 0.88, 0.90, 0.92, 0.93, 0.95, 0.96, 0.97, 0.97, 0.98, 0.98, 0.99]})
@@ -0,0 +1,83 @@
+from __future__ import division
+import contextlib
+import io
+import random
+import time
+
+import numpy
+import scipy.stats
+
+
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Outcomes compared between solvers:
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def solver_outcomes(model):
+    # Outcome measures of a finished ExtSEIRSNetworkModel simulation (from its recorder, so any recorder will do):
+    summary = model.recorder.summary()
+    return {'attack_rate':              summary['attack_rate'],
+            'peak_pct_hospitalized':    summary['peak_numH']/model.numNodes * 100,
+            'num_fatalities':           summary['numF'],
+            'peak_pct_symptomatic':     (summary['peak']['numI_sym'] + summary['peak']['numQ_sym'])/model.numNodes * 100,
+            'num_positive':             summary['final']['numPositive']}
+
+
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Approximate vs exact solver comparison:
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def compare_solvers(model_factory, simulate, num_replicates=30, base_seed=0,
+                    approx_params={'solver_mode':'tau_leaping'}, exact_params={'solver_mode':'exact'},
+                    outcomes=solver_outcomes, significance=0.01, quiet=True, verbose=True):
+    # Runs num_replicates simulations with the exact solver and with an approximate solver and compares the
+    # distributions of their outcomes. model_factory(**solver_params) builds a fresh model and simulate(model)
+    # runs it, e.g. lambda model: model.run(T=100, print_interval=0) or lambda model: run_tti_sim(model, 100, ...).
+    # Replicate i of both solvers starts from the same seed of the global numpy.random and random streams, so any
+    # network or parameter draws made by the factory are shared between the two solvers.
+    # Returns the mean and standard deviation of each outcome under each solver, the difference in means in units
+    # of its standard error, and the two-sample Kolmogorov-Smirnov statistic and p-value, along with the runtimes.
+    seeds = numpy.random.SeedSequence(base_seed).generate_state(num_replicates)
+
+    results  = {}
+    runtimes = {}
+    for solver, solverParams in [('exact', exact_params), ('approx', approx_params)]:
+        results[solver] = []
+        startTime = time.time()
+        for seed in seeds:
+            numpy.random.seed(seed)
+            random.seed(int(seed))
+            model = model_factory(**solverParams)
+            with (contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()):
+                simulate(model)
+            results[solver].append(outcomes(model))
+        runtimes[solver] = time.time() - startTime
+
+    report = {'num_replicates': num_replicates, 'outcomes': {},
+              'exact_runtime': runtimes['exact'], 'approx_runtime': runtimes['approx'],
+              'speedup': runtimes['exact']/runtimes['approx'] if runtimes['approx'] > 0 else numpy.inf}
+    for outcome in results['exact'][0]:
+        exactValues  = numpy.array([result[outcome] for result in results['exact']], dtype=float)
+        approxValues = numpy.array([result[outcome] for result in results['approx']], dtype=float)
+        stdErr       = numpy.sqrt(exactValues.var(ddof=1)/num_replicates + approxValues.var(ddof=1)/num_replicates) if num_replicates > 1 else 0
+        ksStatistic, ksPvalue = scipy.stats.ks_2samp(exactValues, approxValues)
+        report['outcomes'][outcome] = {'exact_mean':   exactValues.mean(),  'exact_std':  exactValues.std(ddof=1) if num_replicates > 1 else 0,
+                                       'approx_mean':  approxValues.mean(), 'approx_std': approxValues.std(ddof=1) if num_replicates > 1 else 0,
+                                       'mean_diff_stderrs': (approxValues.mean()-exactValues.mean())/stdErr if stdErr > 0 else 0,
+                                       'ks_statistic': ksStatistic, 'ks_pvalue': ksPvalue}
+    # Consistent if no outcome distribution differs significantly (Bonferroni-corrected over the outcomes):
+    report['consistent'] = all(outcomeReport['ks_pvalue'] >= significance/len(report['outcomes']) for outcomeReport in report['outcomes'].values())
+
+    if(verbose):
+        print("%-24s %22s %22s %8s %8s" % ('outcome', 'exact mean (sd)', 'approx mean (sd)', 'KS', 'p'))
+        for outcome, outcomeReport in report['outcomes'].items():
+            print("%-24s %12.4g (%7.3g) %12.4g (%7.3g) %8.3f %8.3f" % (outcome, outcomeReport['exact_mean'], outcomeReport['exact_std'],
+                                                                      outcomeReport['approx_mean'], outcomeReport['approx_std'],
+                                                                      outcomeReport['ks_statistic'], outcomeReport['ks_pvalue']))
+        print("runtime: exact %.1fs, approx %.1fs (%.1fx); outcome distributions %s" % (runtimes['exact'], runtimes['approx'], report['speedup'],
+                                                                                    'consistent' if report['consistent'] else 'DIFFER'))
+
+    return report
@@ -0,0 +1,384 @@
+from __future__ import division
+import contextlib
+import concurrent.futures
+import csv
+import glob
+import hashlib
+import io
+import itertools
+import os
+import random
+import time
+import uuid
+
+import numpy
+import scipy.sparse
+
+from .models import BatchExtSEIRSNetworkModel, ExtSEIRSNetworkModel
+from .networks import generate_workplace_contact_network
+from .sim_loops_altered import run_tti_sim, run_tti_sim_batch
+from .utilities import gamma_dist
+
+
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Sweep conditions and per-replicate seeding:
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+CONDITION_FIELDS = ['Network_size', 'Bubble_size', 'PCR_frequency', 'R']
+
+OUTCOME_FIELDS   = ['Percentage_infected', 'Peak_Percentage_Hospitalized', 'Percentage_Fatality']
+
+RECORD_FIELDS    = ['key'] + CONDITION_FIELDS + ['Replicate', 'Base_seed', 'Engine'] + OUTCOME_FIELDS + ['Runtime']
+
+
+def workplace_sweep_conditions(network_sizes=[20, 50, 100, 250, 500, 1000], bubble_sizes=[5, 10, 25, 50],
+                               pcr_frequencies=['workday', 'weekly', 'semiweekly', 'monthly', 'none'], R_values=[1, 1.5, 2, 2.5, 3],
+                               include_no_bubble=True):
+    # Bubble sizes must evenly divide the network size; the 'no bubble' condition is a single bubble of the whole network.
+    conditions = []
+    for network_size, bubble_size, pcr_frequency, R in itertools.product(network_sizes, bubble_sizes, pcr_frequencies, R_values):
+        if(network_size % bubble_size != 0 or network_size == bubble_size):
+            continue
+        conditions.append({'Network_size':network_size, 'Bubble_size':bubble_size, 'PCR_frequency':pcr_frequency, 'R':R})
+    if(include_no_bubble):
+        for network_size, pcr_frequency, R in itertools.product(network_sizes, pcr_frequencies, R_values):
+            conditions.append({'Network_size':network_size, 'Bubble_size':network_size, 'PCR_frequency':pcr_frequency, 'R':R})
+    return conditions
+
+
+def sweep_record_key(condition, replicate, base_seed, batched=False):
+    # Records of the same (condition, replicate) run from different base seeds are different results,
+    # so a store shared between sweeps with different base seeds keeps (and resumes) them separately.
+    # The same holds for batched and unbatched runs, which draw from different random streams: batched keys
+    # end with '|batch' (the batch size does not matter, as batched replicates do not depend on each other).
+    return '|'.join([str(condition[field]) for field in CONDITION_FIELDS] + [str(replicate), str(base_seed)] + (['batch'] if batched else []))
+
+
+def sweep_replicate_seed(base_seed, condition, replicate):
+    # Seeds are derived from the condition values and replicate number (not from the order in which tasks
+    # are scheduled), using a stable digest since Python's built-in hash() is salted per process.
+    key    = '|'.join([str(condition[field]) for field in CONDITION_FIELDS] + [str(replicate)])
+    digest = hashlib.sha256(key.encode('utf-8')).digest()
+    return numpy.random.SeedSequence([int(base_seed), int.from_bytes(digest[:16], 'little')])
+
+
+def sweep_network_seed(base_seed, condition, replicate):
+    # The workplace network only depends on the network and bubble sizes, so replicates of conditions that differ only
+    # in their PCR frequency or R share a network seed (and a cached network, when a network cache is used).
+    key    = '|'.join([str(condition['Network_size']), str(condition['Bubble_size']), str(replicate)])
+    digest = hashlib.sha256(key.encode('utf-8')).digest()
+    return int(numpy.random.SeedSequence([int(base_seed), int.from_bytes(digest[:16], 'little')]).generate_state(1)[0])
+
+
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Single workplace simulation:
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def simulate_workplace_outbreak(network_size, bubble_size, pcr_frequency, R, rng, T=100, **build_kwargs):
+    # Runs one realization of the workplace outbreak scenario (network generation, heterogeneous parameter draws,
+    # model construction and TTI simulation) and returns its outcome percentages.
+    # The network generator, model and TTI loop draw from the global numpy.random and random streams, so these are
+    # re-seeded from the given Generator before anything is drawn, making the realization depend only on rng
+    # (and on network_seed, if given; see build_workplace_outbreak for the other keyword arguments).
+    model, tti = build_workplace_outbreak(network_size, bubble_size, pcr_frequency, R, rng, **build_kwargs)
+
+    run_tti_sim(model, T, **tti)
+
+    return workplace_outbreak_outcomes(model)
+
+
+def build_workplace_outbreak(network_size, bubble_size, pcr_frequency, R, rng,
+                             pct_init_exposed=0.10, introductions_per_node_per_day=1/1200,
+                             farz_params={'alpha':5.0, 'gamma':5.0, 'beta':0.5, 'r':1, 'q':0.0, 'phi':10,
+                                          'b':0, 'epsilon':1e-6, 'directed': False, 'weighted': False},
+                             model_params={}, tti_params={}, network_seed=None, network_cache_dir=None, profiler=None):
+    # The model of one realization of the workplace outbreak scenario and the run_tti_sim parameters of its
+    # testing, tracing and isolation protocol. The global numpy.random and random streams are re-seeded from rng first.
+    # Networks generated from network_seed are stored in and reused from network_cache_dir, if given.
+    # A ModelProfiler, if given, is attached to the model and also times the network generation and model construction.
+    timedPhase = profiler.phase if profiler is not None else (lambda name: contextlib.nullcontext())
+    numpy.random.seed(rng.integers(2**32))
+    random.seed(int(rng.integers(2**63)))
+
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Workplace contact network:
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    num_cohorts = network_size//bubble_size
+    N           = bubble_size*num_cohorts
+    with timedPhase('generate_workplace_contact_network'):
+        G_baseline, cohorts, teams = generate_workplace_contact_network(
+                                         num_cohorts=num_cohorts, num_nodes_per_cohort=bubble_size, num_teams_per_cohort=1,
+                                         mean_intracohort_degree=round(0.10*bubble_size), pct_contacts_intercohort=0.0,
+                                         farz_params=dict(farz_params), graph_format='csr',
+                                         seed=network_seed, cache_dir=(network_cache_dir if network_seed is not None else None), mmap=True)
+    G_quarantine = scipy.sparse.csr_matrix(G_baseline.shape)
+
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Heterogeneous disease parameters:
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    SIGMA   = 1 / gamma_dist(2.5, 0.6, N)
+    LAMDA   = 1 / gamma_dist(3.5, 0.6, N)
+    GAMMA   = 1 / gamma_dist(6.5, 0.4, N)
+    ETA     = 1 / gamma_dist(8.0, 0.45, N)
+    GAMMA_H = 1 / gamma_dist(14.0, 0.45, N)
+    MU_H    = 1 / gamma_dist(7.0, 0.45, N)
+    R0      = gamma_dist(R, 0.2, N)
+    BETA    = 1/(1/LAMDA + 1/GAMMA) * R0
+
+    params = {'G':G_baseline, 'G_Q':G_quarantine, 'p':0.4, 'beta':BETA, 'sigma':SIGMA, 'lamda':LAMDA, 'gamma':GAMMA,
+              'gamma_asym':GAMMA, 'eta':ETA, 'gamma_H':GAMMA_H, 'mu_H':MU_H, 'a':0.308, 'h':0.043, 'f':0.05,
+              'isolation_time':14, 'initE':pct_init_exposed*network_size, 'profiler':profiler}
+    params.update(model_params)
+    with timedPhase('model_init'):
+        model = ExtSEIRSNetworkModel(**params)
+
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Testing, tracing and isolation protocol:
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    compliance_rates = {'testing_compliance_random':1.0, 'testing_compliance_traced':0.0, 'testing_compliance_symptomatic':0.75,
+                        'tracing_compliance':0.0,
+                        'isolation_compliance_symptomatic_individual':0.0, 'isolation_compliance_symptomatic_groupmate':0.0,
+                        'isolation_compliance_positive_individual':1.0, 'isolation_compliance_positive_groupmate':0.0,
+                        'isolation_compliance_positive_contact':1.0, 'isolation_compliance_positive_contactgroupmate':0.0}
+    tti = {'intervention_start_pct_infected':0.0, 'average_introductions_per_day':introductions_per_node_per_day*network_size,
+           'testing_cadence':pcr_frequency, 'pct_tested_per_day':1.0, 'test_falseneg_rate':'temporal',
+           'max_pct_tests_for_symptomatics':1.0, 'max_pct_tests_for_traces':0.0, 'random_testing_degree_bias':0,
+           'pct_contacts_to_trace':0.0, 'tracing_lag':2,
+           'isolation_lag_symptomatic':2, 'isolation_lag_positive':1, 'isolation_lag_contact':0,
+           'isolation_groups':list(teams.values())}
+    for compliance, rate in compliance_rates.items():
+        tti[compliance] = (rng.random(N) < tti_params.get(compliance, rate))
+    tti.update({param: value for param, value in tti_params.items() if param not in compliance_rates})
+
+    return model, tti
+
+
+def workplace_outbreak_outcomes(model):
+    # Outcomes are taken from the model's recorder summary rather than from the recorded series, which may hold only
+    # some of the rows (e.g., with a SummaryRecorder or an interval SeriesRecorder); its peaks are over all events.
+    summary = model.recorder.summary()
+    return {'Percentage_infected':          summary['attack_rate'] * 100,
+            'Peak_Percentage_Hospitalized': summary['peak_numH']/model.numNodes * 100,
+            'Percentage_Fatality':          summary['numF']/model.numNodes * 100}
+
+
+def run_sweep_replicate(condition, replicate, base_seed=0, sim_kwargs={}, quiet=True):
+    # Worker entry point: simulates one (condition, replicate) and returns its result record.
+    seedSeq   = sweep_replicate_seed(base_seed, condition, replicate)
+    rng       = numpy.random.default_rng(seedSeq)
+    if(sim_kwargs.get('network_cache_dir') is not None and sim_kwargs.get('network_seed') is None):
+        sim_kwargs = dict(sim_kwargs, network_seed=sweep_network_seed(base_seed, condition, replicate))
+    startTime = time.time()
+    with (contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()):
+        outcomes = simulate_workplace_outbreak(condition['Network_size'], condition['Bubble_size'], condition['PCR_frequency'], condition['R'],
+                                               rng=rng, **sim_kwargs)
+    record = {'key':sweep_record_key(condition, replicate, base_seed)}
+    record.update({field: condition[field] for field in CONDITION_FIELDS})
+    record.update({'Replicate':replicate, 'Base_seed':base_seed, 'Engine':'single'})
+    record.update(outcomes)
+    record['Runtime'] = time.time() - startTime
+    return record
+
+
+def run_sweep_batch(condition, replicates, base_seed=0, sim_kwargs={}, quiet=True):
+    # Worker entry point for batched sweeps: simulates several replicates of one condition together in a
+    # BatchExtSEIRSNetworkModel and returns their result records (with the batch's runtime split evenly among them).
+    # Each replicate's model and random streams are seeded from its own replicate seed, so its outcome does not
+    # depend on the other replicates in the batch (but differs from its unbatched outcome, which uses other streams,
+    # hence the separate record keys).
+    simKwargs = dict(sim_kwargs)
+    T         = simKwargs.pop('T', 100)
+    startTime = time.time()
+    models, ttiParams, batchSeeds = [], [], []
+    with (contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()):
+        for replicate in replicates:
+            rng = numpy.random.default_rng(sweep_replicate_seed(base_seed, condition, replicate))
+            replicateKwargs = simKwargs
+            if(simKwargs.get('network_cache_dir') is not None and simKwargs.get('network_seed') is None):
+                replicateKwargs = dict(simKwargs, network_seed=sweep_network_seed(base_seed, condition, replicate))
+            model, tti = build_workplace_outbreak(condition['Network_size'], condition['Bubble_size'], condition['PCR_frequency'], condition['R'],
+                                                  rng=rng, **replicateKwargs)
+            models.append(model)
+            ttiParams.append(tti)
+            batchSeeds.append(int(rng.integers(2**63)))
+        batch = BatchExtSEIRSNetworkModel(models, seed=batchSeeds)
+        run_tti_sim_batch(batch, T, ttiParams)
+    runtime = (time.time() - startTime)/len(replicates)
+
+    records = []
+    for replicate, model in zip(replicates, models):
+        record = {'key':sweep_record_key(condition, replicate, base_seed, batched=True)}
+        record.update({field: condition[field] for field in CONDITION_FIELDS})
+        record.update({'Replicate':replicate, 'Base_seed':base_seed, 'Engine':'batch'})
+        record.update(workplace_outbreak_outcomes(model))
+        record['Runtime'] = runtime
+        records.append(record)
+    return records
+
+
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Append-only sweep result store:
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def parquet_engine():
+    # The first parquet engine available to pandas (None if neither pyarrow nor fastparquet can be imported):
+    for engine in ['pyarrow', 'fastparquet']:
+        try:
+            __import__(engine)
+            return engine
+        except ImportError:
+            continue
+    return None
+
+
+class SweepResultStore():
+    """
+    An append-only directory of result shards for a parameter sweep
+    ===================================================
+    Params:
+            path            Directory holding the shards (created if needed)
+            fmt             'csv' (one shard per session, each record written and flushed as it arrives)
+                            or 'parquet' (a new shard every rows_per_shard records; requires pandas with pyarrow or fastparquet)
+            rows_per_shard  Number of records buffered per parquet shard
+
+    Existing shards are never modified, so an interrupted sweep loses at most the records not yet flushed,
+    and completed_keys() lets a restarted sweep skip the (condition, replicate) keys already on disk.
+    """
+    def __init__(self, path, fmt='csv', rows_per_shard=500):
+        assert(fmt in ['csv', 'parquet']), "Unrecognized result store format (support for 'csv' and 'parquet')."
+        self.path           = path
+        self.fmt            = fmt
+        self.rows_per_shard = rows_per_shard
+        self.sessionId      = time.strftime('%Y%m%d-%H%M%S')+'-'+uuid.uuid4().hex[:8]
+        self.numShards      = 0
+        self.buffer         = []
+        self.csvFile        = None
+        self.csvWriter      = None
+        self.parquetEngine  = None
+        if(self.fmt == 'parquet'):
+            # Check for a parquet engine up front, rather than losing the buffered records at the first flush:
+            import pandas
+            self.parquetEngine = parquet_engine()
+            assert(self.parquetEngine is not None), "The 'parquet' result store format requires pyarrow or fastparquet."
+        os.makedirs(self.path, exist_ok=True)
+
+    def shard_paths(self):
+        return sorted(glob.glob(os.path.join(self.path, 'shard-*.'+self.fmt)))
+
+    def completed_keys(self):
+        keys = set()
+        for shardPath in self.shard_paths():
+            if(self.fmt == 'csv'):
+                with open(shardPath, newline='') as shardFile:
+                    # (a partially written last line from a killed session is skipped; its key will be re-run)
+                    keys.update(row['key'] for row in csv.DictReader(shardFile) if row.get(RECORD_FIELDS[-1]) not in (None, ''))
+            else:
+                import pandas
+                keys.update(pandas.read_parquet(shardPath, columns=['key'])['key'])
+        return keys
+
+    def append(self, record):
+        if(self.fmt == 'csv'):
+            if(self.csvFile is None):
+                self.csvFile   = open(os.path.join(self.path, 'shard-'+self.sessionId+'.csv'), 'w', newline='')
+                self.csvWriter = csv.DictWriter(self.csvFile, fieldnames=RECORD_FIELDS, extrasaction='ignore')
+                self.csvWriter.writeheader()
+            self.csvWriter.writerow(record)
+            self.csvFile.flush()
+        else:
+            self.buffer.append(record)
+            if(len(self.buffer) >= self.rows_per_shard):
+                self.flush()
+
+    def flush(self):
+        if(self.fmt == 'parquet' and len(self.buffer) > 0):
+            import pandas
+            shardPath = os.path.join(self.path, 'shard-'+self.sessionId+'-'+str(self.numShards).zfill(5)+'.parquet')
+            # Write to a temporary name first so a killed write never leaves a truncated shard behind:
+            pandas.DataFrame(self.buffer, columns=RECORD_FIELDS).to_parquet(shardPath+'.tmp', engine=self.parquetEngine, index=False)
+            os.replace(shardPath+'.tmp', shardPath)
+            self.numShards += 1
+            self.buffer = []
+        elif(self.csvFile is not None):
+            self.csvFile.flush()
+
+    def close(self):
+        self.flush()
+        if(self.csvFile is not None):
+            self.csvFile.close()
+            self.csvFile = None
+
+    def load(self):
+        import pandas
+        if(self.fmt == 'csv'):
+            shards = [pandas.read_csv(shardPath).dropna(subset=[RECORD_FIELDS[-1]]) for shardPath in self.shard_paths()]
+        else:
+            shards = [pandas.read_parquet(shardPath) for shardPath in self.shard_paths()]
+        if(len(shards) == 0):
+            return pandas.DataFrame(columns=RECORD_FIELDS)
+        return pandas.concat(shards, ignore_index=True).drop_duplicates(subset='key', keep='first')
+
+
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Parallel sweep runner:
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def run_sweep_task(condition, replicates, base_seed=0, sim_kwargs={}, batched=False):
+    # Worker entry point of run_sweep: the result records of the given replicates of one condition,
+    # simulated one at a time or together in one batch.
+    if(batched):
+        return run_sweep_batch(condition, replicates, base_seed, sim_kwargs)
+    return [run_sweep_replicate(condition, replicate, base_seed, sim_kwargs) for replicate in replicates]
+
+
+def run_sweep(conditions, num_replicates, store, base_seed=0, num_workers=None, sim_kwargs={}, batch_size=1, verbose=True):
+    # Runs num_replicates replicates of every condition across a process pool, streaming each finished record
+    # to the result store (a SweepResultStore or a directory path for a CSV store). Keys already present in
+    # the store are skipped, so re-running the same call resumes an interrupted sweep.
+    # With batch_size > 1, the replicates of each condition are simulated batch_size at a time in one
+    # BatchExtSEIRSNetworkModel per task (see run_sweep_batch). Batched and unbatched records have different keys,
+    # so resuming with batch_size switched between 1 and > 1 runs the replicates again with that engine.
+    if(not isinstance(store, SweepResultStore)):
+        store = SweepResultStore(store)
+
+    completedKeys = store.completed_keys()
+    batched  = (batch_size > 1)
+    pending  = [(condition, [replicate for replicate in range(num_replicates) if sweep_record_key(condition, replicate, base_seed, batched) not in completedKeys])
+                for condition in conditions]
+    numTasks = sum(len(replicates) for condition, replicates in pending)
+    if(verbose):
+        print("Sweep: %d of %d replicates already completed, %d to run." % (len(conditions)*num_replicates-numTasks, len(conditions)*num_replicates, numTasks))
+
+    batchSize = max(batch_size, 1)
+    batches   = [(condition, replicates[i:i+batchSize]) for condition, replicates in pending for i in range(0, len(replicates), batchSize)]
+
+    numDone = 0
+    try:
+        if(num_workers == 1):
+            for condition, replicates in batches:
+                for record in run_sweep_task(condition, replicates, base_seed, sim_kwargs, batched):
+                    store.append(record)
+                    numDone += 1
+                    if(verbose):
+                        print("[%d/%d] %s" % (numDone, numTasks, record['key']))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
+                futures = [executor.submit(run_sweep_task, condition, replicates, base_seed, sim_kwargs, batched) for condition, replicates in batches]
+                for future in concurrent.futures.as_completed(futures):
+                    for record in future.result():
+                        store.append(record)
+                        numDone += 1
+                        if(verbose):
+                            print("[%d/%d] %s" % (numDone, numTasks, record['key']))
+    finally:
+        store.close()
+
+    return store
@@ -0,0 +1,255 @@
+import contextlib
+import csv
+import glob
+import hashlib
+import io
+import os
+import random
+import sys
+import warnings
+
+import networkx
+import numpy
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'build', 'lib'))
+
+from seirsplus import FARZ
+from seirsplus.models import ExtSEIRSNetworkModel, SeriesRecorder
+from seirsplus.networks import generate_workplace_contact_network
+from seirsplus.sim_loops_altered import (ADMINISTERED_TEST, PCR_TEST, SELF_TEST, TestCharacteristics,
+                                         legacy_cadence_testing_days, run_tti_sim)
+from seirsplus.solver_validation import compare_solvers
+from seirsplus.sweeps import RECORD_FIELDS, SweepResultStore, run_sweep, sweep_record_key
+
+warnings.filterwarnings('ignore', category=FutureWarning)
+
+
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Small workplace-like models:
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+NUM_NODES = 300
+
+
+def make_model(seed, network_seed=None, **model_params):
+    # (seed=None leaves the global numpy.random stream as it is, e.g. when the caller seeds each replicate)
+    if (seed is not None):
+        numpy.random.seed(seed)
+    G = networkx.barabasi_albert_graph(NUM_NODES, 4, seed=network_seed if network_seed is not None else seed)
+    return ExtSEIRSNetworkModel(G=G, beta=0.3, sigma=1/3, lamda=1/2, gamma=1/6, gamma_asym=1/6, eta=1/7, gamma_H=1/10, mu_H=1/12,
+                                a=0.3, h=0.2, f=0.1, p=0.2, q=0.5, theta_sym=0.05, phi_E=0.05, phi_sym=0.2, psi_E=1,
+                                initE=5, isolation_time=10, **model_params)
+
+
+def run_tti(model, T=100):
+    compliance = numpy.ones(model.numNodes, dtype=bool)
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_tti_sim(model, T, average_introductions_per_day=0.1, testing_cadence='weekly', pct_tested_per_day=0.5,
+                    testing_compliance_random=compliance, testing_compliance_symptomatic=compliance,
+                    isolation_compliance_positive_individual=compliance, isolation_compliance_symptomatic_individual=compliance)
+    return model
+
+
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Propensity engines and state counters:
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def test_full_and_incremental_propensities_give_the_same_outcome_distributions():
+    # Both engines simulate the same process, so their outcome distributions over replicates must agree:
+    report = compare_solvers(lambda **solver_params: make_model(None, network_seed=0, **solver_params),
+                             lambda model: model.run(T=60, print_interval=0), num_replicates=40,
+                             approx_params={'propensity_mode':'incremental'}, exact_params={'propensity_mode':'full'}, verbose=False)
+    assert report['consistent'], report['outcomes']
+
+
+@pytest.mark.parametrize('model_params', [{'propensity_mode':'full'},
+                                          {'propensity_mode':'incremental'},
+                                          {'propensity_mode':'incremental', 'solver_mode':'tau_leaping', 'tau_leap_min_events':1}])
+def test_state_and_group_counters_match_recounts_after_tti_run(model_params):
+    model = run_tti(make_model(7, node_groups={'a':list(range(150)), 'b':list(range(100, 300))}, **model_params))
+
+    X = model.X.ravel()
+    assert numpy.array_equal(model.stateCounts, numpy.bincount(X, minlength=model.numStateCodes))
+    assert model.numTestedNodes == numpy.count_nonzero(model.tested)
+    assert model.numPositiveNodes == numpy.count_nonzero(model.positive)
+    assert model.isolatedNodes == set(numpy.flatnonzero(model.isIsolationState[X]).tolist())
+    for groupName in ['a', 'b']:
+        mask  = model.nodeGroupData[groupName]['mask'].ravel()
+        group = model.nodeGroupIndex[groupName]
+        assert numpy.array_equal(model.nodeGroupStateCounts[group], numpy.bincount(X[mask], minlength=model.numStateCodes))
+        assert model.nodeGroupTestedCounts[group] == numpy.count_nonzero(model.tested.ravel()[mask])
+        assert model.nodeGroupPositiveCounts[group] == numpy.count_nonzero(model.positive.ravel()[mask])
+
+
+def test_interval_recorder_samples_the_series_at_interval_boundaries():
+    full  = run_tti(make_model(3))
+    daily = run_tti(make_model(3, recorder=SeriesRecorder(interval=1)))
+
+    fullTimes = full.tseries[:full.tidx+1]
+    assert numpy.allclose(numpy.diff(daily.tseries[1:-1]), 1)
+    for i, t in enumerate(daily.tseries):
+        # Each sample holds the state in effect at its time (the last event at or before it):
+        assert daily.numE[i] == full.numE[numpy.searchsorted(fullTimes, t, side='right') - 1]
+
+
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Testing calendars and test characteristics of the former forked sim loops:
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+RATE_DECAY = {6: 0.26, 7: 0.29, 8: 0.34, 9: 0.38, 10: 0.43, 11: 0.48, 12: 0.52, 13: 0.57, 14: 0.62, 15: 0.66, 16: 0.70,
+              17: 0.76, 18: 0.79, 19: 0.82, 20: 0.85, 21: 0.88, 22: 0.90, 23: 0.92, 24: 0.93, 25: 0.95, 26: 0.96, 27: 0.97,
+              28: 0.97, 29: 0.98, 30: 0.98, 31: 0.99}
+
+
+def fork_falseneg_rates(model, fork):
+    # The temporal_falseneg_rates dicts hard-coded in the former forked sim loops:
+    exposed = {0: 1.00, 1: 1.00, 2: 1.00, 3: 1.00}
+    if (fork == 'pcr'):
+        pre  = {0: 0.25, 1: 0.25, 2: 0.22}
+        sym  = {0: 0.19, 1: 0.16, 2: 0.16, 3: 0.17, 4: 0.19, 5: 0.22, **RATE_DECAY}
+        asym = sym
+        Qsym = sym
+    elif (fork == 'self_test'):
+        pre  = {0: 0.22, 1: 0.22, 2: 0.22}
+        sym  = {**{day: 0.22 for day in range(6)}, **RATE_DECAY}
+        asym = sym
+        Qsym = sym
+    else:
+        pre  = {0: 0.012, 1: 0.012, 2: 0.012}
+        sym  = {**{day: 0.012 for day in range(6)}, **RATE_DECAY}
+        asym = {**RATE_DECAY, **{day: 0.012 for day in range(9)}}
+        Qsym = asym
+    return {model.E: exposed, model.I_pre: pre, model.I_sym: sym, model.I_asym: asym,
+            model.Q_E: exposed, model.Q_pre: pre, model.Q_sym: Qsym, model.Q_asym: asym}
+
+
+@pytest.mark.parametrize('test, fork', [(PCR_TEST, 'pcr'), (SELF_TEST, 'self_test'), (ADMINISTERED_TEST, 'administered_test')])
+def test_falseneg_tables_match_the_forked_loops(test, fork):
+    model = make_model(0)
+    forkRates = fork_falseneg_rates(model, fork)
+    for table in [test.falseneg_table(model), TestCharacteristics(falseneg_rates_by_day=forkRates).falseneg_table(model)]:
+        for state in range(model.numStateCodes):
+            for day in range(40):
+                # (the forks only tested positive with probability 1-rate in the listed states, and only infectious
+                # nodes can test positive in run_tti_sim, so the exposed states' certain false negatives carry over)
+                if (state in forkRates):
+                    forkRate = forkRates[state][min(day, max(forkRates[state].keys()))]
+                else:
+                    forkRate = 1.00
+                assert table[state, min(day, table.shape[1]-1)] == forkRate, (fork, state, day)
+
+
+def test_legacy_cadences_match_the_forked_loops():
+    legacyDays = legacy_cadence_testing_days(110)
+    assert legacyDays['semiweekly'] == [0, 3, 7, 10, 14, 17, 21, 24, 37, 30, 33, 36, 39, 42, 45, 48, 51, 54, 57, 60, 63, 66,
+                                        69, 72, 75, 78, 81, 84, 87, 90, 93, 96, 99, 102]
+    assert legacyDays['workday'] == [0, 1, 2, 3, 4, 7, 8, 9, 10, 11, 14, 15, 16, 17, 18, 21, 22, 23, 24, 25, 28, 29, 30, 31,
+                                     32, 35, 36, 37, 38, 39, 42, 43, 44, 45, 46, 49, 50, 51, 52, 53, 56, 57, 58, 59, 60, 63,
+                                     64, 65, 66, 67, 70, 71, 72, 73, 74, 77, 78, 79, 80, 81, 84, 85, 86, 87, 88, 91, 92, 93,
+                                     94, 95, 98, 99, 100, 101, 102]
+    assert legacyDays['everyday'] == list(range(105))
+    assert legacyDays['none'] == [109]
+    assert legacy_cadence_testing_days(310)['none'] == [309]
+
+
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Network generation:
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+FARZ_PARAMS = {'alpha':5.0, 'gamma':5.0, 'beta':0.5, 'r':1, 'q':0.0, 'phi':10, 'b':0, 'epsilon':1e-6, 'directed': False, 'weighted': False}
+
+
+def test_farz_edges_match_the_former_generator():
+    # Edge lists and memberships realized by the former (list-based) FARZ generator from the same seeds:
+    random.seed(7)
+    G, C = FARZ.realize(n=20, m=2, k=2, **FARZ_PARAMS)
+    assert G.edge_list == [(0, 3, 1), (2, 5, 1), (3, 6, 1), (3, 4, 1), (6, 7, 1), (1, 9, 1), (0, 4, 1), (4, 10, 1), (2, 6, 1),
+                           (8, 11, 1), (0, 6, 1), (0, 7, 1), (5, 12, 1), (7, 14, 1), (4, 7, 1), (6, 15, 1), (2, 12, 1),
+                           (1, 16, 1), (3, 13, 1), (13, 17, 1), (0, 13, 1), (14, 18, 1), (5, 8, 1), (12, 19, 1), (16, 18, 1)]
+    assert [C.memberships[node][0][0] for node in range(20)] == [0, 0, 1, 1, 0, 1, 1, 0, 0, 1, 0, 1, 0, 0, 0, 1, 1, 1, 0, 0]
+
+    # (overlapping communities, community-size heterogeneity and multiple edges per node)
+    random.seed(3)
+    G, C = FARZ.realize(n=300, m=8, k=5, **dict(FARZ_PARAMS, b=0.3, r=3, q=0.5))
+    digest = hashlib.sha256(repr((G.edge_list, sorted(C.memberships.items()))).encode()).hexdigest()
+    assert len(G.edge_list) == 60204
+    assert digest == '93036024e420b9e00afa0b946ebb7c1a015ae7b7a53d6e5bb57467da1ba39d9c'
+
+
+def test_workplace_network_matches_the_former_generator():
+    random.seed(11)
+    numpy.random.seed(11)
+    G, cohorts, teams = generate_workplace_contact_network(num_cohorts=2, num_nodes_per_cohort=10, num_teams_per_cohort=2,
+                                                            mean_intracohort_degree=3, pct_contacts_intercohort=0.0,
+                                                            farz_params=dict(FARZ_PARAMS))
+    assert sorted(tuple(sorted((int(i), int(j)))) for i, j in G.edges()) == [(0, 1), (0, 2), (0, 3), (0, 4), (0, 6), (1, 5), (1, 6),
+                                                                             (2, 3), (2, 4), (3, 4), (6, 7), (10, 15), (11, 12),
+                                                                             (11, 14), (13, 14), (13, 18), (14, 18), (15, 16)]
+    assert teams == {'c0-t0': [0, 1, 2, 3, 4, 6, 8, 9], 'c0-t1': [5, 7], 'c1-t1': [10, 11, 12, 13, 14, 15, 16, 18, 19], 'c1-t0': [17]}
+
+
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Parameter sweeps:
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+SWEEP_CONDITIONS = [{'Network_size':20, 'Bubble_size':10, 'PCR_frequency':'weekly', 'R':2}]
+
+
+def stored_records(path):
+    records = []
+    for shardPath in sorted(glob.glob(os.path.join(path, 'shard-*.csv'))):
+        with open(shardPath, newline='') as shardFile:
+            records.extend(csv.DictReader(shardFile))
+    return records
+
+
+def test_sweep_record_keys():
+    condition = SWEEP_CONDITIONS[0]
+    assert sweep_record_key(condition, 3, 0) == '20|10|weekly|2|3|0'
+    assert sweep_record_key(condition, 3, 1) != sweep_record_key(condition, 3, 0)
+    assert sweep_record_key(condition, 3, 0, batched=True) == '20|10|weekly|2|3|0|batch'
+
+
+def test_sweep_resumes_from_the_stored_keys(tmp_path):
+    run_sweep(SWEEP_CONDITIONS, 2, str(tmp_path), num_workers=1, sim_kwargs={'T':20}, verbose=False)
+    records = stored_records(str(tmp_path))
+    assert sorted(record['key'] for record in records) == ['20|10|weekly|2|0|0', '20|10|weekly|2|1|0']
+    assert all(record['Engine'] == 'single' for record in records)
+
+    # Re-running with more replicates only runs the missing one:
+    run_sweep(SWEEP_CONDITIONS, 3, str(tmp_path), num_workers=1, sim_kwargs={'T':20}, verbose=False)
+    records = stored_records(str(tmp_path))
+    assert len(records) == 3
+    assert SweepResultStore(str(tmp_path)).completed_keys() == {'20|10|weekly|2|%d|0' % replicate for replicate in range(3)}
+
+    # Results are determined by the base seed, condition and replicate, whatever else is in the sweep:
+    run_sweep(SWEEP_CONDITIONS, 3, str(tmp_path / 'rerun'), num_workers=1, sim_kwargs={'T':20}, verbose=False)
+    rerun = {record['key']: record for record in stored_records(str(tmp_path / 'rerun'))}
+    for record in records:
+        assert [record[field] for field in RECORD_FIELDS[:-1]] == [rerun[record['key']][field] for field in RECORD_FIELDS[:-1]]
+
+
+def test_batched_sweep_records_are_kept_apart(tmp_path):
+    run_sweep(SWEEP_CONDITIONS, 2, str(tmp_path), num_workers=1, sim_kwargs={'T':20}, verbose=False)
+    run_sweep(SWEEP_CONDITIONS, 2, str(tmp_path), num_workers=1, sim_kwargs={'T':20}, batch_size=2, verbose=False)
+    records = stored_records(str(tmp_path))
+    assert sorted((record['key'], record['Engine']) for record in records) == [('20|10|weekly|2|0|0', 'single'),
+                                                                              ('20|10|weekly|2|0|0|batch', 'batch'),
+                                                                              ('20|10|weekly|2|1|0', 'single'),
+                                                                              ('20|10|weekly|2|1|0|batch', 'batch')]
+
+    # Both engines' records are now complete, so resuming either one runs nothing:
+    for batch_size in [1, 2]:
+        run_sweep(SWEEP_CONDITIONS, 2, str(tmp_path), num_workers=1, sim_kwargs={'T':20}, batch_size=batch_size, verbose=False)
+    assert len(stored_records(str(tmp_path))) == 4